@@ -0,0 +1,111 @@
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from engine import get_cache, normalize_query
+
+# --- AYARLAR ---
+AI_MODEL = "gemini-1.5-flash"
+AI_MAX_CONCURRENT = 4        # Aynı anda LLM'e giden en fazla istek
+AI_CACHE_TTL = 6 * 3600      # Aynı ürün + fiyat bandı için yorum bu kadar geçerli (sn)
+PRICE_BUCKET_STEP = 0.05     # Fiyat bandı genişliği (%5): fiyat bandı değişmedikçe LLM'e tekrar gidilmez
+AI_PROMPT = "Ürün: {query}, Fiyat: {price}. Bu fiyata alınır mı? Kısa cevap."
+
+def price_bucket(price):
+    """Fiyatı %5'lik logaritmik banda çevirir (1000 TL ile 1030 TL aynı bant)."""
+    if not price or price <= 0: return 0
+    return int(math.floor(math.log(price) / math.log1p(PRICE_BUCKET_STEP)))
+
+# --- MODELLER ---
+def gemini_model(api_key, model_name=AI_MODEL):
+    """Gemini istemcisini bir kez yapılandırıp model nesnesini döner (tekrar kullanılır)."""
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name)
+
+class _StubResponse:
+    def __init__(self, text): self.text = text
+
+class StubModel:
+    """Testler için yerel model: ağ çağrısı yapmaz, istemleri kaydeder."""
+    def __init__(self, answer="Makul bir fiyat, alınabilir.", delay=0.0):
+        self.answer = answer
+        self.delay = delay
+        self.prompts = []
+
+    def generate_content(self, prompt):
+        if self.delay: time.sleep(self.delay)
+        self.prompts.append(prompt)
+        return _StubResponse(self.answer)
+
+# --- YZ ANALİZ SERVİSİ ---
+class DealAdvisor:
+    """Arka planda çalışan, önbellekli ve eşzamanlılığı sınırlı fiyat yorumu servisi.
+
+    Yorumlar (normalize sorgu, fiyat bandı) anahtarıyla paylaşımlı önbellekte tutulur; aynı anahtar
+    için süren bir istek varsa yeni istek açılmaz, aynı Future döner.
+    """
+    def __init__(self, model_factory, max_concurrent=AI_MAX_CONCURRENT, ttl=AI_CACHE_TTL):
+        self._model_factory = model_factory
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="ghostdeal-ai")
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.ttl = ttl
+        self.stats = {"cache_hits": 0, "shared": 0, "calls": 0, "errors": 0}
+
+    def _get_model(self):
+        with self._model_lock:
+            if self._model is None: self._model = self._model_factory()
+            return self._model
+
+    @staticmethod
+    def cache_key(query, price):
+        return f"ai:{normalize_query(query)}:{price_bucket(price)}"
+
+    def cached(self, query, price):
+        """Önbellekte yorum varsa döner, yoksa None (LLM'e gitmez)."""
+        hit = get_cache().get(self.cache_key(query, price))
+        return hit[0] if hit else None
+
+    def analyze_async(self, query, price):
+        """Yorumu arka planda üretir; hazır Future (önbellek) ya da süren isteğin Future'ını döner."""
+        key = self.cache_key(query, price)
+        text = self.cached(query, price)
+        if text is not None:
+            self.stats["cache_hits"] += 1
+            done = Future()
+            done.set_result(text)
+            return done
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats["shared"] += 1
+                return future
+            future = self._pool.submit(self._generate, key, query, price)
+            self._inflight[key] = future
+        future.add_done_callback(lambda _: self._forget(key))
+        return future
+
+    def analyze(self, query, price, timeout=None):
+        return self.analyze_async(query, price).result(timeout)
+
+    def _forget(self, key):
+        with self._lock: self._inflight.pop(key, None)
+
+    def _generate(self, key, query, price):
+        self.stats["calls"] += 1
+        try: text = self._get_model().generate_content(AI_PROMPT.format(query=query, price=price)).text
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        get_cache().set(key, text, ttl=self.ttl, stale=0)
+        return text
+
+def advisor_from_env(api_key):
+    """GHOSTDEAL_AI_STUB=1 ise yerel stub model, değilse Gemini."""
+    if os.environ.get("GHOSTDEAL_AI_STUB") == "1": return DealAdvisor(StubModel)
+    return DealAdvisor(lambda: gemini_model(api_key))
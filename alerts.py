@@ -0,0 +1,151 @@
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+import metrics
+from engine import BUDGET_LEVELS, budget_level, cached_search_all, filter_irrelevant_products, normalize_query, format_tl, load_secrets
+from mailer import build_alert_message, dispatcher_from_secrets
+
+log = logging.getLogger("ghostdeal.alerts")
+
+# --- AYARLAR ---
+WATCHLIST_PATH = os.environ.get("GHOSTDEAL_WATCHLIST", "ghostdeal_watchlist.sqlite3")
+POLL_INTERVAL = 900  # Her tur arası bekleme (sn)
+POLL_BACKOFF = (1, 2, 4, 8)  # API bütçe seviyesine göre tur aralığı çarpanı (normal / low / critical / exhausted)
+
+# --- TAKİP LİSTESİ (Kalıcı, SQLite) ---
+class WatchlistStore:
+    """Fiyat alarmları: Streamlit kaydeder / listeler, alarm işçisi okur ve tetikler."""
+    def __init__(self, path=WATCHLIST_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS alarms (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                query TEXT NOT NULL, query_key TEXT NOT NULL,
+                target REAL NOT NULL, email TEXT NOT NULL,
+                created REAL NOT NULL, active INTEGER NOT NULL DEFAULT 1,
+                triggered_at REAL, triggered_price REAL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS alarms_active ON alarms(active, query_key)")
+            self._local.conn = conn
+        return conn
+
+    def add(self, query, target, email):
+        cur = self._conn().execute(
+            "INSERT INTO alarms (query, query_key, target, email, created) VALUES (?, ?, ?, ?, ?)",
+            (query.strip(), normalize_query(query), float(target), email.strip(), time.time()))
+        return cur.lastrowid
+
+    def remove(self, alarm_id):
+        self._conn().execute("DELETE FROM alarms WHERE id = ?", (alarm_id,))
+
+    def list(self, email=None, active_only=False):
+        sql, args = "SELECT * FROM alarms WHERE 1=1", []
+        if email:
+            sql += " AND email = ?"
+            args.append(email.strip())
+        if active_only: sql += " AND active = 1"
+        return pd.read_sql_query(sql + " ORDER BY created DESC", self._conn(), params=args)
+
+    def active(self):
+        return self.list(active_only=True)
+
+    def mark_triggered(self, alarm_ids, prices):
+        now = time.time()
+        self._conn().executemany(
+            "UPDATE alarms SET active = 0, triggered_at = ?, triggered_price = ? WHERE id = ?",
+            [(now, float(p), int(i)) for i, p in zip(alarm_ids, prices)])
+
+# --- ALARM İŞÇİSİ ---
+_in_flight = set()   # Bildirimi kuyrukta / gönderimde olan alarmlar: sonraki turda tekrar gönderilmez
+_in_flight_lock = threading.Lock()
+
+def _release(alarm_id):
+    with _in_flight_lock: _in_flight.discard(alarm_id)
+
+def _delivered(store, alarm_id, price):
+    try: store.mark_triggered([alarm_id], [price])
+    finally: _release(alarm_id)
+
+def fetch_best_offers(queries, serp_key, rapid_key):
+    """Her normalize sorgu için bir kez arama yapar: query_key -> (en iyi fiyat, link)."""
+    best = {}
+    for key, query in queries.items():
+        try:
+            res_df = cached_search_all(query, serp_key, rapid_key)
+            clean_df = filter_irrelevant_products(res_df, query)
+        except Exception as e:
+            log.warning("Alarm sorgusu başarısız (%s): %s", query, e)
+            metrics.inc("ghostdeal_errors_total", component="alerts")
+            continue
+        if clean_df.empty: continue
+        row = clean_df.loc[clean_df['Fiyat'].idxmin()]
+        best[key] = (float(row['Fiyat']), row['Link'])
+    return best
+
+def run_cycle(store, secrets, mailer):
+    """Tek tur: aktif alarmları sorguya göre grupla, her sorguyu bir kez çek, tüm eşikleri tek geçişte değerlendir.
+
+    Bildirimler mail kuyruğuna bırakılır; gönderim (ve tekrar denemeler) kuyruğun işçisinde yapılır.
+    Alarm sadece bildirim teslim edilince kapanır; ölü mektuba düşerse aktif kalır ve sonraki turda tekrar denenir.
+    """
+    alarms = store.active()
+    if alarms.empty: return 0
+    # Aynı ürünü kaç kişi takip ederse etsin sorgu bir kez atılır
+    queries = alarms.drop_duplicates("query_key").set_index("query_key")["query"].to_dict()
+    best = fetch_best_offers(queries, secrets.get("SERP_API_KEY"), secrets.get("RAPID_API_KEY"))
+    if not best: return 0
+
+    alarms["best"] = alarms["query_key"].map(lambda k: best.get(k, (None, None))[0])
+    alarms["link"] = alarms["query_key"].map(lambda k: best.get(k, (None, None))[1])
+    fired = alarms[alarms["best"].notna() & (alarms["best"] <= alarms["target"])]
+    with _in_flight_lock:
+        fired = fired[~fired["id"].isin(_in_flight)]
+        _in_flight.update(int(i) for i in fired["id"])
+
+    for alarm in fired.itertuples():
+        alarm_id, price = int(alarm.id), float(alarm.best)
+        mailer.send(build_alert_message(secrets.get("EMAIL_SENDER"), alarm.email, alarm.query, format_tl(price), alarm.link),
+                    on_sent=lambda _, i=alarm_id, p=price: _delivered(store, i, p),
+                    on_dead=lambda _, i=alarm_id: _release(i))
+    return len(fired)
+
+def main():
+    parser = argparse.ArgumentParser(description="GhostDeal fiyat alarmı işçisi")
+    parser.add_argument("--interval", type=int, default=POLL_INTERVAL, help="Turlar arası bekleme (sn)")
+    parser.add_argument("--once", action="store_true", help="Tek tur çalış ve çık")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    metrics.serve_from_env()
+
+    store = WatchlistStore()
+    secrets = load_secrets()
+    mailer = dispatcher_from_secrets(secrets)
+    while True:
+        started = time.time()
+        try:
+            fired = run_cycle(store, secrets, mailer)
+            log.info("Alarm turu bitti: %d bildirim (%.1f sn)", fired, time.time() - started)
+        except Exception:
+            log.exception("Alarm turu hatası")
+            metrics.inc("ghostdeal_errors_total", component="alerts")
+        if args.once:
+            mailer.close()
+            break
+        # Kota azaldıkça turlar seyrekleşir (alarm sorguları bütçeyi kullanıcı aramalarına bırakır)
+        level = budget_level()
+        if level: log.info("API bütçesi %s: sonraki tur %d sn sonra", BUDGET_LEVELS[level], args.interval * POLL_BACKOFF[level])
+        time.sleep(args.interval * POLL_BACKOFF[level])
+
+if __name__ == "__main__":
+    main()
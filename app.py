@@ -1,50 +1,76 @@
 import streamlit as st
 import pandas as pd
 import time
-import requests
-import smtplib
 import random
-import io  # YENİ: Excel'i hafızada oluşturmak için
+import logging
 from datetime import datetime
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import plotly.graph_objects as go
-from streamlit_lottie import st_lottie
-from PIL import Image
-
-# Barkod kütüphanesi kontrolü
-try:
-    from pyzbar.pyzbar import decode
-    HAS_BARCODE_LIB = True
-except:
-    HAS_BARCODE_LIB = False
+from importlib.util import find_spec
+# Ağır modüller (plotly, streamlit_lottie, PIL, pyzbar, google.generativeai) sadece
+# kullanıldıkları yerde içe aktarılır; ilk açılış ve her yeniden çalıştırma hafif kalır.
 
 # engine.py'dan fonksiyonları içe aktar
-from engine import search_all_sources, get_amazon_deals
+from engine import iter_search_all, budget_status, summarize_offers, price_stats, price_history, group_offers, filter_irrelevant_products, relevant_offers, format_tl
+from alerts import WatchlistStore
+from snapshots import DealsSnapshotStore
+from deals_grid import DealsGrid, PRICE_BANDS, SORTS, DEAL_TYPE_NAMES
+from exports import ExportCache
+from assets import load_lottie, font_css
+import metrics
+
+log = logging.getLogger("ghostdeal.app")
 
 # ==========================================
 # 1. AYARLAR & GÜVENLİK
 # ==========================================
 st.set_page_config(page_title="GhostDeal Pro", page_icon="⚡", layout="wide", initial_sidebar_state="expanded")
+_rerun_started = time.perf_counter()  # Sayfa başına rerun süresi (SİSTEM sayfası / Prometheus)
 
-# --- LOTTIE LOADER ---
-def load_lottieurl(url: str):
-    try:
-        r = requests.get(url)
-        if r.status_code != 200: return None
-        return r.json()
-    except: return None
+# GHOSTDEAL_METRICS_PORT tanımlıysa /metrics uç noktası süreç başına bir kez açılır
+@st.cache_resource(show_spinner=False)
+def start_metrics_server():
+    return metrics.serve_from_env()
+
+start_metrics_server()
+
+# --- YEREL VARLIKLAR (süreç başına bir kez yüklenir, ağ isteği yok) ---
+@st.cache_resource(show_spinner=False)
+def get_lottie(name):
+    return load_lottie(name)
+
+@st.cache_resource(show_spinner=False)
+def get_font_css():
+    return font_css()
 
-anim_cart = load_lottieurl("https://assets10.lottiefiles.com/packages/lf20_6wjmecxo.json")
+# Barkod okuyucu (kamera ilk açıldığında yüklenir)
+@st.cache_resource(show_spinner=False)
+def get_barcode_tools():
+    import barcode
+    return barcode if barcode.HAS_BARCODE_LIB else None
 
-# --- CACHING ---
-@st.cache_data(ttl=3600, show_spinner=False)
-def cached_search(query, serp_key, rapid_key):
-    return search_all_sources(query, serp_key, rapid_key)
+@st.cache_resource(show_spinner=False)
+def get_barcode_cache():
+    import barcode
+    return barcode.BarcodeCache()
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def cached_deals(rapid_key, country="TR"):
-    return get_amazon_deals(rapid_key, country)
+anim_cart = get_lottie("cart")
+
+# --- CACHING (engine.py: kalıcı, replikalar arası paylaşımlı önbellek) ---
+# Fırsatlar zamanlanmış işten (snapshots.py) gelir; sayfa sadece son sürümü okur
+@st.cache_resource
+def get_deals_store():
+    return DealsSnapshotStore()
+
+# Kart HTML'leri sürüm başına bir kez üretilir; tüm oturumlar aynı ızgarayı kullanır
+@st.cache_resource(show_spinner=False, max_entries=2)
+def get_deals_grid(version):
+    return DealsGrid(version, get_deals_store().read(version))
+
+# Hazırlanan rapor dosyaları (aynı sonuç + biçim tüm oturumlarda bir kez üretilir)
+@st.cache_resource
+def get_exports():
+    return ExportCache()
+
+EXPORT_FORMATS = {"xlsx": "Excel (.xlsx)", "csv": "CSV", "parquet": "Parquet"}
 
 # --- LOGIN ---
 def check_password():
@@ -69,40 +95,47 @@ try:
         SERP_API_KEY = st.secrets["SERP_API_KEY"]
         RAPID_API_KEY = st.secrets["RAPID_API_KEY"]
         GEMINI_API_KEY = st.secrets["GEMINI_API_KEY"]
-        import google.generativeai as genai
-        HAS_AI = True
+        HAS_AI = find_spec("google.generativeai") is not None
     else: st.stop()
-except:
+except (KeyError, FileNotFoundError):
     st.warning("⚠️ API Anahtarları bulunamadı.")
     st.stop()
 
-# --- MAİL GÖNDERME ---
-def send_email_alert(to_email, product_name, price, link):
-    try:
-        sender_email = st.secrets["EMAIL_SENDER"]
-        sender_password = st.secrets["EMAIL_PASSWORD"]
-        subject = f"🚨 FİYAT DÜŞTÜ: {product_name}"
-        body = f"<html><body><h2>🔥 GhostDeal Yakaladı!</h2><h3>📦 {product_name}</h3><h1 style='color:green;'>{price}</h1><a href='{link}'>ÜRÜNE GİT</a></body></html>"
-        msg = MIMEMultipart()
-        msg['From'] = f"GhostDeal AI <{sender_email}>"
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'html'))
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        server.send_message(msg)
-        server.quit()
-        return True
-    except: return False
+# --- YZ ANALİZİ (arka planda, önbellekli; sayfa beklemeden çizilmeye devam eder) ---
+@st.cache_resource(show_spinner=False)
+def get_advisor():
+    from advisor import advisor_from_env
+    return advisor_from_env(GEMINI_API_KEY)
+
+@st.fragment(run_every=2)
+def poll_ai_verdict():
+    # Sadece yorum beklenirken çizilir; bitince tek bir tam rerun ile yerini sonuca bırakır (yoklama durur)
+    job = st.session_state.get('ai_job')
+    if job is not None and not job.done():
+        st.caption("🤖 YZ analiz ediyor...")
+        return
+    st.rerun()
+
+def render_ai_verdict():
+    job = st.session_state.get('ai_job')
+    if job is None: return
+    if not job.done():
+        poll_ai_verdict()
+        return
+    try: st.info(f"🤖 {job.result()}")
+    except Exception: st.warning("🤖 YZ analizi şu an yapılamadı.")
+
+# --- ALARM LİSTESİ (Takip ve e-posta gönderimi alerts.py işçisinde) ---
+@st.cache_resource
+def get_watchlist():
+    return WatchlistStore()
 
 # ==========================================
 # 2. CSS (ORİJİNAL TASARIM + FIXES)
 # ==========================================
+st.markdown(f"<style>{get_font_css()}</style>", unsafe_allow_html=True)
 st.markdown("""
     <style>
-        @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600&family=Orbitron:wght@500;700;900&display=swap');
-        
         header {background: transparent !important;}
         [data-testid="collapsedControl"] {display: block !important; color: #a78bfa !important;}
         .stDeployButton, #MainMenu, footer {display:none; visibility: hidden;}
@@ -150,6 +183,7 @@ st.markdown("""
             color: white !important; padding: 5px 12px; border-radius: 20px; font-weight: 800;
             box-shadow: 0 0 10px rgba(239, 68, 68, 0.6); z-index: 2;
         }
+        .deal-grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(220px, 1fr)); gap: 20px; }
         .deal-card {
             background: rgba(20, 20, 20, 0.6); backdrop-filter: blur(10px); border: 1px solid rgba(255, 255, 255, 0.05);
             border-radius: 16px; padding: 15px; height: 420px; display: flex; flex-direction: column; justify-content: space-between; position: relative;
@@ -181,20 +215,8 @@ st.markdown("""
 # ==========================================
 # 3. YARDIMCI FONKSİYONLAR
 # ==========================================
-def format_tl(val):
-    return f"{val:,.2f} TL".replace(",", "X").replace(".", ",").replace("X", ".")
-
-def filter_irrelevant_products(df, query, threshold=0.5):
-    if df.empty: return df
-    q_words = set(query.lower().split())
-    valid_indices = []
-    for idx, row in df.iterrows():
-        t_words = set(str(row['Ürün']).lower().split())
-        match_ratio = len(q_words.intersection(t_words)) / len(q_words) if q_words else 0
-        if match_ratio >= threshold: valid_indices.append(idx)
-    return df.loc[valid_indices]
-
 def plot_ghost_gauge(score):
+    import plotly.graph_objects as go
     fig = go.Figure(go.Indicator(
         mode = "gauge+number", value = score,
         gauge = {'axis': {'range': [None, 100]}, 'bar': {'color': "#8b5cf6"},
@@ -205,17 +227,25 @@ def plot_ghost_gauge(score):
     fig.update_layout(paper_bgcolor="rgba(0,0,0,0)", height=220, margin=dict(l=20,r=20,t=40,b=20))
     st.plotly_chart(fig, use_container_width=True)
 
-def plot_neon_prediction(df, avg_price):
+PREDICT_DAYS = 7  # Tahmin ufku (gün)
+
+def plot_neon_prediction(df, avg_price, stats=None):
+    import plotly.graph_objects as go
     try:
         df_s = df.sort_values(by="Fiyat", ascending=False).head(10)
-        future_val = df_s.iloc[-1]['Fiyat'] * random.uniform(0.92, 0.97)
         fig = go.Figure()
         fig.add_trace(go.Scatter(x=df_s['Satıcı'], y=df_s['Fiyat'], mode='lines+markers', line_shape='spline', line=dict(color='#00f2ff', width=4), name="Güncel"))
-        fig.add_trace(go.Scatter(x=[df_s.iloc[-1]['Satıcı'], "Gelecek Tahmini"], y=[df_s.iloc[-1]['Fiyat'], future_val], mode='lines', line=dict(color='#ef4444', dash='dot'), name="AI Tahmin"))
+        # Tahmin: geçmişteki günlük en düşük fiyat trendi (en az 2 günlük veri varsa)
+        if stats and stats["days"] >= 2:
+            future_val = max(0.0, df_s.iloc[-1]['Fiyat'] + stats["trend"] * PREDICT_DAYS)
+            fig.add_trace(go.Scatter(x=[df_s.iloc[-1]['Satıcı'], f"{PREDICT_DAYS} Gün Sonra"], y=[df_s.iloc[-1]['Fiyat'], future_val], mode='lines', line=dict(color='#ef4444', dash='dot'), name="AI Tahmin"))
+            fig.add_hline(y=stats["median"], line_dash="dot", line_color="#4ade80", annotation_text=f"{stats['days']} Günlük Medyan")
         fig.add_hline(y=avg_price, line_dash="dash", line_color="#8b5cf6", annotation_text="Ortalama")
         fig.update_layout(template="plotly_dark", paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', height=380, margin=dict(l=10,r=10,t=40,b=10), showlegend=False)
         st.plotly_chart(fig, use_container_width=True)
-    except: pass
+    except Exception:
+        log.exception("Fiyat grafiği çizilemedi")
+        metrics.inc("ghostdeal_errors_total", component="app")
 
 def render_dashboard_card(title, value, icon="📊"):
     st.markdown(f"""
@@ -229,40 +259,13 @@ def render_dashboard_card(title, value, icon="📊"):
     </div>
     """, unsafe_allow_html=True)
 
-# --- YENİ: EXCEL OLUŞTURUCU (PROFESYONEL) ---
-def to_excel(df):
-    output = io.BytesIO()
-    # Excel Writer
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        # İstenmeyen sütunları (Resim linki vb.) çıkar, temiz tablo yap
-        clean_df = df[['Ürün', 'Fiyat', 'Satıcı', 'Link']].copy()
-        clean_df.to_excel(writer, index=False, sheet_name='GhostDeal_Analiz')
-        
-        workbook = writer.book
-        worksheet = writer.sheets['GhostDeal_Analiz']
-        
-        # Formatlar
-        header_fmt = workbook.add_format({'bold': True, 'font_color': 'white', 'bg_color': '#8b5cf6', 'border': 1})
-        currency_fmt = workbook.add_format({'num_format': '#,##0.00 "TL"'})
-        link_fmt = workbook.add_format({'font_color': 'blue', 'underline': 1})
-        
-        # Sütun Genişlikleri ve Formatlama
-        worksheet.set_column('A:A', 50) # Ürün Adı (Geniş)
-        worksheet.set_column('B:B', 15, currency_fmt) # Fiyat (TL Formatlı)
-        worksheet.set_column('C:C', 20) # Satıcı
-        worksheet.set_column('D:D', 40, link_fmt) # Link
-        
-        # Başlık Formatını Uygula
-        for col_num, value in enumerate(clean_df.columns.values):
-            worksheet.write(0, col_num, value, header_fmt)
-            
-    return output.getvalue()
-
 # ==========================================
 # 4. SIDEBAR (LOGO EKLİ)
 # ==========================================
 with st.sidebar:
-    if anim_cart: st_lottie(anim_cart, height=100, key="nav_lottie")
+    if anim_cart:
+        from streamlit_lottie import st_lottie
+        st_lottie(anim_cart, height=100, key="nav_lottie")
     st.markdown("""
         <div style="text-align: center;">
             <h2 style='display: flex; align-items: center; justify-content: center; gap: 10px; color: #a78bfa; margin: 0; padding: 0; text-shadow: 0 0 10px rgba(167, 139, 250, 0.5);'>
@@ -275,146 +278,267 @@ with st.sidebar:
         </div>
     """, unsafe_allow_html=True)
     st.markdown("---")
-    menu = st.radio("MENÜ", ["DASHBOARD", "AMAZON VİTRİN", "FİYAT ALARMI"], label_visibility="collapsed", key="main_nav")
+    menu = st.radio("MENÜ", ["DASHBOARD", "AMAZON VİTRİN", "FİYAT ALARMI", "SİSTEM"], label_visibility="collapsed", key="main_nav")
 
 # ==========================================
 # 5. SAYFA YAPILARI
 # ==========================================
 
-# --- DASHBOARD (KAMERA + ARAMA) ---
-if menu == "DASHBOARD":
-    st.markdown("<h2>Dashboard</h2>", unsafe_allow_html=True)
-    
-    # Arama ve Kamera Yan Yana
-    col_search, col_cam = st.columns([6, 1], gap="small")
-    
-    with col_search:
-        initial_q = st.session_state.get('search_query', "")
-        query = st.text_input("Arama", value=initial_q, placeholder="Ürün adı girin veya kamerayı açın...", label_visibility="collapsed")
-    
-    with col_cam:
-        if st.button("📷", help="Barkod Tara"):
-            st.session_state.show_cam = not st.session_state.get('show_cam', False)
-    
-    # Kamera Alanı
-    if st.session_state.get('show_cam', False):
-        st.info("💡 Barkodu gösterin...")
-        cam_in = st.camera_input("Scanner", label_visibility="collapsed")
-        if cam_in and HAS_BARCODE_LIB:
-            img = Image.open(cam_in)
-            decoded = decode(img)
-            if decoded:
-                b_data = decoded[0].data.decode("utf-8")
-                st.success(f"✅ Okundu: {b_data}")
-                st.session_state.search_query = b_data
-                st.session_state.show_cam = False 
-                st.rerun() 
-            else: st.warning("❌ Okunamadı.")
-
-    # Arama İşlemi
-    if query:
-        st.session_state.search_query = query 
-        with st.spinner("📡 Global Piyasalar Taranıyor..."):
-            raw_df = cached_search(query, SERP_API_KEY, RAPID_API_KEY)
-            df = filter_irrelevant_products(raw_df, query)
-            st.session_state.results = df
-
-    if 'results' in st.session_state and not st.session_state.results.empty:
-        df = st.session_state.results
-        best_p, avg_p = df['Fiyat'].min(), df['Fiyat'].mean()
-        saving = ((avg_p - best_p) / avg_p) * 100
-        g_score = min(100, int(50 + (saving * 2)))
-
-        st.markdown("---")
-        l, r = st.columns([2, 3], gap="medium")
+# st.rerun() / st.stop() istisna fırlatır: rerun süresi finally'de kaydedilir, bu yollar da sayılır
+try:
+    # --- DASHBOARD (KAMERA + ARAMA) ---
+    if menu == "DASHBOARD":
+        st.markdown("<h2>Dashboard</h2>", unsafe_allow_html=True)
+
+        # Arama ve Kamera Yan Yana
+        col_search, col_cam = st.columns([6, 1], gap="small")
+
+        with col_search:
+            initial_q = st.session_state.get('search_query', "")
+            query = st.text_input("Arama", value=initial_q, placeholder="Ürün adı girin veya kamerayı açın...", label_visibility="collapsed")
+
+        with col_cam:
+            if st.button("📷", help="Barkod Tara"):
+                st.session_state.show_cam = not st.session_state.get('show_cam', False)
+
+        # Kamera Alanı
+        if st.session_state.get('show_cam', False):
+            st.info("💡 Barkodu gösterin...")
+            cam_in = st.camera_input("Scanner", label_visibility="collapsed")
+            tools = get_barcode_tools() if cam_in else None
+            if cam_in and tools:
+                from PIL import Image
+                b_data, _ = tools.read_barcode(Image.open(cam_in))
+                if b_data:
+                    st.success(f"✅ Okundu: {b_data}")
+                    # Daha önce çözülmüş barkod: doğrudan ürün adıyla ara
+                    with st.spinner("🔎 Barkod ürüne çevriliyor..."):
+                        title = tools.resolve_barcode(b_data, SERP_API_KEY, RAPID_API_KEY, get_barcode_cache())
+                    st.session_state.search_query = title or b_data
+                    st.session_state.show_cam = False 
+                    st.rerun() 
+                else: st.warning("❌ Okunamadı.")
+
+        # Arama İşlemi (kaynaklar geldikçe ilk teklifler hemen gösterilir)
+        if query:
+            # Yeni sorgu: önceki ürünün YZ yorumu gösterilmesin; sadece bu arama popülerliğe sayılır (rerun'lar değil)
+            new_search = query != st.session_state.get('ai_query')
+            if new_search: st.session_state.ai_job = None
+            st.session_state.ai_query = query
+            st.session_state.search_query = query 
+            live = st.empty()
+            raw_df = pd.DataFrame()
+            for source, raw_df, state in iter_search_all(query, SERP_API_KEY, RAPID_API_KEY, record_demand=new_search):
+                df = filter_irrelevant_products(raw_df, query)
+                summary = summarize_offers(df)
+                with live.container():
+                    st.caption(f"📡 Global Piyasalar Taranıyor... {source} ✓")
+                    if summary:
+                        c1, c2, c3 = st.columns(3)
+                        c1.metric("En İyi Fiyat", format_tl(summary["best"]))
+                        c2.metric("Piyasa Ort.", format_tl(summary["avg"]))
+                        c3.metric("Teklif", summary["count"])
+                        st.dataframe(df[['Ürün', 'Fiyat', 'Satıcı']].head(10), hide_index=True, use_container_width=True)
+            live.empty()
+            # Oturum kendi kopyasını değil, süreçte paylaşılan (önbellekteki) sonucun görünümünü tutar
+            st.session_state.results = relevant_offers(raw_df, query)
+            # Yavaş / hatalı kaynak varsa kısmi sonuç olduğunu belirt
+            failed = [k for k, v in raw_df.attrs.get("source_status", {}).items() if v["status"] in ("timeout", "error")]
+            if failed: st.warning(f"⚠️ Yanıt vermeyen kaynak: {', '.join(failed)} (kısmi sonuç)")
+            skipped = [k for k, v in raw_df.attrs.get("source_status", {}).items() if v["status"] == "budget"]
+            if skipped: st.info(f"💳 API kotası azaldı, atlanan kaynak: {', '.join(skipped)}")
+
+        if 'results' in st.session_state and not st.session_state.results.empty:
+            df = st.session_state.results
+            # Ghost Score: en iyi fiyat, geçmiş medyana (yoksa güncel ortalamaya) göre ne kadar ucuz
+            stats = price_stats(st.session_state.get('search_query', ""))
+            summary = summarize_offers(df, stats["median"] if stats else None)
+            best_p, avg_p, g_score = summary["best"], summary["avg"], summary["score"]
+
+            st.markdown("---")
+            l, r = st.columns([2, 3], gap="medium")
+            with l:
+                c1, c2 = st.columns(2)
+                with c1: render_dashboard_card("En İyi Fiyat", format_tl(best_p), "💎")
+                with c2: render_dashboard_card("Piyasa Ort.", format_tl(avg_p), "⚖️")
+                st.write(""); plot_ghost_gauge(g_score)
+                if st.button("✨ YZ Analizi Başlat", use_container_width=True, key="ai_dash"):
+                    if HAS_AI: st.session_state.ai_job = get_advisor().analyze_async(query, best_p)
+                if st.session_state.get('ai_job') is not None: render_ai_verdict()
+            with r: plot_neon_prediction(df, avg_p, stats)
+
+            st.markdown("### 📋 Teklif Listesi")
+            if st.toggle("🧩 Ürün bazında grupla", key="group_offers"):
+                st.dataframe(group_offers(df)[['Resim', 'Ürün', 'Fiyat', 'En_Yüksek_Fiyat', 'Teklif_Sayısı', 'Kaynaklar', 'Link']], hide_index=True, use_container_width=True,
+                             column_config={
+                                 "Resim": st.column_config.ImageColumn("Görsel"),
+                                 "Link": st.column_config.LinkColumn("Git", display_text="En Ucuza Git ↗"),
+                                 "Fiyat": st.column_config.NumberColumn("En İyi", format="%.2f TL"),
+                                 "En_Yüksek_Fiyat": st.column_config.NumberColumn("En Yüksek", format="%.2f TL"),
+                                 "Teklif_Sayısı": st.column_config.NumberColumn("Teklif")
+                             })
+            else:
+                st.dataframe(df[['Resim', 'Ürün', 'Fiyat', 'Satıcı', 'Link']], hide_index=True, use_container_width=True, 
+                             column_config={
+                                 "Resim": st.column_config.ImageColumn("Görsel"), 
+                                 "Link": st.column_config.LinkColumn("Git", display_text="Mağazaya Git ↗"),
+                                 "Fiyat": st.column_config.NumberColumn(format="%.2f TL")
+                             })
+
+            # --- RAPOR (Dosya sadece istenince üretilir; baytlar içerik özetiyle süreç genelinde önbellekte) ---
+            st.markdown("### 📥 Rapor")
+            report_query = st.session_state.get('search_query', "")
+            e1, e2, e3 = st.columns([2, 3, 2])
+            fmt = e1.selectbox("Biçim", list(EXPORT_FORMATS), format_func=EXPORT_FORMATS.get, key="export_fmt")
+            extras = e2.multiselect("Rapora ekle", ["Fırsatlar", "Fiyat Geçmişi"], key="export_extras")
+            if e3.button("⚙️ Raporu Hazırla", use_container_width=True, key="export_prepare"):
+                sheets = {"GhostDeal_Analiz": df}
+                if "Fırsatlar" in extras:
+                    _, deals = get_deals_store().latest()
+                    if not deals.empty: sheets["Fırsatlar"] = deals
+                if "Fiyat Geçmişi" in extras:
+                    history = price_history(report_query)
+                    if not history.empty: sheets["Fiyat_Geçmişi"] = history
+                with st.spinner("📄 Rapor hazırlanıyor..."):
+                    key, *_ = get_exports().export(sheets, fmt)
+                st.session_state.export = (report_query, key)
+            prepared = st.session_state.get('export')
+            item = get_exports().get(prepared[1]) if prepared and prepared[0] == report_query else None
+            if item is not None:
+                data, ext, mime = item
+                st.download_button(label=f"📥 Raporu İndir (.{ext})", data=data, file_name=f"GhostDeal_{report_query}.{ext}", mime=mime)
+
+    # --- AMAZON VİTRİN ---
+    elif menu == "AMAZON VİTRİN":
+        c1, c2 = st.columns([4,1])
+        c1.markdown("<h2>🔥 AMAZON LIVE</h2>", unsafe_allow_html=True)
+        version = get_deals_store().latest_version()
+        if version is None:
+            st.info("⏳ Fırsat listesi henüz hazırlanmadı (python snapshots.py).")
+        else:
+            updated = datetime.strptime(version, "%Y%m%dT%H%M%SZ")
+            c2.caption(f"🕒 {updated:%d.%m %H:%M} UTC")
+            changes = get_deals_store().latest_changes()
+            if not changes.empty:
+                counts = changes["Değişim"].value_counts()
+                st.caption(f"🆕 {counts.get('Yeni', 0)} yeni  •  📉 {counts.get('Daha Derin', 0)} daha derin indirim  •  ⌛ {counts.get('Bitti', 0)} biten")
+
+        grid = get_deals_grid(version) if version is not None else None
+        if grid is not None and grid.size:
+            # Sıralama / filtre sunucuda; sadece seçili sayfanın kartları gönderilir (resimler lazy)
+            f1, f2, f3, f4 = st.columns([2, 2, 2, 3])
+            sort = f1.selectbox("Sırala", list(SORTS), key="deals_sort")
+            band = f2.selectbox("Fiyat Aralığı", list(PRICE_BANDS), key="deals_band")
+            min_discount = f3.slider("En Az İndirim (%)", 0, 90, 0, step=5, key="deals_min_discount")
+            types = f4.multiselect("Fırsat Türü", grid.type_options, format_func=lambda t: DEAL_TYPE_NAMES.get(t, t), key="deals_types")
+            countries = st.multiselect("Ülke", grid.country_options, key="deals_countries") if len(grid.country_options) > 1 else ()
+
+            # Filtre ya da sürüm değişince ilk sayfaya dön
+            signature = (version, sort, band, min_discount, tuple(types), tuple(countries))
+            if st.session_state.get("deals_signature") != signature:
+                st.session_state.deals_signature = signature
+                st.session_state.deals_page = 1
+            page = st.session_state.get("deals_page", 1)
+            page_html, total, pages = grid.page(page, sort, min_discount, band, types, countries)
+            page = min(page, pages)
+
+            st.caption(f"{total} fırsat  •  Sayfa {page} / {pages}")
+            st.markdown(page_html, unsafe_allow_html=True)
+            p1, p2, p3 = st.columns([1, 4, 1])
+            if p1.button("◀ Önceki", disabled=page <= 1, key="deals_prev"):
+                st.session_state.deals_page = page - 1
+                st.rerun()
+            if p3.button("Sonraki ▶", disabled=page >= pages, key="deals_next"):
+                st.session_state.deals_page = page + 1
+                st.rerun()
+
+    # --- FİYAT ALARMI ---
+    elif menu == "FİYAT ALARMI":
+        st.markdown("<h2>🔔 E-POSTA ALARMI</h2>", unsafe_allow_html=True)
+        c1, c2 = st.columns(2)
+        prod_name = c1.text_input("Takip Edilecek Ürün", placeholder="Örn: iPhone 16")
+        target_p = c2.number_input("Hedef Fiyat (TL)", min_value=1)
+        user_mail = st.text_input("E-Posta Adresiniz")
+
+        if st.button("TAKİBİ BAŞLAT 🚀", key="btn_alarm_start"):
+            if user_mail and prod_name:
+                get_watchlist().add(prod_name, target_p, user_mail)
+                st.success(f"✅ {prod_name} için takip başladı. {user_mail} adresine bildirim gönderilecek.")
+            else: st.error("Lütfen tüm alanları doldurun.")
+
+        # Kayıtlı alarmlar (fiyat kontrolü arka plandaki alarm işçisinde yapılır)
+        if user_mail:
+            alarms = get_watchlist().list(email=user_mail)
+            if not alarms.empty:
+                st.markdown("### 📋 Alarmlarım")
+                alarms["Durum"] = alarms["active"].map({1: "⏳ Takipte", 0: "✅ Yakalandı"})
+                st.dataframe(alarms[['query', 'target', 'triggered_price', 'Durum']], hide_index=True, use_container_width=True,
+                             column_config={
+                                 "query": "Ürün",
+                                 "target": st.column_config.NumberColumn("Hedef", format="%.2f TL"),
+                                 "triggered_price": st.column_config.NumberColumn("Yakalanan", format="%.2f TL")
+                             })
+
+    # --- SİSTEM (Metrikler: kaynak gecikmeleri, HTTP, önbellek, filtreler, rerun süreleri) ---
+    elif menu == "SİSTEM":
+        st.markdown("<h2>🛠️ SİSTEM</h2>", unsafe_allow_html=True)
+        counters, histograms = metrics.snapshot()
+        counters, histograms = pd.DataFrame(counters), pd.DataFrame(histograms)
+
+        def by_metric(frame, name, label):
+            if frame.empty: return frame
+            rows = frame[frame["metrik"] == name]
+            return rows.assign(**{label: rows["etiketler"].map(lambda d: ", ".join(f"{k}={v}" for k, v in d.items()))})
+
+        def counter_value(name, **labels):
+            if counters.empty: return 0
+            rows = counters[(counters["metrik"] == name) & counters["etiketler"].map(lambda d: all(d.get(k) == v for k, v in labels.items()))]
+            return rows["değer"].sum()
+
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Önbellek İsabet", f"%{counter_value('ghostdeal_cache_hit_ratio') * 100:.0f}")
+        c2.metric("HTTP İstek", int(counter_value("ghostdeal_http_requests_total")))
+        c3.metric("HTTP Tekrar", int(counter_value("ghostdeal_http_retries_total")))
+        c4.metric("Hata", int(counter_value("ghostdeal_errors_total")))
+
+        timing_cols = ["Seri", "adet", "ort_ms", "p50_ms", "p95_ms"]
+        timing_config = {c: st.column_config.NumberColumn(format="%.0f") for c in ("ort_ms", "p50_ms", "p95_ms")}
+        st.markdown("### ⏱️ Kaynak ve Aşama Süreleri")
+        timings = pd.concat([by_metric(histograms, "ghostdeal_source_latency_seconds", "Seri"),
+                             by_metric(histograms, "ghostdeal_stage_seconds", "Seri")])
+        if timings.empty: st.caption("Henüz arama yapılmadı.")
+        else: st.dataframe(timings[timing_cols], hide_index=True, use_container_width=True, column_config=timing_config)
+
+        st.markdown("### 🖥️ Sayfa Rerun Süreleri")
+        reruns = by_metric(histograms, "ghostdeal_rerun_seconds", "Seri")
+        if not reruns.empty: st.dataframe(reruns[timing_cols], hide_index=True, use_container_width=True, column_config=timing_config)
+
+        l, r = st.columns(2)
         with l:
-            c1, c2 = st.columns(2)
-            with c1: render_dashboard_card("En İyi Fiyat", format_tl(best_p), "💎")
-            with c2: render_dashboard_card("Piyasa Ort.", format_tl(avg_p), "⚖️")
-            st.write(""); plot_ghost_gauge(g_score)
-            if st.button("✨ YZ Analizi Başlat", use_container_width=True, key="ai_dash"):
-                if HAS_AI:
-                    genai.configure(api_key=GEMINI_API_KEY)
-                    model = genai.GenerativeModel('gemini-1.5-flash')
-                    res = model.generate_content(f"Ürün: {query}, Fiyat: {best_p}. Bu fiyata alınır mı? Kısa cevap.")
-                    st.info(f"🤖 {res.text}")
-        with r: plot_neon_prediction(df, avg_p)
-        
-        st.markdown("### 📋 Teklif Listesi")
-        st.dataframe(df[['Resim', 'Ürün', 'Fiyat', 'Satıcı', 'Link']], hide_index=True, use_container_width=True, 
-                     column_config={
-                         "Resim": st.column_config.ImageColumn("Görsel"), 
-                         "Link": st.column_config.LinkColumn("Git", display_text="Mağazaya Git ↗"),
-                         "Fiyat": st.column_config.NumberColumn(format="%.2f TL")
-                     })
-        
-        # --- YENİ: PROFESYONEL EXCEL ÇIKTISI ---
-        df_xlsx = to_excel(df)
-        st.download_button(
-            label="📥 Profesyonel Rapor İndir (.xlsx)",
-            data=df_xlsx,
-            file_name=f'GhostDeal_{query}.xlsx',
-            mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-
-# --- AMAZON VİTRİN ---
-elif menu == "AMAZON VİTRİN":
-    c1, c2 = st.columns([4,1])
-    c1.markdown("<h2>🔥 AMAZON LIVE</h2>", unsafe_allow_html=True)
-    curr = time.time()
-    last = st.session_state.get('last_amz', 0)
-    if curr - last < 3600:
-        c2.warning(f"⏳ {int((3600-(curr-last))/60)} dk")
-    else:
-        if c2.button("BAŞLAT 🚀", key="btn_amz_start"):
-            st.session_state.last_amz = curr
-            st.session_state.deals = cached_deals(RAPID_API_KEY)
-            st.rerun()
-
-    if 'deals' in st.session_state and not st.session_state.deals.empty:
-        df_deals = st.session_state.deals
-        cols = st.columns(4)
-        for i, row in df_deals.iterrows():
-            with cols[i % 4]:
-                st.markdown(f"""
-                <div class="deal-card">
-                    <span class="discount-badge">-{row['İndirim_Yazisi']}</span>
-                    <img src="{row['Resim']}" style="width:100%; height:150px; object-fit:contain;">
-                    <div style="margin-top:10px; font-weight:bold; color:white; height: 45px; overflow: hidden;">{row['Ürün'][:45]}...</div>
-                    <div style="font-size:1.4rem; color:#4ade80; font-weight:900;">{format_tl(row['Fiyat'])}</div>
-                    <div style="text-decoration:line-through; color:#666; font-size:0.8rem;">{format_tl(row['Eski Fiyat'])}</div>
-                    <a href="{row['Link']}" target="_blank" style="display:block; text-align:center; background:#8b5cf6; color:white; padding:8px; border-radius:5px; margin-top:10px; text-decoration:none;">İNCELE</a>
-                </div><br>""", unsafe_allow_html=True)
-
-# --- FİYAT ALARMI ---
-elif menu == "FİYAT ALARMI":
-    st.markdown("<h2>🔔 E-POSTA ALARMI</h2>", unsafe_allow_html=True)
-    c1, c2 = st.columns(2)
-    prod_name = c1.text_input("Takip Edilecek Ürün", placeholder="Örn: iPhone 16")
-    target_p = c2.number_input("Hedef Fiyat (TL)", min_value=1)
-    user_mail = st.text_input("E-Posta Adresiniz")
-    
-    if st.button("TAKİBİ BAŞLAT 🚀", key="btn_alarm_start"):
-        if user_mail and prod_name:
-            st.success(f"✅ {prod_name} için takip başladı. {user_mail} adresine bildirim gönderilecek.")
-            st.session_state.monitoring = True
-            while st.session_state.monitoring:
-                res_df = cached_search(prod_name, SERP_API_KEY, RAPID_API_KEY)
-                clean_df = filter_irrelevant_products(res_df, prod_name)
-                if not clean_df.empty:
-                    current_best = clean_df['Fiyat'].min()
-                    if current_best <= target_p:
-                        send_email_alert(user_mail, prod_name, format_tl(current_best), clean_df.iloc[0]['Link'])
-                        st.balloons()
-                        st.success("🎉 HEDEF YAKALANDI!")
-                        break
-                time.sleep(900)
-        else: st.error("Lütfen tüm alanları doldurun.")
-
-# ==========================================
-# 6. CANLI BORSA ŞERİDİ (TICKER)
-# ==========================================
-st.markdown(f"""
+            st.markdown("### 📡 Kaynak / HTTP Durumları")
+            for name in ("ghostdeal_source_results_total", "ghostdeal_http_responses_total", "ghostdeal_errors_total"):
+                rows = by_metric(counters, name, "Seri")
+                if not rows.empty: st.dataframe(rows[["metrik", "Seri", "değer"]], hide_index=True, use_container_width=True)
+        with r:
+            st.markdown("### 🧹 Filtrelerde Elenen Satırlar")
+            drops = by_metric(counters, "ghostdeal_filter_dropped_rows_total", "Seri")
+            if not drops.empty:
+                st.caption(f"Giren satır: {int(counter_value('ghostdeal_filter_input_rows_total'))}")
+                st.dataframe(drops[["Seri", "değer"]], hide_index=True, use_container_width=True)
+
+        st.markdown("### 💳 API Bütçesi")
+        st.dataframe(pd.DataFrame(budget_status()), hide_index=True, use_container_width=True,
+                     column_config={"allowance": st.column_config.NumberColumn("Bugünkü Pay", format="%.0f")})
+
+        with st.expander("Prometheus çıktısı"):
+            text = metrics.render()
+            st.code(text, language="text")
+            st.download_button("📥 metrics.txt", data=text, file_name="ghostdeal_metrics.txt", mime="text/plain")
+
+    # ==========================================
+    # 6. CANLI BORSA ŞERİDİ (TICKER)
+    # ==========================================
+    st.markdown(f"""
 <div class="ticker-wrap">
     <div class="ticker">
         <div class="ticker-item">GHOSTDEAL LIVE 🟢</div>
@@ -428,3 +552,5 @@ st.markdown(f"""
     </div>
 </div>
 """, unsafe_allow_html=True)
+finally:
+    metrics.observe("ghostdeal_rerun_seconds", time.perf_counter() - _rerun_started, page=menu)
@@ -0,0 +1,61 @@
+import json
+import os
+import re
+
+from engine import http_get
+
+# --- YEREL VARLIKLAR (Lottie + fontlar) ---
+# Lottie JSON'ları assets/ altında, fontlar Streamlit'in statik klasöründe (static/ -> app/static/) durur.
+# Eksikse ilk kullanımda (Lottie) veya `python assets.py` ile (Lottie + fontlar) indirilip kaydedilir.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.path.join(BASE_DIR, "assets")
+FONTS_DIR = os.path.join(BASE_DIR, "static", "fonts")
+FONTS_CSS = os.path.join(FONTS_DIR, "fonts.css")
+
+LOTTIES = {
+    "cart": "https://assets10.lottiefiles.com/packages/lf20_6wjmecxo.json",
+}
+GOOGLE_FONTS_URL = "https://fonts.googleapis.com/css2?family=Inter:wght@400;600&family=Orbitron:wght@500;700;900&display=swap"
+# woff2 döndürmesi için modern bir tarayıcı kimliği
+FONT_UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+def load_lottie(name):
+    """Yerel Lottie JSON'ı okur; yoksa bir kez indirip assets/ altına kaydeder. Alınamazsa None."""
+    path = os.path.join(ASSETS_DIR, f"lottie_{name}.json")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f: return json.load(f)
+    try:
+        r = http_get(LOTTIES[name], retries=1)
+        if r.status_code != 200: return None
+        data = r.json()
+    except Exception: return None
+    try:
+        os.makedirs(ASSETS_DIR, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f: json.dump(data, f)
+    except OSError: pass
+    return data
+
+def font_css():
+    """Yerel @font-face tanımları; fontlar paketlenmemişse Google Fonts @import'u."""
+    if os.path.exists(FONTS_CSS):
+        with open(FONTS_CSS, encoding="utf-8") as f: return f.read()
+    return f"@import url('{GOOGLE_FONTS_URL}');"
+
+def bundle_fonts():
+    """Google Fonts CSS'ini ve woff2 dosyalarını static/fonts altına indirir, CSS'i yerel yollara çevirir."""
+    r = http_get(GOOGLE_FONTS_URL, headers={"User-Agent": FONT_UA})
+    r.raise_for_status()
+    css = r.text
+    os.makedirs(FONTS_DIR, exist_ok=True)
+    for i, url in enumerate(dict.fromkeys(re.findall(r"url\((https://[^)]+\.woff2)\)", css))):
+        name = f"font_{i}.woff2"
+        font = http_get(url)
+        font.raise_for_status()
+        with open(os.path.join(FONTS_DIR, name), "wb") as f: f.write(font.content)
+        css = css.replace(url, f"app/static/fonts/{name}")
+    with open(FONTS_CSS, "w", encoding="utf-8") as f: f.write(css)
+
+if __name__ == "__main__":
+    for name in LOTTIES: print(f"Lottie {name}: {'ok' if load_lottie(name) else 'alınamadı'}")
+    bundle_fonts()
+    print(f"Fontlar: {FONTS_CSS}")
@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from engine import cached_call, fan_out, match_products, offer_frame, seed_search
+
+# Barkod kütüphanesi kontrolü
+try:
+    from PIL import ImageOps
+    from pyzbar.pyzbar import decode, ZBarSymbol
+    HAS_BARCODE_LIB = True
+except Exception:
+    HAS_BARCODE_LIB = False
+
+# --- AYARLAR ---
+BARCODE_CACHE_PATH = os.environ.get("GHOSTDEAL_BARCODES", "ghostdeal_barcodes.sqlite3")
+MAX_SIDE = 800            # Kamera karesi bu boyuta küçültülür (px)
+ROI_BAND = (0.1, 0.25, 0.9, 0.75)   # Ortadaki bant (sol, üst, sağ, alt oranları): barkod genelde burada
+SKEW_ANGLES = (-12, 12)   # Eğik tutulmuş barkodlar için denenen açılar
+SYMBOLS = [ZBarSymbol.EAN13, ZBarSymbol.EAN8, ZBarSymbol.UPCA, ZBarSymbol.UPCE, ZBarSymbol.CODE128] if HAS_BARCODE_LIB else None
+
+# --- OKUMA (Ön işleme + ucuzdan pahalıya deneme merdiveni) ---
+def _prepare(image):
+    gray = ImageOps.grayscale(image)
+    gray.thumbnail((MAX_SIDE, MAX_SIDE))
+    return gray
+
+def _threshold(gray):
+    return ImageOps.autocontrast(gray, cutoff=2).point(lambda p: 255 if p > 128 else 0)
+
+def _ladder(gray):
+    # İlk adım en ucuzu; sonrakiler sadece önceki başarısız olursa üretilir
+    w, h = gray.size
+    l, t, r, b = ROI_BAND
+    yield "roi", gray.crop((int(w * l), int(h * t), int(w * r), int(h * b)))
+    yield "tam", gray
+    yield "eşik", _threshold(gray)
+    for angle in SKEW_ANGLES: yield f"döndür{angle:+d}", gray.rotate(angle, expand=True, fillcolor=255)
+    yield "döndür90", gray.rotate(90, expand=True)
+
+def read_barcode(image):
+    """PIL görüntüsünden barkodu okur: (kod, adım_adı) ya da (None, None)."""
+    gray = _prepare(image)
+    for step, variant in _ladder(gray):
+        decoded = decode(variant, symbols=SYMBOLS)
+        if decoded: return decoded[0].data.decode("utf-8"), step
+    return None, None
+
+# --- EAN -> ÜRÜN ADI ÖNBELLEĞİ (Kalıcı, SQLite) ---
+class BarcodeCache:
+    """Okunan barkodun hangi ürün başlığına karşılık geldiğini saklar; tekrar taramada başlıkla aranır."""
+    def __init__(self, path=BARCODE_CACHE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS barcodes (
+                code TEXT PRIMARY KEY, title TEXT NOT NULL, hits INTEGER NOT NULL DEFAULT 0, updated REAL NOT NULL)""")
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, code):
+        conn = self._conn()
+        row = conn.execute("SELECT title FROM barcodes WHERE code = ?", (code,)).fetchone()
+        if row is None: return None
+        conn.execute("UPDATE barcodes SET hits = hits + 1 WHERE code = ?", (code,))
+        return row[0]
+
+    def remember(self, code, title):
+        self._conn().execute("INSERT OR REPLACE INTO barcodes (code, title, hits, updated) VALUES (?, ?, 0, ?)",
+                             (code, title, time.time()))
+
+def representative_title(df):
+    """En çok teklifi olan ürün grubunun en kısa başlığı (satıcı ekleri en az olan)."""
+    if df.empty: return None
+    groups = df["Ürün_Grubu"] if "Ürün_Grubu" in df else pd.Series(match_products(df["Ürün"]), index=df.index)
+    top = groups.value_counts().idxmax()
+    titles = df.loc[groups == top, "Ürün"].dropna().astype(str)
+    return min(titles, key=len) if not titles.empty else None
+
+def barcode_offers(code, serp_key, rapid_key):
+    """Barkodla (filtresiz) bulunan teklifler; kaynak durumları df.attrs içinde."""
+    rows, status = [], {}
+    for name, batch, state in fan_out(code, {"Google": serp_key, "Amazon": rapid_key}):
+        rows += batch
+        status[name] = state
+    df = offer_frame(rows)
+    df.attrs["source_status"] = status
+    return df
+
+def lookup_barcode(code, serp_key, rapid_key, cache):
+    """Barkodu ürün adına çevirir: (başlık ya da None, kaynak_durumları).
+
+    Önce kalıcı önbelleğe bakılır (durum sözlüğü boş döner), yoksa kaynaklarda bir kez (filtresiz) aranır.
+    Barkod araması sonuç önbelleği ve tekil uçuştan geçer. Bulunan teklifler çözülen başlığın arama
+    sonucu olarak da önbelleğe yazılır: ardından başlıkla yapılan arama upstream'e tekrar gitmez.
+    """
+    title = cache.lookup(code)
+    if title: return title, {}
+    offers = cached_call(f"barcode:{code}", barcode_offers, code, serp_key, rapid_key)
+    title = representative_title(offers)
+    if title:
+        cache.remember(code, title)
+        seed_search(title, offers)
+    return title, offers.attrs.get("source_status", {})
+
+def resolve_barcode(code, serp_key, rapid_key, cache):
+    """Barkodu ürün adına çevirir (bkz. lookup_barcode); bulunamazsa None."""
+    return lookup_barcode(code, serp_key, rapid_key, cache)[0]
@@ -0,0 +1,227 @@
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from barcode import BarcodeCache, lookup_barcode
+from engine import SEARCH_CONCURRENCY, cache_stats, cached_search_all, http_stats, load_secrets
+
+# --- AYARLAR ---
+BATCH_WORKERS = 4          # Aynı anda çalışan sorgu (her sorgu her kaynağın havuzunda bir iş açar)
+# Üst sınır: kaynak havuzlarını aşan sorgular kuyrukta beklerken aramanın toplam süresini harcar
+MAX_WORKERS = SEARCH_CONCURRENCY
+ANSWERED = ("ok", "empty")  # Bu durumlar dışındaki kaynak sonuçları (budget / timeout / error) tekrar denenir
+PARQUET_FLUSH_ROWS = 5000  # Parquet çıktısında bir parça dosyasına yazılan satır eşiği
+PROGRESS_EVERY = 50        # Kaç sorguda bir ilerleme satırı basılır
+OUTPUT_COLUMNS = ["query", "input", "product", "price", "seller", "source", "link", "image", "group", "ts"]
+_BARCODE_RE = re.compile(r"^\d{8}$|^\d{12,14}$")
+
+# --- GİRDİ ---
+def read_inputs(path):
+    """Satır başına bir sorgu ya da barkod; boş satırlar ve # yorumları atlanır, tekrarlar tek sayılır."""
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with stream:
+        lines = (line.strip() for line in stream)
+        return list(dict.fromkeys(line for line in lines if line and not line.startswith("#")))
+
+def is_barcode(text):
+    return bool(_BARCODE_RE.match(text))
+
+def answered(df):
+    """En az bir kaynak gerçekten yanıt verdiyse (ok / empty) True; sadece bunlar kontrol noktasına yazılır."""
+    return any(v["status"] in ANSWERED for v in df.attrs.get("source_status", {}).values())
+
+# --- KONTROL NOKTASI (Yarıda kalan iş kaldığı yerden sürer) ---
+class Checkpoint:
+    """Tamamlanan girdileri satır satır ekleyen dosya. Bir girdi, satırları çıktıya yazıldıktan sonra işaretlenir
+    (en az bir kez): çökme bu iki adım arasına denk gelirse o girdi tekrar çalışır."""
+    def __init__(self, path=None):
+        self.path = path
+        self.done = set()
+        self._file = None
+        if path is None: return
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f: self.done = {line.rstrip("\n") for line in f if line.strip()}
+        self._file = open(path, "a", encoding="utf-8")
+
+    def mark(self, items):
+        self.done.update(items)
+        if self._file is None: return
+        for item in items: self._file.write(item + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None: self._file.close()
+
+# --- ÇIKTI ---
+def to_records(item, query, df, ts):
+    """search_all_sources çıktısını sabit şemalı kayıtlara çevirir."""
+    if df.empty: return []
+    group = df["Ürün_Grubu"] if "Ürün_Grubu" in df else pd.Series(None, index=df.index)
+    out = pd.DataFrame({
+        "query": query, "input": item, "product": df["Ürün"].astype(str).to_numpy(),
+        "price": df["Fiyat"].to_numpy(dtype=float), "seller": df["Satıcı"].astype(str).to_numpy(),
+        "source": df["Kaynak"].astype(str).to_numpy(), "link": df["Link"].to_numpy(),
+        "image": df["Resim"].to_numpy() if "Resim" in df else None, "group": group.to_numpy(), "ts": ts})
+    return out[OUTPUT_COLUMNS].to_dict("records")
+
+class JsonlWriter:
+    """Her girdinin satırları geldiği anda dosyaya eklenir; kontrol noktası hemen ardından işaretlenir."""
+    def __init__(self, path, checkpoint):
+        self._file = sys.stdout if path == "-" else open(path, "a", encoding="utf-8")
+        self._checkpoint = checkpoint
+
+    def write(self, item, records):
+        for rec in records: self._file.write(json.dumps(rec, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+        self._checkpoint.mark([item])
+
+    def close(self):
+        if self._file is not sys.stdout: self._file.close()
+
+class ParquetWriter:
+    """Satırları biriktirip eşik aşılınca çıktı klasörüne yeni bir parça dosyası yazar.
+    Kontrol noktası sadece dosyası diske inen girdiler için işaretlenir."""
+    def __init__(self, directory, checkpoint, flush_rows=PARQUET_FLUSH_ROWS):
+        self.directory = directory
+        self.flush_rows = flush_rows
+        self._checkpoint = checkpoint
+        self._rows, self._items = [], []
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, item, records):
+        self._rows += records
+        self._items.append(item)
+        if len(self._rows) >= self.flush_rows: self.flush()
+
+    def flush(self):
+        if not self._items: return
+        if self._rows:
+            name = f"part-{int(time.time() * 1000)}.parquet"
+            tmp = os.path.join(self.directory, f".{name}.tmp")
+            pd.DataFrame(self._rows, columns=OUTPUT_COLUMNS).to_parquet(tmp, index=False)
+            os.replace(tmp, os.path.join(self.directory, name))
+        self._checkpoint.mark(self._items)
+        self._rows, self._items = [], []
+
+    def close(self):
+        self.flush()
+
+# --- ÇALIŞTIRMA ---
+class BatchRunner:
+    """Girdileri sınırlı bir havuzda cached_search_all'dan geçirir; sonuçlar bittikçe yazıcıya akar.
+
+    Aynı normalize sorgu paylaşımlı önbellek ve tekil uçuş sayesinde upstream'e bir kez gider.
+    """
+    def __init__(self, secrets, writer, workers=BATCH_WORKERS, barcode_cache=None):
+        self.serp_key = secrets.get("SERP_API_KEY")
+        self.rapid_key = secrets.get("RAPID_API_KEY")
+        self.writer = writer
+        self.workers = min(workers, MAX_WORKERS)
+        self.barcode_cache = barcode_cache
+        self.stats = {"done": 0, "failed": 0, "rows": 0, "unresolved": 0}
+
+    def _resolve(self, item):
+        """(sorgu ya da None, barkod aramasının kaynak durumları)."""
+        if not is_barcode(item) or self.barcode_cache is None: return item, {}
+        return lookup_barcode(item, self.serp_key, self.rapid_key, self.barcode_cache)
+
+    def _run_one(self, item):
+        query, status = self._resolve(item)
+        if not query:
+            # Çözülemeyen barkod: kaynak durumları taşınır, hiçbiri yanıt vermediyse girdi tekrar denenir
+            df = pd.DataFrame()
+            df.attrs["source_status"] = status
+            return item, None, df
+        # Sadece taze kayıt: çıktıdaki ts alınma zamanıdır, bayat (CACHE_STALE'e kadar eski) sonuç yazılmaz
+        return item, query, cached_search_all(query, self.serp_key, self.rapid_key, allow_stale=False)
+
+    def run(self, items, progress=PROGRESS_EVERY):
+        started = time.perf_counter()
+        before = cache_stats()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ghostdeal-batch") as pool:
+            pending = {}
+            queue = iter(items)
+            # Havuzu dolu tut ama tüm girdileri bir anda kuyruğa atma (bellek girdiden bağımsız kalır)
+            for item in queue:
+                pending[pool.submit(self._run_one, item)] = item
+                if len(pending) >= self.workers * 2: break
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    item = pending.pop(future)
+                    self._collect(item, future)
+                    nxt = next(queue, None)
+                    if nxt is not None: pending[pool.submit(self._run_one, nxt)] = nxt
+                    if progress and self.stats["done"] % progress == 0 and self.stats["done"]:
+                        print(self.report(started, before), file=sys.stderr)
+        return self.report(started, before)
+
+    def _collect(self, item, future):
+        try: item, query, df = future.result()
+        except Exception as e:
+            # Hatalı girdi kontrol noktasına yazılmaz; sonraki çalıştırmada tekrar denenir
+            self.stats["failed"] += 1
+            print(f"Sorgu hatası ({item}): {e}", file=sys.stderr)
+            return
+        if not answered(df):
+            # Hiçbir kaynak yanıt vermedi (kota / zaman aşımı / hata; barkod çözümünde de): sonraki çalıştırmada tekrar denenir
+            self.stats["failed"] += 1
+            status = {k: v["status"] for k, v in df.attrs.get("source_status", {}).items()}
+            print(f"Kaynaklar yanıt vermedi ({item}): {status}", file=sys.stderr)
+            return
+        if query is None: self.stats["unresolved"] += 1
+        records = to_records(item, query, df, time.time()) if query else []
+        self.writer.write(item, records)
+        self.stats["done"] += 1
+        self.stats["rows"] += len(records)
+
+    def report(self, started, before):
+        elapsed = time.perf_counter() - started
+        cache = cache_stats()
+        delta = {k: cache[k] - before.get(k, 0) for k in ("hits", "stale_hits", "misses", "coalesced", "upstream_saved")}
+        rate = self.stats["done"] / elapsed if elapsed else 0.0
+        return (f"{self.stats['done']} sorgu ({self.stats['failed']} hata, {self.stats['unresolved']} çözülemeyen barkod), "
+                f"{self.stats['rows']} satır, {elapsed:.1f} sn, {rate:.2f} sorgu/sn | önbellek: {delta['hits']} taze, "
+                f"{delta['stale_hits']} bayat, {delta['misses']} kaçırma, {delta['coalesced']} paylaşılan -> "
+                f"{delta['upstream_saved']} upstream çağrısı kazanıldı | HTTP: {http_stats()}")
+
+def main():
+    parser = argparse.ArgumentParser(description="GhostDeal toplu arama (başsız, JSONL / Parquet çıktı)")
+    parser.add_argument("input", help="Satır başına bir sorgu ya da barkod içeren dosya ('-' = stdin)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL dosyası ('-' = stdout) ya da Parquet klasörü")
+    parser.add_argument("--format", choices=("jsonl", "parquet"), default="jsonl")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS,
+                        help=f"Aynı anda çalışan sorgu sayısı (en fazla {MAX_WORKERS})")
+    parser.add_argument("--checkpoint", help="Kontrol noktası dosyası (varsayılan: <çıktı>.checkpoint)")
+    parser.add_argument("--no-barcodes", action="store_true", help="Rakamlardan oluşan satırları barkod olarak çözme")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if args.format == "parquet" and args.output == "-": parser.error("Parquet çıktısı için --output klasörü gerekli")
+    if args.workers > MAX_WORKERS:
+        print(f"--workers {args.workers} motor havuzunu aşar, {MAX_WORKERS} kullanılıyor.", file=sys.stderr)
+    checkpoint_path = args.checkpoint or (f"{args.output}.checkpoint" if args.output != "-" else None)
+
+    checkpoint = Checkpoint(checkpoint_path)
+    items = [item for item in read_inputs(args.input) if item not in checkpoint.done]
+    skipped = len(checkpoint.done)
+    if skipped: print(f"Kontrol noktası: {skipped} girdi zaten tamamlanmış, atlanıyor.", file=sys.stderr)
+
+    writer = JsonlWriter(args.output, checkpoint) if args.format == "jsonl" else ParquetWriter(args.output, checkpoint)
+    runner = BatchRunner(load_secrets(), writer, workers=args.workers,
+                         barcode_cache=None if args.no_barcodes else BarcodeCache())
+    try: print(runner.run(items), file=sys.stderr)
+    finally:
+        writer.close()
+        checkpoint.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Barkod okuma: ham pyzbar (tam çözünürlük) ile ön işlemeli merdiven karşılaştırması.
+
+Kullanım: python benchmarks/bench_barcode.py <görüntü_klasörü>
+Klasördeki .jpg/.jpeg/.png dosyaları okunur; süre (medyan / p95), başarı oranı ve
+hangi merdiven adımında okunduğu raporlanır.
+"""
+import glob
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from pyzbar.pyzbar import decode
+
+from barcode import read_barcode
+
+def p95(values):
+    return sorted(values)[max(0, int(len(values) * 0.95) - 1)]
+
+def run(name, paths, fn):
+    times, ok = [], 0
+    for path in paths:
+        img = Image.open(path)
+        img.load()
+        t = time.perf_counter()
+        if fn(img): ok += 1
+        times.append(time.perf_counter() - t)
+    print(f"{name:10s} medyan {statistics.median(times) * 1000:7.1f} ms | p95 {p95(times) * 1000:7.1f} ms | "
+          f"başarı {ok}/{len(paths)} (%{ok / len(paths) * 100:.0f})")
+
+def main():
+    if len(sys.argv) < 2: sys.exit(__doc__)
+    paths = sorted(p for ext in ("jpg", "jpeg", "png") for p in glob.glob(os.path.join(sys.argv[1], f"*.{ext}")))
+    if not paths: sys.exit("Klasörde görüntü yok.")
+
+    run("ham", paths, lambda img: decode(img))
+    steps = Counter()
+    def pipeline(img):
+        code, step = read_barcode(img)
+        steps[step or "okunamadı"] += 1
+        return code
+    run("merdiven", paths, pipeline)
+    print("adımlar   ", ", ".join(f"{k}: {v}" for k, v in steps.most_common()))
+
+if __name__ == "__main__":
+    main()
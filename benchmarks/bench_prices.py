@@ -0,0 +1,53 @@
+"""clean_price (tek tek) ile parse_prices (vektörel) karşılaştırması.
+
+Kullanım: python benchmarks/bench_prices.py [adet]  (en iyi 3 ölçüm)
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import clean_price, parse_prices
+
+FORMATS = [
+    lambda v: f"{v:,.2f} TL".replace(",", "X").replace(".", ",").replace("X", "."),  # 1.234,56 TL
+    lambda v: f"${v:,.2f}",                                                          # $1,234.56
+    lambda v: f"{v:.2f}".replace(".", ","),                                          # 1234,56
+    lambda v: f"{v:.2f}",                                                            # 1234.56
+    lambda v: round(v, 2),                                                           # sayı
+    lambda v: "Fiyat yok",                                                           # okunamaz
+    lambda v: None,
+]
+REPEAT = 3
+
+def make_prices(n, seed=42):
+    rnd = random.Random(seed)
+    return [rnd.choice(FORMATS)(rnd.uniform(1, 250000)) for _ in range(n)]
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    prices = make_prices(n)
+    # Isınma: ilk çağrıdaki modül yükleme / regex derleme ölçüme girmesin
+    parse_prices(make_prices(100, seed=0))
+
+    t_scalar = t_vector = float("inf")
+    for _ in range(REPEAT):   # En iyi süre: arka plan gürültüsü tek ölçümü bozmasın
+        t0 = time.perf_counter()
+        scalar = [clean_price(p) for p in prices]
+        t_scalar = min(t_scalar, time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        vector, invalid = parse_prices(prices)
+        t_vector = min(t_vector, time.perf_counter() - t0)
+
+    mismatches = sum(1 for a, b in zip(scalar, vector) if abs(a - b) > 1e-9)
+    print(f"adet           : {n}")
+    print(f"clean_price    : {t_scalar * 1000:8.1f} ms")
+    print(f"parse_prices   : {t_vector * 1000:8.1f} ms  ({t_scalar / t_vector:.1f}x)")
+    print(f"okunamayan     : {int(invalid.sum())}")
+    print(f"farklı sonuç   : {mismatches}")
+
+if __name__ == "__main__":
+    main()
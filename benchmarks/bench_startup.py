@@ -0,0 +1,55 @@
+"""İçe aktarma (import) süreleri ve sayfa başına Streamlit yeniden çalıştırma (rerun) süreleri.
+
+Kullanım: python benchmarks/bench_startup.py [tekrar]
+Her modül temiz bir Python sürecinde ölçülür; rerun'lar streamlit.testing AppTest ile
+sahte anahtarlarla çalıştırılır (ağ çağrısı yapan arama / fırsat işlemleri tetiklenmez).
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["streamlit", "pandas", "engine", "plotly.graph_objects", "streamlit_lottie",
+           "PIL.Image", "pyzbar.pyzbar", "google.generativeai"]
+PAGES = ["DASHBOARD", "AMAZON VİTRİN", "FİYAT ALARMI"]
+FAKE_SECRETS = {"APP_PASSWORD": "x", "SERP_API_KEY": "x", "RAPID_API_KEY": "x", "GEMINI_API_KEY": "x"}
+
+def import_time(module):
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    return float(out.stdout.strip()) if out.returncode == 0 else None
+
+def rerun_times(repeat):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+    for k, v in FAKE_SECRETS.items(): at.secrets[k] = v
+    at.session_state["password_correct"] = True
+
+    t = time.perf_counter()
+    at.run()
+    results = {"ilk çalıştırma": [time.perf_counter() - t]}
+    for page in PAGES:
+        samples = []
+        for _ in range(repeat):
+            at.radio(key="main_nav").set_value(page)
+            t = time.perf_counter()
+            at.run()
+            samples.append(time.perf_counter() - t)
+        results[page] = samples
+    return results
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print("== İçe aktarma süreleri (temiz süreç) ==")
+    for module in MODULES:
+        t = import_time(module)
+        print(f"{module:24s} {'yok' if t is None else f'{t * 1000:8.1f} ms'}")
+    print("\n== Rerun süreleri ==")
+    for name, samples in rerun_times(repeat).items():
+        print(f"{name:24s} medyan {statistics.median(samples) * 1000:8.1f} ms  (n={len(samples)})")
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
@@ -0,0 +1,196 @@
+"""Anahtarsız, çevrimdışı performans takımı: yerel sahte API + filtre ve bellek ölçümleri.
+
+Kullanım:
+    python benchmarks/bench_suite.py [--latency 0.2] [--error-rate 0.05] [--queries 20]
+                                     [--fixtures klasör] [--out benchmarks/baseline.json]
+                                     [--compare eski_baseline.json] [--tolerance 0.25]
+
+Ölçülenler:
+    search_e2e     search_all_sources uçtan uca süre (p50 / p95 / ortalama, ms)
+    deals_e2e      get_amazon_deals (TR) uçtan uca süre
+    filters        smart_clean_results / filter_irrelevant_products: 100 / 1k / 10k satırda satır/sn
+    memory         sonuç kümesi başına bellek (DataFrame deep bytes, satır başına bytes)
+Sonuç JSON olarak yazılır; --compare verilirse eskisine göre tolerans dışı gerileme varsa çıkış kodu 1'dir.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+import engine
+from engine import filter_irrelevant_products, get_amazon_deals, search_all_sources, smart_clean_results
+from mock_api import MockApiServer, synthetic_search, synthetic_shopping
+
+QUERIES = ["iphone 13", "samsung galaxy s23", "airpods pro 2", "dyson v15", "ps5", "macbook air m2",
+           "xiaomi redmi note 12", "logitech mx master 3", "kindle paperwhite", "sony wh-1000xm5"]
+FILTER_SIZES = (100, 1_000, 10_000)
+DEFAULT_OUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+def summarize(samples):
+    ms = [s * 1000 for s in samples]
+    return {"n": len(ms), "p50_ms": round(statistics.median(ms), 2), "p95_ms": round(percentile(ms, 0.95), 2),
+            "mean_ms": round(statistics.fmean(ms), 2)}
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True).sum()) if not df.empty else 0
+
+# --- Uçtan uca (sahte sunucu üzerinden) ---
+def bench_search(queries):
+    samples, rows, statuses, sizes = [], [], {}, []
+    for q in queries:
+        t = time.perf_counter()
+        df = search_all_sources(q, "bench", "bench")
+        samples.append(time.perf_counter() - t)
+        rows.append(len(df))
+        sizes.append(frame_bytes(df))
+        for name, state in df.attrs.get("source_status", {}).items():
+            key = f"{name}:{state['status']}"
+            statuses[key] = statuses.get(key, 0) + 1
+    out = summarize(samples)
+    out.update({"rows_mean": round(statistics.fmean(rows), 1), "source_status": statuses,
+                "bytes_per_result_set": int(statistics.fmean(sizes))})
+    return out
+
+def bench_deals(repeat):
+    samples, rows = [], 0
+    for _ in range(repeat):
+        t = time.perf_counter()
+        df = get_amazon_deals("bench", "TR")
+        samples.append(time.perf_counter() - t)
+        rows = len(df)
+    out = summarize(samples)
+    out.update({"rows": rows, "bytes": frame_bytes(df)})
+    return out
+
+# --- Filtreler (ağsız) ---
+def make_frame(n, query="iphone 13"):
+    """Kaynak fonksiyonlarının ürettiği şekilde n satırlık sonuç kümesi (sentetik yüklerden)."""
+    rows = []
+    seed = 0
+    while len(rows) < n:
+        serp = synthetic_shopping(query, n=100, seed=seed)["shopping_results"]
+        rapid = synthetic_search(query, n=100, seed=seed)["data"]["products"]
+        prices, _ = engine.parse_prices([i["price"] for i in serp] + [i["product_price"] for i in rapid])
+        for item, price in zip(serp, prices[:len(serp)]):
+            rows.append({"Ürün": item["title"], "Fiyat": price, "Satıcı": item["source"], "Link": item["link"],
+                         "Kaynak": "Google", "Resim": item["thumbnail"]})
+        for item, price in zip(rapid, prices[len(serp):]):
+            rows.append({"Ürün": item["product_title"], "Fiyat": price, "Satıcı": "Amazon TR",
+                         "Link": item["product_url"], "Kaynak": "Amazon", "Resim": item["product_photo"]})
+        seed += 1
+    return engine.offer_frame(rows[:n])
+
+def _throughput(fn, df, query, min_time=0.5):
+    fn(df, query)   # ısınma (regex derleme, lru_cache)
+    runs, t0 = 0, time.perf_counter()
+    while True:
+        fn(df, query)
+        runs += 1
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time: break
+    return {"ms_per_call": round(elapsed / runs * 1000, 3), "rows_per_s": int(len(df) * runs / elapsed)}
+
+def bench_filters(sizes=FILTER_SIZES, query="iphone 13"):
+    out = {}
+    for n in sizes:
+        df = make_frame(n, query)
+        out[str(n)] = {
+            "smart_clean_results": _throughput(smart_clean_results, df, query),
+            "filter_irrelevant_products": _throughput(filter_irrelevant_products, df, query),
+        }
+    return out
+
+def bench_memory(sizes=FILTER_SIZES, query="iphone 13"):
+    out = {}
+    for n in sizes:
+        total = frame_bytes(make_frame(n, query))
+        out[str(n)] = {"bytes": total, "bytes_per_row": round(total / n, 1)}
+    return out
+
+# --- Karşılaştırma ---
+# (yol, yön): "lower" = küçük olan iyi (süre, bellek), "higher" = büyük olan iyi (verim)
+TRACKED = [
+    (("search_e2e", "p50_ms"), "lower"), (("search_e2e", "p95_ms"), "lower"), (("deals_e2e", "p50_ms"), "lower"),
+    *[((("filters", str(n), f, "rows_per_s")), "higher")
+      for n in FILTER_SIZES for f in ("smart_clean_results", "filter_irrelevant_products")],
+    *[((("memory", str(n), "bytes_per_row")), "lower") for n in FILTER_SIZES],
+]
+
+def _get(d, path):
+    for k in path:
+        if not isinstance(d, dict) or k not in d: return None
+        d = d[k]
+    return d
+
+def compare(old, new, tolerance):
+    """Tolerans dışı gerilemeleri listeler: [(metrik, eski, yeni)]."""
+    regressions = []
+    for path, direction in TRACKED:
+        a, b = _get(old, path), _get(new, path)
+        if not a or b is None: continue
+        worse = b > a * (1 + tolerance) if direction == "lower" else b < a * (1 - tolerance)
+        if worse: regressions.append((".".join(path), a, b))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="GhostDeal çevrimdışı performans takımı")
+    parser.add_argument("--latency", type=float, default=0.2, help="Sahte API gecikmesi (sn)")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Sahte API 429/503 oranı")
+    parser.add_argument("--queries", type=int, default=len(QUERIES), help="Uçtan uca ölçülecek sorgu sayısı")
+    parser.add_argument("--deals-repeat", type=int, default=3)
+    parser.add_argument("--fixtures", help="Kaydedilmiş yanıt klasörü (bkz. mock_api.py)")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="Sonuç (baseline) JSON dosyası")
+    parser.add_argument("--compare", help="Karşılaştırılacak eski baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="İzin verilen gerileme oranı")
+    args = parser.parse_args()
+
+    queries = [QUERIES[i % len(QUERIES)] for i in range(args.queries)]
+    with MockApiServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                       fixtures=args.fixtures) as server:
+        server.attach()
+        search = bench_search(queries)
+        deals = bench_deals(args.deals_repeat)
+        mock_counts = dict(server.counts)
+
+    result = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "env": {"python": platform.python_version(), "pandas": pd.__version__, "machine": platform.machine()},
+        "config": {"latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate,
+                   "queries": len(queries), "fixtures": bool(args.fixtures)},
+        "search_e2e": search, "deals_e2e": deals,
+        "filters": bench_filters(), "memory": bench_memory(),
+        "mock_api": mock_counts, "http": engine.http_stats(),
+    }
+    with open(args.out, "w", encoding="utf-8") as f: json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print(f"search_e2e  p50 {search['p50_ms']} ms, p95 {search['p95_ms']} ms ({search['rows_mean']} satır)")
+    print(f"deals_e2e   p50 {deals['p50_ms']} ms ({deals['rows']} fırsat)")
+    for n, r in result["filters"].items():
+        print(f"filtre {n:>6} satır: smart_clean {r['smart_clean_results']['rows_per_s']:>10,} satır/sn | "
+              f"alaka {r['filter_irrelevant_products']['rows_per_s']:>10,} satır/sn | "
+              f"{result['memory'][n]['bytes_per_row']} B/satır")
+    print(f"Yazıldı: {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f: old = json.load(f)
+        regressions = compare(old, result, args.tolerance)
+        for metric, a, b in regressions: print(f"GERİLEME {metric}: {a} -> {b}")
+        if regressions: sys.exit(1)
+        print("Gerileme yok.")
+
+if __name__ == "__main__":
+    main()
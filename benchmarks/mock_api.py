@@ -0,0 +1,187 @@
+"""SerpApi ve RapidAPI (real-time-amazon-data) için yerel sahte sunucu.
+
+Kaydedilmiş yanıtları (shopping_results / products / deals) ayarlanabilir gecikme ve hata oranıyla
+yeniden oynatır. Kayıt klasörü verilmezse gerçek yanıt şeklinde sentetik yükler üretilir.
+
+Kayıt dosyaları (isteğe bağlı, --fixtures klasöründe):
+    serpapi_shopping.json   SerpApi google_shopping yanıtı ("shopping_results")
+    rapidapi_search.json    RapidAPI /search yanıtı ("data.products")
+    rapidapi_deals.json     RapidAPI /deals-v2 yanıtı ("data.deals")
+
+Kullanım (tek başına): python benchmarks/mock_api.py [--port 8765] [--latency 0.2] [--error-rate 0.05]
+Motoru bağlamak için: GHOSTDEAL_RAPID_URL=http://127.0.0.1:8765/rapid ve GHOSTDEAL_SERPAPI_URL=http://127.0.0.1:8765
+(ya da bu modüldeki MockApiServer.attach()).
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+BRANDS = ["Apple", "Samsung", "Xiaomi", "Huawei", "Oppo", "Lenovo", "Asus", "Sony", "Philips", "Bosch"]
+ITEMS = ["telefon", "tablet", "kulaklık", "laptop", "saat", "hoparlör", "süpürge", "kamera", "monitör", "klavye"]
+EXTRAS = ["128GB", "256GB", "Siyah", "Beyaz", "Pro", "Max", "Lite", "2023", "Plus", "Mini"]
+SELLERS = ["Hepsiburada", "Trendyol", "n11", "Teknosa", "MediaMarkt", "Vatan", "Amazon TR", "Pazarama"]
+DEALS_PER_PAGE = 30
+DEAL_PAGES = 5            # Bu sayfadan sonrası boş döner (ülke taraması erken durur)
+
+def _title(rnd, query):
+    extra = " ".join(rnd.sample(EXTRAS, 2))
+    if rnd.random() < 0.15: return f"{query} {rnd.choice(['Kılıf', 'Şarj Kablosu', 'Ekran Koruyucu'])}"
+    return f"{query} {extra}" if query else f"{rnd.choice(BRANDS)} {rnd.choice(ITEMS)} {extra}"
+
+def _tl(value):
+    return f"{value:,.2f} TL".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def synthetic_shopping(query, n=40, seed=0):
+    rnd = random.Random(f"serp:{query}:{seed}")
+    base = rnd.uniform(500, 60000)
+    return {"shopping_results": [{
+        "title": _title(rnd, query), "price": _tl(base * rnd.uniform(0.3, 1.4)), "source": rnd.choice(SELLERS),
+        "link": f"https://example.com/p/{i}", "thumbnail": f"https://example.com/i/{i}.jpg",
+    } for i in range(n)]}
+
+def synthetic_search(query, n=30, seed=0):
+    rnd = random.Random(f"rapid:{query}:{seed}")
+    base = rnd.uniform(500, 60000)
+    return {"status": "OK", "data": {"products": [{
+        "product_title": _title(rnd, query), "product_price": f"{base * rnd.uniform(0.3, 1.4):.2f}",
+        "product_url": f"https://amazon.example/dp/{i}", "product_photo": f"https://amazon.example/i/{i}.jpg",
+    } for i in range(n)]}}
+
+def synthetic_deals(country, page, seed=0):
+    # deals-v2 tutarları sayı olarak döner (arama sonuçlarındaki fiyatlar metindir)
+    if page > DEAL_PAGES: return {"status": "OK", "data": {"deals": []}}
+    rnd = random.Random(f"deals:{country}:{page}:{seed}")
+    deals = []
+    for i in range(DEALS_PER_PAGE):
+        old = rnd.uniform(100, 20000)
+        new = old * rnd.uniform(0.4, 0.98)
+        deals.append({
+            "deal_title": _title(rnd, ""), "deal_price": {"amount": round(new, 2)}, "list_price": {"amount": round(old, 2)},
+            "savings_percentage": int((1 - new / old) * 100), "deal_photo": f"https://amazon.example/d/{page}-{i}.jpg",
+            "deal_url": f"https://amazon.example/deal/{country}/{page}/{i}",
+            "deal_type": rnd.choice(["LIGHTNING_DEAL", "BEST_DEAL", "DEAL_OF_THE_DAY"])})
+    return {"status": "OK", "data": {"deals": deals}}
+
+def _load_fixture(directory, name):
+    if not directory: return None
+    path = os.path.join(directory, name)
+    if not os.path.exists(path): return None
+    with open(path, encoding="utf-8") as f: return json.load(f)
+
+class MockApiServer:
+    """Arka plan thread'inde çalışan sahte API sunucusu.
+
+    latency: istek başına taban gecikme (sn), jitter: buna eklenen rastgele (0..jitter) süre.
+    error_rate: bu olasılıkla 503 (yarısında 429 + Retry-After: retry_after) döner.
+    path_latency: yol -> gecikme (sn); verilen yollarda taban gecikmenin yerine geçer (takılan sağlayıcı).
+    """
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0, fixtures=None, seed=0,
+                 retry_after=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.path_latency = {}
+        self.seed = seed
+        self.fixtures = {name: _load_fixture(fixtures, f"{name}.json")
+                         for name in ("serpapi_shopping", "rapidapi_search", "rapidapi_deals")}
+        self.counts = {"requests": 0, "errors": 0}
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _decide(self):
+        with self._lock:
+            self.counts["requests"] += 1
+            delay = self.latency + self._rnd.uniform(0, self.jitter)
+            fail = self._rnd.random() < self.error_rate
+            if fail: self.counts["errors"] += 1
+            status = (429 if self._rnd.random() < 0.5 else 503) if fail else 200
+        return delay, status
+
+    def payload(self, path, params):
+        q = params.get("q") or params.get("query") or ""
+        if path == "/search":
+            return self.fixtures["serpapi_shopping"] or synthetic_shopping(q, seed=self.seed)
+        if path == "/rapid/search":
+            return self.fixtures["rapidapi_search"] or synthetic_search(q, seed=self.seed)
+        if path == "/rapid/deals-v2":
+            page = int(params.get("page", "1"))
+            recorded = self.fixtures["rapidapi_deals"]
+            if recorded is not None: return recorded if page <= DEAL_PAGES else {"status": "OK", "data": {"deals": []}}
+            return synthetic_deals(params.get("country", "TR"), page, seed=self.seed)
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive: istemcinin bağlantı havuzu da ölçülsün
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                delay, status = server._decide()
+                delay = server.path_latency.get(parsed.path, delay)
+                if delay: time.sleep(delay)
+                body = server.payload(parsed.path, params) if status == 200 else {"error": "mock failure"}
+                if body is None: status, body = 404, {"error": "unknown path"}
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if status == 429: self.send_header("Retry-After", str(server.retry_after))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args): pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def attach(self):
+        """Süreç içindeki motoru bu sunucuya yönlendirir (SerpApi + RapidAPI)."""
+        import engine
+        engine.RAPID_BASE_URL = f"{self.url}/rapid"
+        engine.SERPAPI_BASE_URL = self.url
+        # Sahte sunucuya giden çağrılar gerçek kota sayacına yazılmasın, bütçe ölçümü etkilemesin
+        engine._budget = engine.QuotaBudget(path=":memory:", quotas={})
+
+    def __enter__(self): return self.start()
+    def __exit__(self, *exc): self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="GhostDeal sahte SerpApi / RapidAPI sunucusu")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="İstek başına gecikme (sn)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Gecikmeye eklenen rastgele süre (sn)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="429/503 döndürme olasılığı")
+    parser.add_argument("--fixtures", help="Kaydedilmiş yanıt klasörü")
+    args = parser.parse_args()
+    server = MockApiServer(port=args.port, latency=args.latency, jitter=args.jitter,
+                           error_rate=args.error_rate, fixtures=args.fixtures)
+    print(f"Sahte API: {server.url} (RapidAPI: {server.url}/rapid)")
+    server._httpd.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import html
+import math
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from engine import format_tl
+
+# --- AYARLAR ---
+PAGE_SIZE = 24
+PRICE_BANDS = {                      # Etiket -> [alt, üst) TL
+    "Tümü": (0.0, math.inf),
+    "0 - 250 TL": (0.0, 250.0),
+    "250 - 1.000 TL": (250.0, 1000.0),
+    "1.000 - 5.000 TL": (1000.0, 5000.0),
+    "5.000 TL +": (5000.0, math.inf),
+}
+SORTS = {                            # Etiket -> (sütun, azalan mı)
+    "İndirim (yüksekten)": ("İndirim_Oranı", True),
+    "Fiyat (artan)": ("Fiyat", False),
+    "Fiyat (azalan)": ("Fiyat", True),
+}
+DEAL_TYPE_NAMES = {"LIGHTNING_DEAL": "⚡ Yıldırım", "BEST_DEAL": "🏷️ En İyi Fırsat", "DEAL_OF_THE_DAY": "📅 Günün Fırsatı"}
+
+CARD_TEMPLATE = """<div class="deal-card">
+    <span class="discount-badge">-{badge}</span>
+    <img src="{img}" loading="lazy" decoding="async" alt="" style="width:100%; height:150px; object-fit:contain;">
+    <div style="margin-top:10px; font-weight:bold; color:white; height: 45px; overflow: hidden;">{title}...</div>
+    <div style="font-size:1.4rem; color:#4ade80; font-weight:900;">{price}</div>
+    <div style="text-decoration:line-through; color:#666; font-size:0.8rem;">{old_price}</div>
+    <a href="{link}" target="_blank" rel="noopener" style="display:block; text-align:center; background:#8b5cf6; color:white; padding:8px; border-radius:5px; margin-top:10px; text-decoration:none;">İNCELE</a>
+</div>"""
+
+def render_card(row):
+    return CARD_TEMPLATE.format(
+        badge=html.escape(str(row["İndirim_Yazisi"])), img=html.escape(str(row["Resim"]), quote=True),
+        title=html.escape(str(row["Ürün"])[:45]), price=format_tl(row["Fiyat"]),
+        old_price=format_tl(row["Eski Fiyat"]), link=html.escape(str(row["Link"]), quote=True))
+
+# --- ÖNCEDEN ÇİZİLMİŞ FIRSAT IZGARASI ---
+class DealsGrid:
+    """Bir fırsat sürümünün kart HTML'leri ve sıralama / filtre dizileri (sürüm başına bir kez kurulur).
+
+    Her sıralama için sıra dizisi önceden hesaplanır; bir filtre + sıralama birleşimi için eşleşen sıra
+    bir kez bulunup saklanır. Sayfa değiştirmek sadece o dilimin kartlarını birleştirir (O(sayfa boyu)).
+    """
+    def __init__(self, version, df):
+        self.version = version
+        self.size = len(df)
+        self.cards = np.array([render_card(row) for row in df.to_dict("records")], dtype=object)
+        self.discount = df["İndirim_Oranı"].to_numpy(dtype=float) if self.size else np.zeros(0)
+        self.price = df["Fiyat"].to_numpy(dtype=float) if self.size else np.zeros(0)
+        types = df["Fırsat_Türü"] if "Fırsat_Türü" in df else pd.Series("DEAL", index=df.index)
+        countries = df["Ülke"] if "Ülke" in df else pd.Series("TR", index=df.index)
+        self.types = types.astype(str).to_numpy()
+        self.countries = countries.astype(str).to_numpy()
+        self.type_options = sorted(set(self.types))
+        self.country_options = sorted(set(self.countries))
+        # Kararlı sıralama: eşitlikte fırsat listesinin kendi sırası korunur
+        self._orders = {}
+        for label, (column, descending) in SORTS.items():
+            values = self.discount if column == "İndirim_Oranı" else self.price
+            self._orders[label] = np.argsort(-values if descending else values, kind="stable")
+        self.matching = lru_cache(maxsize=32)(self._matching)
+
+    def _matching(self, sort, min_discount, band, types, countries):
+        """Filtreye uyan kartların (sıralı) indeksleri; types / countries boşsa hepsi."""
+        low, high = PRICE_BANDS[band]
+        mask = (self.discount >= min_discount) & (self.price >= low) & (self.price < high)
+        if types: mask &= np.isin(self.types, types)
+        if countries: mask &= np.isin(self.countries, countries)
+        order = self._orders[sort]
+        return order[mask[order]]
+
+    def page(self, page, sort="İndirim (yüksekten)", min_discount=0, band="Tümü", types=(), countries=(),
+             page_size=PAGE_SIZE):
+        """(sayfa HTML'i, eşleşen fırsat sayısı, sayfa sayısı) döner; `page` 1'den başlar."""
+        idx = self.matching(sort, min_discount, band, tuple(sorted(types)), tuple(sorted(countries)))
+        pages = max(1, math.ceil(len(idx) / page_size))
+        page = min(max(1, page), pages)
+        chunk = self.cards[idx[(page - 1) * page_size:page * page_size]]
+        return f'<div class="deal-grid">{"".join(chunk)}</div>', len(idx), pages
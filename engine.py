@@ -1,8 +1,195 @@
 import requests
-from serpapi import GoogleSearch
+from requests.adapters import HTTPAdapter
 import pandas as pd
+import numpy as np
 import re
 import time
+import random
+import threading
+import os
+import calendar
+import pickle
+import sqlite3
+import sys
+import weakref
+import unicodedata
+import zlib
+import logging
+from collections import OrderedDict
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+import metrics
+
+from history import PriceHistory
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+
+log = logging.getLogger("ghostdeal.engine")
+
+def _report_error(component, message):
+    """Yakalanan hatayı loglar ve bileşen bazında sayar (yönetim sayfası / Prometheus)."""
+    log.warning(message)
+    metrics.inc("ghostdeal_errors_total", component=component)
+
+# --- AYARLAR (Streamlit dışı süreçler için) ---
+SECRET_NAMES = ("SERP_API_KEY", "RAPID_API_KEY", "GEMINI_API_KEY", "EMAIL_SENDER", "EMAIL_PASSWORD",
+                "SMTP_HOST", "SMTP_PORT", "SMTP_STARTTLS")
+
+def load_secrets():
+    """Önce .streamlit/secrets.toml, üzerine ortam değişkenleri (Streamlit ile aynı anahtar adları)."""
+    secrets = {}
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".streamlit", "secrets.toml")
+    if os.path.exists(path):
+        import tomllib
+        with open(path, "rb") as f: secrets.update(tomllib.load(f))
+    for name in SECRET_NAMES:
+        if os.environ.get(name): secrets[name] = os.environ[name]
+    return secrets
+
+# --- HTTP İSTEMCİSİ (ORTAK HAVUZ + KEEP-ALIVE) ---
+RAPID_HOST = "real-time-amazon-data.p.rapidapi.com"
+RAPID_BASE_URL = os.environ.get("GHOSTDEAL_RAPID_URL", f"https://{RAPID_HOST}")  # Yerel sahte sunucu için değiştirilebilir
+SERPAPI_BASE_URL = os.environ.get("GHOSTDEAL_SERPAPI_URL", "https://serpapi.com")
+HTTP_TIMEOUT = (3.05, 10)   # (bağlantı, okuma) sn
+HTTP_RETRIES = 3            # İlk denemeden sonra en fazla tekrar sayısı
+HTTP_BACKOFF = 0.5          # Geri çekilme tabanı (sn), her denemede 2 katı
+HTTP_MAX_WAIT = 30.0        # Retry-After ne derse desin en fazla bu kadar bekle
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+_http_lock = threading.Lock()
+_http_counters = {"requests": 0, "retries": 0, "failures": 0}
+
+def get_session():
+    """Süreç genelinde paylaşılan, bağlantı havuzlu requests.Session."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # max_retries=0: tekrar mantığı http_get'te (sayaçlar ve jitter için)
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+def _count(name, n=1):
+    with _http_lock: _http_counters[name] += n
+
+def _retry_delay(attempt, response=None):
+    # Sunucu Retry-After verdiyse ona uy, yoksa "full jitter" üstel geri çekilme
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit(): return min(float(retry_after), HTTP_MAX_WAIT)
+    return random.uniform(0, min(HTTP_BACKOFF * (2 ** attempt), HTTP_MAX_WAIT))
+
+def _attempt_timeout(timeout, deadline):
+    # Tek deneme de son tarihi aşmasın: (bağlantı, okuma) süreleri kalan süreye kırpılır
+    if deadline is None: return timeout
+    remaining = deadline - time.monotonic()
+    if remaining <= 0: raise requests.Timeout("Son tarih geçti, istek gönderilmedi")
+    if isinstance(timeout, tuple): return tuple(min(t, remaining) for t in timeout)
+    return min(timeout, remaining)
+
+def _past_deadline(deadline, delay):
+    return deadline is not None and time.monotonic() + delay >= deadline
+
+def http_get(url, headers=None, params=None, timeout=HTTP_TIMEOUT, retries=HTTP_RETRIES, deadline=None):
+    """Havuzlu GET. 429/5xx ve bağlantı hatalarında sınırlı sayıda, jitter'lı tekrar dener.
+
+    Son denemenin yanıtı (hatalı da olsa) döner; son denemedeki ağ hatası yükseltilir.
+    `deadline` (time.monotonic() zamanı) verilirse bekleme + tekrar onu aşacaksa denenmez,
+    o ana kadarki sonuç son deneme sayılır; her denemenin süresi de kalan süreye kırpılır.
+    """
+    session = get_session()
+    host = urlsplit(url).hostname
+    for attempt in range(retries + 1):
+        attempt_timeout = _attempt_timeout(timeout, deadline)
+        _count("requests")
+        try:
+            response = session.get(url, headers=headers, params=params, timeout=attempt_timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            metrics.inc("ghostdeal_http_responses_total", host=host, status=type(e).__name__)
+            delay = _retry_delay(attempt)
+            if attempt == retries or _past_deadline(deadline, delay):
+                _count("failures")
+                raise
+        else:
+            metrics.inc("ghostdeal_http_responses_total", host=host, status=response.status_code)
+            if response.status_code not in RETRY_STATUS: return response
+            delay = _retry_delay(attempt, response)
+            if attempt == retries or _past_deadline(deadline, delay):
+                _count("failures")
+                return response
+            response.close()
+        _count("retries")
+        time.sleep(delay)
+
+class TokenBucket:
+    """Basit jeton kovası: saniyede `rate` jeton dolar, en fazla `capacity` birikir (thread-safe)."""
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1, timeout=None):
+        """Jeton alınana kadar bekler; `timeout` içinde alınamazsa False döner."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait_s = (tokens - self._tokens) / self.rate
+            if deadline is not None and now + wait_s > deadline: return False
+            time.sleep(wait_s)
+
+# RapidAPI planındaki istek/sn sınırı (tüm RapidAPI çağrıları bu kovadan jeton alır)
+RAPIDAPI_RATE = float(os.environ.get("GHOSTDEAL_RAPIDAPI_RATE", "5"))
+_rapid_bucket = TokenBucket(RAPIDAPI_RATE)
+
+def rapid_get(path, api_key, params, deadline=None):
+    """RapidAPI (real-time-amazon-data) GET: kota + hız sınırı + havuzlu istemci.
+
+    `deadline` verilirse jeton beklemesi de ona kadar sürer; kota sadece gönderilecek istek için harcanır.
+    """
+    wait_s = None if deadline is None else max(0.0, deadline - time.monotonic())
+    if not _rapid_bucket.acquire(timeout=wait_s): raise requests.Timeout("RapidAPI hız sınırı: son tarih geçti")
+    spend_budget("rapidapi")
+    headers = {"X-RapidAPI-Key": api_key, "X-RapidAPI-Host": RAPID_HOST}
+    return http_get(f"{RAPID_BASE_URL}/{path}", headers=headers, params=params, deadline=deadline)
+
+# Süreç genelinde tek havuz (her aramada thread açıp kapatmayalım); fırsat sayfaları burada, aramalar kaynak havuzlarında
+POOL_WORKERS = 8
+_POOL = ThreadPoolExecutor(max_workers=POOL_WORKERS, thread_name_prefix="ghostdeal")
+
+def http_stats():
+    """İstek/tekrar sayaçları ve havuzdaki açılan / yeniden kullanılan bağlantı sayıları."""
+    with _http_lock: stats = dict(_http_counters)
+    opened = served = 0
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None: continue
+                opened += pool.num_connections
+                served += pool.num_requests
+    stats["connections_opened"] = opened
+    stats["connections_reused"] = max(0, served - opened)
+    return stats
+
+@metrics.collector
+def _http_metrics():
+    return [(f"ghostdeal_http_{name}_total", "counter", f"HTTP istemcisi: {name}", {}, value)
+            for name, value in http_stats().items()]
 
 # --- FİYAT TEMİZLEME ---
 def clean_price(price):
@@ -18,173 +205,1065 @@ def clean_price(price):
             else: clean = clean.replace(',', '')
         elif ',' in clean: clean = clean.replace(',', '.')
         return float(clean)
-    except: return 0.0
+    except (TypeError, ValueError): return 0.0
+
+_PRICE_NUMBER = r"\d+\.?\d*|\.\d+"   # Ayıraçlar düzeltildikten sonra geçerli sayı metni
+_is_instance = np.frompyfunc(isinstance, 2, 1)   # C seviyesinde eleman başına isinstance (Python lambda'sı yok)
+
+def _text_to_float(text):
+    # Geçerli olmayan metin (boş, birden çok nokta) NaN olur; to_numeric(errors='coerce')'dan çok daha hızlı
+    return text.where(text.str.fullmatch(_PRICE_NUMBER)).astype("float64").to_numpy()
+
+def parse_prices(values):
+    """clean_price'ın toplu (vektörel) hali: tüm sütunu tek geçişte float dizisine çevirir.
+
+    (fiyatlar, okunamayan_maske) döner. Okunamayan değerler fiyat dizisinde 0.0 olarak kalır
+    (clean_price ile aynı), hangileri olduğu maskeden okunur.
+    """
+    raw = pd.Series(values, dtype=object).to_numpy()
+    is_text = _is_instance(raw, str).astype(bool)
+    prices = np.full(len(raw), np.nan)
+    # Zaten sayı olan değerler (int/float, None) doğrudan alınır; metin işlemleri sadece metinlere uygulanır
+    if (~is_text).any(): prices[~is_text] = pd.to_numeric(pd.Series(raw[~is_text]), errors='coerce')
+    if is_text.any():
+        # Sadece rakam, nokta ve virgül kalsın
+        text = pd.Series(raw[is_text], dtype="str").str.replace(r'[^\d.,]+', '', regex=True)
+        dot, comma = text.str.find('.').to_numpy(), text.str.find(',').to_numpy()
+        both = (dot >= 0) & (comma >= 0)
+        # Format düzeltme: 1.000,00 ve 1000,5 -> virgül ondalık | 1,000.00 -> virgül binlik
+        eu = (both & (dot < comma)) | (~both & (comma >= 0))
+        us = both & (dot > comma)
+        plain = ~(eu | us)
+        # Her biçim sadece kendi satırlarında dönüştürülür
+        parsed = np.empty(len(text))
+        parsed[eu] = _text_to_float(text[eu].str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+        parsed[us] = _text_to_float(text[us].str.replace(',', '', regex=False))
+        parsed[plain] = _text_to_float(text[plain])
+        prices[is_text] = parsed
+    invalid = np.isnan(prices)
+    prices[invalid] = 0.0
+    return prices, invalid
+
+def format_tl(val):
+    return f"{val:,.2f} TL".replace(",", "X").replace(".", ",").replace("X", ".")
 
 # --- AKILLI TEMİZLİK (Aksesuar & Çöp Engelleyici) ---
-def smart_clean_results(df, query):
-    if df.empty: return df
-    
+FORBIDDEN_WORDS = ["kılıf", "case", "kapak", "silikon", "koruyucu", "cam", "jelatin", "askı", "tutucu", "stand", "kablo", "adaptör", "şarj"]
+PRICE_FLOOR_RATIO = 0.50  # Piyasa medyanının %50 altı çöptür
+
+_FORBIDDEN_RE = re.compile('|'.join(map(re.escape, FORBIDDEN_WORDS)), re.IGNORECASE)
+
+# Başlık ve sorgu aynı fonksiyonla küçültülür ("İ" -> "i"; aksi halde "İ".lower() "i" + birleşik nokta verir)
+def fold_titles(titles):
+    return titles.str.replace("İ", "i", regex=False).str.lower()
+
+def fold_case(text):
+    return fold_titles(pd.Series([text]).astype(str))[0]
+
+@lru_cache(maxsize=1024)
+def compile_query_filter(query):
+    """Sorguya özel desenleri bir kez derler: (yasaklı_kelime_deseni | None, sayı_deseni | None)."""
+    query_lower = fold_case(query)
+    # Kullanıcı özellikle aksesuar aradıysa yasaklı kelime filtresi uygulanmaz
+    forbidden = None if any(word in query_lower for word in FORBIDDEN_WORDS) else _FORBIDDEN_RE
+    # Sorgudaki her sayı başlıkta tam sayı olarak geçmeli ("17" -> "170" / "2017" eşleşmez)
+    query_numbers = list(dict.fromkeys(re.findall(r'\d+', query)))
+    numbers = None
+    if query_numbers:
+        numbers = re.compile(''.join(rf'(?=.*(?<!\d){num}(?!\d))' for num in query_numbers), re.DOTALL)
+    return forbidden, numbers
+
+def _row_masks(df, query):
+    """Satır bazlı filtreler: (yasaklı kelime içermiyor, sorgudaki sayılar geçiyor)."""
+    forbidden, numbers = compile_query_filter(query)
+    titles = df['Ürün']
+    words_ok = pd.Series(True, index=df.index)
+    numbers_ok = pd.Series(True, index=df.index)
     # 1. Yasaklı Kelime Filtresi (Örn: AirPods ararken Kılıf gelmesin)
-    forbidden_words = ["kılıf", "case", "kapak", "silikon", "koruyucu", "cam", "jelatin", "askı", "tutucu", "stand", "kablo", "adaptör", "şarj"]
-    query_lower = query.lower()
-    
-    # Eğer kullanıcı özellikle bu kelimeleri aramadıysa filtrele
-    if not any(word in query_lower for word in forbidden_words):
-        pattern = '|'.join(forbidden_words)
-        df = df[~df['Ürün'].str.lower().str.contains(pattern, na=False)]
-    
-    # 2. Fiyat Mantığı (Ortalamanın %50 altı çöptür)
-    if not df.empty:
-        market_price = df['Fiyat'].median()
-        threshold = market_price * 0.50 
-        df = df[df['Fiyat'] >= threshold]
-    
+    if forbidden is not None: words_ok = ~titles.str.contains(forbidden, na=False)
     # 3. Sayısal Eşleşme (17 ararken 13 gelmesin)
-    query_numbers = re.findall(r'\d+', query)
-    if query_numbers:
-        for num in query_numbers:
-            df = df[df['Ürün'].str.contains(num, case=False, na=False)]
-            
-    return df
+    if numbers is not None: numbers_ok = titles.str.contains(numbers, na=False)
+    return words_ok, numbers_ok
+
+def _price_floor_mask(df, keep):
+    """2. Fiyat Mantığı: `keep` satırlarının medyanına göre çok ucuz (çöp) olanları eler."""
+    if not keep.any(): return keep
+    prices = df['Fiyat'][keep]
+    # Aynı ürünün çok sayıda ilanı medyanı kaydırmasın: önce ürün başına medyan
+    if 'Ürün_Grubu' in df: prices = prices.groupby(df['Ürün_Grubu'][keep]).median()
+    return df['Fiyat'] >= prices.median() * PRICE_FLOOR_RATIO
+
+def _record_drops(rows_in, **dropped):
+    """Filtre aşamalarında elenen satır sayılarını metriklere yazar (aşama sırasıyla, çift sayım yok)."""
+    if rows_in: metrics.inc("ghostdeal_filter_input_rows_total", rows_in)
+    for stage, n in dropped.items():
+        if n: metrics.inc("ghostdeal_filter_dropped_rows_total", int(n), stage=stage)
+
+def smart_clean_mask(df, query):
+    """Yasaklı kelime, medyan fiyat tabanı ve sayısal eşleşmeyi tek bir boolean maskede birleştirir."""
+    words_ok, numbers_ok = _row_masks(df, query)
+    # Medyan, aksesuarlar elendikten sonra (sayısal eşleşmeden önce) hesaplanır
+    floor_ok = words_ok & _price_floor_mask(df, words_ok)
+    _record_drops(len(df), forbidden_word=(~words_ok).sum(), price_floor=(words_ok & ~floor_ok).sum(),
+                  number_mismatch=(floor_ok & ~numbers_ok).sum())
+    return floor_ok & numbers_ok
+
+def smart_clean_results(df, query):
+    if df.empty: return df
+    return df[smart_clean_mask(df, query)]
+
+# --- ALAKA FİLTRESİ (Sorgu / başlık kelime örtüşmesi) ---
+RELEVANCE_THRESHOLD = 0.5   # Sorgu kelimelerinin en az bu oranı başlıkta geçmeli
+
+def token_overlap_scores(titles, query):
+    """Her başlık için: sorgu kelimelerinden kaçı başlıkta geçiyor / sorgu kelime sayısı.
+
+    Satır satır döngü yerine başlıklar tek seferde kelimelere açılır (explode) ve sayılır.
+    """
+    q_words = set(fold_case(query).split())
+    n = len(titles)
+    if not q_words or n == 0: return np.zeros(n)
+    titles = pd.Series(np.asarray(titles, dtype=object)).astype(str)
+    tokens = fold_titles(titles).str.split().explode()
+    hits = tokens[tokens.isin(q_words)]
+    # Aynı kelime başlıkta iki kez geçse de bir kez sayılır (küme kesişimi gibi)
+    pairs = pd.DataFrame({"pos": hits.index, "tok": hits.to_numpy()}).drop_duplicates()
+    counts = np.bincount(pairs["pos"].to_numpy(dtype=np.int64), minlength=n)
+    return counts / len(q_words)
+
+def filter_irrelevant_products(df, query, threshold=RELEVANCE_THRESHOLD):
+    """Eşleşme oranı eşiğin altındaki ürünleri atar; oranı 'Eşleşme_Oranı' sütununda bırakır.
+
+    Elenen satırlar burada sayılmaz (her rerun'da önbellekteki sonuca tekrar uygulanır); aramanın
+    nihai sonucu için stream_search sayar.
+    """
+    if df.empty: return df
+    scores = token_overlap_scores(df['Ürün'], query)
+    keep = scores >= threshold
+    return df.assign(Eşleşme_Oranı=scores)[keep]
+
+# Paylaşılan sonuç -> {(sorgu, eşik): filtrelenmiş görünüm}; sonuç nesnesi silinince kayıt da düşer
+_relevant_views = {}
+_relevant_lock = threading.Lock()
+
+def relevant_offers(df, query, threshold=RELEVANCE_THRESHOLD):
+    """filter_irrelevant_products'ın paylaşımlı hali: aynı sonuç nesnesi ve sorgu için süreç içinde tek
+    filtrelenmiş DataFrame üretilir. Oturumlar özel kopya yerine bu nesnenin referansını tutar (salt okunur)."""
+    if df.empty: return df
+    view_key = (query, threshold)
+    with _relevant_lock:
+        entry = _relevant_views.get(id(df))
+        if entry is not None and entry[0]() is df and view_key in entry[1]: return entry[1][view_key]
+    view = filter_irrelevant_products(df, query, threshold)
+    with _relevant_lock:
+        entry = _relevant_views.get(id(df))
+        if entry is None or entry[0]() is not df:
+            entry = _relevant_views[id(df)] = (weakref.ref(df), {})
+            weakref.finalize(df, _relevant_views.pop, id(df), None)
+        return entry[1].setdefault(view_key, view)
+
+# --- ÜRÜN EŞLEŞTİRME (Kaynaklar arası aynı ürünü gruplama, MinHash + LSH) ---
+MINHASH_PERM = 32        # İmza uzunluğu
+LSH_BANDS = 16           # 16 bant x 2 satır: ~%25 benzerlikteki başlıklar bile aday olur
+MATCH_THRESHOLD = 0.6    # Adayın aynı ürün sayılması için gereken en az Jaccard benzerliği
+# Model / varyant belirteçleri: sayılarla birlikte birebir aynı olmalı ("AirPods Pro" != "AirPods Max")
+MODEL_WORDS = frozenset({"pro", "max", "lite", "plus", "mini", "ultra", "air", "se", "fe", "xl", "xxl", "xs",
+                         "kids", "live", "neo", "prime", "slim", "nano", "note", "fold", "flip"})
+_MINHASH_PRIME = (1 << 31) - 1
+_mh_rng = np.random.default_rng(7)
+_MH_A = _mh_rng.integers(1, _MINHASH_PRIME, MINHASH_PERM).astype(np.uint64)
+_MH_B = _mh_rng.integers(0, _MINHASH_PRIME, MINHASH_PERM).astype(np.uint64)
+
+def _title_features(title):
+    # (model belirteçleri: sayılar + varyant kelimeleri, 3'lü karakter parçaları)
+    text = normalize_query(title or "")
+    words = set(re.findall(r'[a-z]+', text)) & MODEL_WORDS
+    model = tuple(sorted(set(re.findall(r'\d+', text)) | words))
+    # Boşluksuz: "128GB" ve "128 GB" aynı parçaları verir
+    norm = "".join(re.findall(r'[a-z0-9]+', text))
+    shingles = {norm[i:i + 3] for i in range(max(1, len(norm) - 2))}
+    return model, shingles
+
+def _minhash(shingles):
+    h = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles)) % _MINHASH_PRIME
+    return ((_MH_A[:, None] * h[None, :] + _MH_B[:, None]) % _MINHASH_PRIME).min(axis=1)
+
+def match_products(titles, blocks=None):
+    """Aynı ürünü anlatan başlıklara aynı grup numarasını verir.
+
+    Sadece aynı model belirteçlerine (sayılar, Pro / Max / XL gibi varyantlar) ve varsa aynı `blocks`
+    değerine sahip başlıklar karşılaştırılır; bunların içinde de LSH kovasını paylaşan temsilciyle doğrulama yapılır.
+    Başlık başına sabit sayıda karşılaştırma: toplam maliyet satır sayısıyla doğrusal büyür.
+    """
+    titles = list(titles)
+    blocks = list(blocks) if blocks is not None else [None] * len(titles)
+    parent = list(range(len(titles)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    feats = [_title_features(t) for t in titles]
+    reps = {}   # (blok, bant, bant imzası) -> kovanın ilk başlığı
+    rows = MINHASH_PERM // LSH_BANDS
+    for i, (model, shingles) in enumerate(feats):
+        sig = _minhash(shingles)
+        for band in range(LSH_BANDS):
+            j = reps.setdefault((blocks[i], model, band, sig[band * rows:(band + 1) * rows].tobytes()), i)
+            if j == i: continue
+            ri, rj = find(i), find(j)
+            if ri == rj: continue
+            other = feats[j][1]
+            if len(shingles & other) / len(shingles | other) >= MATCH_THRESHOLD: parent[ri] = rj
+    return pd.factorize(pd.Series([find(i) for i in range(len(titles))]))[0]
+
+def group_offers(df):
+    """Teklifleri ürün bazında toplar: grup başına en ucuz teklif + teklif sayısı, en yüksek fiyat, kaynaklar."""
+    if df.empty: return df
+    if "Ürün_Grubu" not in df: df = df.assign(Ürün_Grubu=match_products(df["Ürün"]))
+    source_col = "Kaynak" if "Kaynak" in df else "Satıcı"
+    agg = df.groupby("Ürün_Grubu").agg(
+        Teklif_Sayısı=("Fiyat", "size"),
+        En_Yüksek_Fiyat=("Fiyat", "max"),
+        Kaynaklar=(source_col, lambda s: ", ".join(sorted(set(map(str, s))))))
+    best = df.sort_values("Fiyat").drop_duplicates("Ürün_Grubu")
+    return best.join(agg, on="Ürün_Grubu").sort_values("Fiyat").reset_index(drop=True)
+
+# --- TEKLİF ŞEMASI (Tüm kaynaklar ve önbellek için tek, sıkı tipli sütun düzeni) ---
+OFFER_COLUMNS = ["Ürün", "Fiyat", "Satıcı", "Link", "Kaynak", "Resim"]
+OFFER_FLOATS = ["Fiyat", "Eski Fiyat"]
+OFFER_CATEGORIES = ["Satıcı", "Kaynak", "Ülke", "İndirim_Yazisi", "Fırsat_Türü"]   # Az sayıda farklı değer: kategorik
+OFFER_TEXT = ["Ürün", "Link", "Resim"]
+# pandas 3+: Arrow tabanlı "str" (tek bitişik tampon). Öncesinde object + sys.intern (tekrarlar tek kopya)
+_ARROW_STR = int(pd.__version__.split(".")[0]) >= 3
+
+def _text_column(values):
+    if _ARROW_STR: return values.astype("str")
+    return pd.Series([sys.intern(v) if isinstance(v, str) else v for v in values], index=values.index, dtype=object)
+
+def as_offer_frame(df):
+    """Teklif tablosunu sıkı şemaya çevirir: float fiyatlar, kategorik satıcı / kaynak / ülke,
+    sıkıştırılmış metin sütunları. Zaten uygun olan sütunlara dokunulmaz; yeni DataFrame döner."""
+    if df.empty: return df
+    cols = {}
+    for c in OFFER_FLOATS:
+        if c in df and df[c].dtype != np.float64: cols[c] = pd.to_numeric(df[c], errors="coerce").astype(np.float64)
+    for c in OFFER_CATEGORIES:
+        # Farklı kategorili parçaların concat'ı object'e döner; burada tekrar kategorik yapılır
+        if c in df and not isinstance(df[c].dtype, pd.CategoricalDtype): cols[c] = df[c].astype("category")
+    for c in OFFER_TEXT:
+        if c in df and df[c].dtype == object: cols[c] = _text_column(df[c])
+    return df.assign(**cols) if cols else df
+
+def offer_frame(rows):
+    """Kaynak fonksiyonlarının satır listesinden (dict) şemaya uygun DataFrame."""
+    return as_offer_frame(pd.DataFrame(rows))
 
 # --- KAYNAK 1: GOOGLE (SERPAPI) ---
-def search_serpapi(query, api_key):
+# Kaynak fonksiyonları hata yutmaz: hata fan_out'ta "error" durumu olarak raporlanır ve sayılır
+def search_serpapi(query, api_key, deadline=None):
     if not api_key: return []
-    try:
-        params = {"engine": "google_shopping", "q": query, "hl": "tr", "gl": "tr", "api_key": api_key}
-        search = GoogleSearch(params)
-        results = search.get_dict().get("shopping_results", [])
-        products = []
-        for item in results:
-            link = item.get("link") or item.get("product_link") or item.get("url")
-            products.append({
-                "Ürün": item.get("title"),
-                "Fiyat": clean_price(item.get("price")),
-                "Satıcı": item.get("source"),
-                "Link": link,
-                "Kaynak": "Google",
-                "Resim": item.get("thumbnail")
-            })
-        return products
-    except Exception as e:
-        print(f"SerpApi Hata: {e}")
-        return []
+    spend_budget("serpapi")
+    params = {"engine": "google_shopping", "q": query, "hl": "tr", "gl": "tr", "api_key": api_key, "output": "json"}
+    # Havuzlu istemci + son tarih: takılan upstream işçiyi kaynağın süresinden fazla tutamaz
+    response = http_get(f"{SERPAPI_BASE_URL}/search", params=params, deadline=deadline)
+    try: data = response.json()
+    except ValueError: data = {}
+    if response.status_code != 200:
+        raise RuntimeError(f"SerpApi: HTTP {response.status_code} {data.get('error', '')}".strip())
+    # SerpApi bazı hataları 200 + {"error": ...} olarak döner
+    if data.get("error") and not data.get("shopping_results"): raise RuntimeError(f"SerpApi: {data['error']}")
+    results = data.get("shopping_results", [])
+    prices, _ = parse_prices([item.get("price") for item in results])
+    products = []
+    for item, price in zip(results, prices):
+        link = item.get("link") or item.get("product_link") or item.get("url")
+        products.append({
+            "Ürün": item.get("title"),
+            "Fiyat": price,
+            "Satıcı": item.get("source"),
+            "Link": link,
+            "Kaynak": "Google",
+            "Resim": item.get("thumbnail")
+        })
+    return products
 
 # --- KAYNAK 2: AMAZON ARAMA (RAPIDAPI) ---
-def search_rapidapi(query, api_key):
+def search_rapidapi(query, api_key, deadline=None):
     if not api_key: return []
-    url = "https://real-time-amazon-data.p.rapidapi.com/search"
     querystring = {"query": query, "country": "TR", "sort_by": "RELEVANCE", "page": "1"}
-    headers = {"X-RapidAPI-Key": api_key, "X-RapidAPI-Host": "real-time-amazon-data.p.rapidapi.com"}
-    try:
-        response = requests.get(url, headers=headers, params=querystring)
-        if response.status_code != 200: return []
-        data = response.json()
-        results = data.get("data", {}).get("products", [])
-        products = []
-        for item in results:
-            price = item.get("product_price")
-            link = item.get("product_url") or item.get("url")
-            products.append({
-                "Ürün": item.get("product_title"),
-                "Fiyat": clean_price(price),
-                "Satıcı": "Amazon TR",
-                "Link": link,
-                "Kaynak": "Amazon",
-                "Resim": item.get("product_photo")
-            })
-        return products
-    except: return []
+    response = rapid_get("search", api_key, querystring, deadline=deadline)
+    if response.status_code != 200: raise RuntimeError(f"RapidAPI search: HTTP {response.status_code}")
+    data = response.json()
+    results = data.get("data", {}).get("products", [])
+    prices, _ = parse_prices([item.get("product_price") for item in results])
+    products = []
+    for item, price in zip(results, prices):
+        link = item.get("product_url") or item.get("url")
+        products.append({
+            "Ürün": item.get("product_title"),
+            "Fiyat": price,
+            "Satıcı": "Amazon TR",
+            "Link": link,
+            "Kaynak": "Amazon",
+            "Resim": item.get("product_photo")
+        })
+    return products
 
 # --- KAYNAK 3: AMAZON FIRSATLARI (HİBRİT HESAPLAMA) ---
-def get_amazon_deals(api_key, country="TR"):
-    if not api_key: return pd.DataFrame()
-    
-    url = "https://real-time-amazon-data.p.rapidapi.com/deals-v2"
-    headers = {
-        "X-RapidAPI-Key": api_key,
-        "X-RapidAPI-Host": "real-time-amazon-data.p.rapidapi.com"
+DEALS_PAGES = 10         # Ülke başına en fazla taranacak sayfa
+DEALS_WINDOW = 3         # Ülke başına aynı anda istenen sayfa sayısı
+DEALS_PAGES_LOW = 3      # RapidAPI bütçesi azaldığında ülke başına taranacak sayfa
+DEAL_PLACEHOLDER_IMG = "https://via.placeholder.com/150?text=Resim+Yok"
+
+def _fetch_deals_page(api_key, country, page):
+    """Tek fırsat sayfası: (satırlar, ham_fırsat_sayısı). Ham sayı 0 ise sayfa boştur."""
+    querystring = {
+        "country": country, 
+        "min_product_star_rating": "ALL", 
+        "price_range": "ALL", 
+        "discount_range": "ALL",
+        "page": str(page)
     }
-    
-    all_deals = []
-    
-    # TURBO MOD: 10 Sayfa Tara (Daha çok veri)
-    for page in range(1, 2):
-        querystring = {
-            "country": country, 
-            "min_product_star_rating": "ALL", 
-            "price_range": "ALL", 
-            "discount_range": "ALL",
-            "page": str(page)
-        }
+    response = rapid_get("deals-v2", api_key, querystring)
+    if response.status_code != 200: return [], 0
+    deals = response.json().get("data", {}).get("deals", [])
+    if not deals: return [], 0
 
-        try:
-            response = requests.get(url, headers=headers, params=querystring)
-            data = response.json()
-            deals = data.get("data", {}).get("deals", [])
-            
-            if not deals: break 
-            
-            for d in deals:
-                title = d.get("deal_title") or d.get("product_title")
-                
-                img = d.get("deal_photo")
-                if not img: img = d.get("product_photo")
-                if not img: img = "https://via.placeholder.com/150?text=Resim+Yok"
-                
-                price_val = clean_price(d.get("deal_price", {}).get("amount", "0"))
-                old_price_val = clean_price(d.get("list_price", {}).get("amount", "0"))
-                
-                # --- HİBRİT İNDİRİM HESABI ---
-                # 1. Manuel Hesapla: (Eski - Yeni) / Eski
-                manual_savings = 0
-                if old_price_val > price_val and old_price_val > 0:
-                    manual_savings = int(((old_price_val - price_val) / old_price_val) * 100)
-                
-                # 2. API Verisi
-                api_savings = d.get("savings_percentage", 0)
-                
-                # Hangisi büyükse onu al (Veri kurtarma)
-                final_savings = max(manual_savings, api_savings)
-                
-                # %1 altı indirimleri gösterme
-                if final_savings < 1: continue
-                
-                link = d.get("product_url") or d.get("deal_url") or "#"
-
-                all_deals.append({
-                    "Ürün": title,
-                    "Fiyat": price_val,
-                    "Eski Fiyat": old_price_val,
-                    "İndirim_Oranı": final_savings, 
-                    "İndirim_Yazisi": f"%{final_savings}", 
-                    "Resim": img,
-                    "Link": link
-                })
-            time.sleep(0.2)
-        except: break
-            
-    df = pd.DataFrame(all_deals)
-    
+    prices, _ = parse_prices([d.get("deal_price", {}).get("amount", "0") for d in deals])
+    old_prices, _ = parse_prices([d.get("list_price", {}).get("amount", "0") for d in deals])
+    rows = []
+    for d, price_val, old_price_val in zip(deals, prices, old_prices):
+        title = d.get("deal_title") or d.get("product_title")
+        img = d.get("deal_photo") or d.get("product_photo") or DEAL_PLACEHOLDER_IMG
+
+        # --- HİBRİT İNDİRİM HESABI ---
+        # 1. Manuel Hesapla: (Eski - Yeni) / Eski
+        manual_savings = 0
+        if old_price_val > price_val and old_price_val > 0:
+            manual_savings = int(((old_price_val - price_val) / old_price_val) * 100)
+        # 2. API Verisi
+        api_savings = d.get("savings_percentage", 0)
+        # Hangisi büyükse onu al (Veri kurtarma)
+        final_savings = max(manual_savings, api_savings)
+
+        # %1 altı indirimleri gösterme
+        if final_savings < 1: continue
+
+        link = d.get("product_url") or d.get("deal_url") or "#"
+        rows.append({
+            "Ürün": title,
+            "Fiyat": price_val,
+            "Eski Fiyat": old_price_val,
+            "İndirim_Oranı": final_savings, 
+            "İndirim_Yazisi": f"%{final_savings}", 
+            "Resim": img,
+            "Link": link,
+            "Ülke": country,
+            "Fırsat_Türü": d.get("deal_type") or "DEAL"
+        })
+    return rows, len(deals)
+
+def get_amazon_deals(api_key, country="TR", pages=DEALS_PAGES):
+    """Fırsatları birden çok ülke ve sayfada paralel tarar (RapidAPI hız sınırına uyarak).
+
+    `country` tek kod ("TR") veya liste (["TR", "DE"]) olabilir. Bir ülkede boş sayfa gelince
+    o ülkenin sonraki sayfaları istenmez. RapidAPI bütçesi azaldıysa daha az sayfa taranır.
+    """
+    if not api_key: return pd.DataFrame()
+    countries = [country] if isinstance(country, str) else list(country)
+    level = get_budget().level("rapidapi")
+    if level >= BUDGET_EXHAUSTED:
+        log.warning("RapidAPI kotası doldu: fırsatlar taranmadı")
+        return pd.DataFrame()
+    if level >= BUDGET_LOW: pages = min(pages, DEALS_PAGES_LOW)
+
+    # İkizleri Temizle: (ülke, ürün) başına en ucuz kayıt tutulur; sayfalar geldikçe birleştirilir
+    # (sort_values(Fiyat) + drop_duplicates(keep='first') ile aynı sonuç)
+    best = {}
+    next_page = {c: 1 for c in countries}
+    last_page = {c: pages for c in countries}
+    futures = {}
+
+    def submit(c):
+        page = next_page[c]
+        if page > last_page[c]: return
+        next_page[c] = page + 1
+        futures[_POOL.submit(_fetch_deals_page, api_key, c, page)] = (c, page)
+
+    for c in countries:
+        for _ in range(DEALS_WINDOW): submit(c)
+
+    while futures:
+        done, _ = wait(list(futures), return_when=FIRST_COMPLETED)
+        for f in done:
+            c, page = futures.pop(f)
+            try: rows, raw_count = f.result()
+            except Exception as e:
+                _report_error("deals", f"Fırsat sayfası alınamadı ({c} / {page}): {e}")
+                rows, raw_count = [], 0
+            if not raw_count:
+                # Boş sayfa: bu ülkede daha ileri gitme
+                last_page[c] = min(last_page[c], page - 1)
+                continue
+            for row in rows:
+                key = (row["Ülke"], row["Ürün"])
+                if key not in best or row["Fiyat"] < best[key]["Fiyat"]: best[key] = row
+            submit(c)
+
+    df = offer_frame(list(best.values()))
     if not df.empty:
-        # 1. İkizleri Temizle
+        # Aynı ilan farklı başlıkla gelebilir: ülke içinde aynı linkin en ucuzunu tut (bulanık grup satır silmez)
         df = df.sort_values(by=['Fiyat'], ascending=True)
-        df = df.drop_duplicates(subset=['Ürün'], keep='first')
-        
-        # 2. Sıralama (Büyükten Küçüğe)
+        df = df[~(df.duplicated(subset=['Ülke', 'Link'], keep='first') & (df['Link'] != '#'))]
+
+        # Sıralama (Büyükten Küçüğe)
         df = df.sort_values(by="İndirim_Oranı", ascending=False)
         df = df.reset_index(drop=True)
-        
     return df
 
-# --- ANA MOTOR ---
-def search_all_sources(query, serp_key, rapid_key):
-    r1 = search_serpapi(query, serp_key)
-    r2 = search_rapidapi(query, rapid_key)
-    all_results = r1 + r2
-    if not all_results: return pd.DataFrame()
-    df = pd.DataFrame(all_results)
-    df = df[df['Fiyat'] > 0]
-    df = smart_clean_results(df, query)
-    df = df.sort_values(by="Fiyat", ascending=True)
+# --- ANA MOTOR (PARALEL TARAMA) ---
+SOURCE_TIMEOUT = 8.0    # Tek bir kaynağı en fazla bu kadar bekle (sn), kaynağın işi çalışmaya başlayınca işler
+SEARCH_DEADLINE = 10.0  # Tüm tarama için toplam süre sınırı (sn)
+SEARCH_CONCURRENCY = 4  # Aynı anda yürütülen arama sayısı (her kaynağın kendi havuzunda bu kadar işçi)
+
+# Kaynak adı -> arama fonksiyonu (query, api_key, deadline) -> [ürün, ...]
+SOURCES = {
+    "Google": search_serpapi,
+    "Amazon": search_rapidapi,
+}
+SOURCE_PROVIDERS = {"Google": "serpapi", "Amazon": "rapidapi"}   # Kaynak -> kotası sayılan sağlayıcı
+# Bütçe azalınca ilk bırakılan kaynaklar: Amazon araması Google Alışveriş'teki Amazon tekliflerini büyük ölçüde
+# tekrarlar; RapidAPI kotası fırsat vitrinine kalır
+LOW_VALUE_SOURCES = {"Amazon"}
+
+def _budget_skip(name):
+    level = get_budget().level(SOURCE_PROVIDERS[name])
+    return level >= BUDGET_EXHAUSTED or (level >= BUDGET_LOW and name in LOW_VALUE_SOURCES)
+
+_source_pools = {}
+_source_pools_lock = threading.Lock()
+
+def _source_pool(name):
+    """Kaynak başına ayrı havuz: takılan bir sağlayıcı diğer kaynakların işçilerini tüketemez."""
+    with _source_pools_lock:
+        pool = _source_pools.get(name)
+        if pool is None:
+            pool = _source_pools[name] = ThreadPoolExecutor(max_workers=SEARCH_CONCURRENCY,
+                                                            thread_name_prefix=f"ghostdeal-{name.lower()}")
+        return pool
+
+def _run_source(fn, query, key, source_timeout, end, limit):
+    # Kaynağın süresi iş çalışmaya başlayınca işler (kuyrukta beklerken sadece genel süre sınırı geçerli);
+    # son tarih http_get'e kadar iner, tekrarlar ve beklemeler orada durur
+    limit[0] = min(time.monotonic() + source_timeout, end)
+    return fn(query, key, deadline=limit[0])
+
+def fan_out(query, keys, source_timeout=SOURCE_TIMEOUT, deadline=SEARCH_DEADLINE):
+    """Tüm kaynakları paralel sorgular; biten her kaynak için (kaynak, ürünler, durum) üretir.
+
+    Süresi dolan kaynaklar beklenmez, "timeout" durumuyla boş döner. API bütçesi yüzünden
+    sorgulanmayan kaynaklar "budget" durumuyla boş döner.
+    """
+    start = time.monotonic()
+    end = start + deadline
+    futures = {}
+    for name, fn in SOURCES.items():
+        key = keys.get(name)
+        if not key:
+            metrics.inc("ghostdeal_source_results_total", source=name, status="no_key")
+            yield name, [], {"status": "no_key", "rows": 0, "ms": 0}
+            continue
+        if _budget_skip(name):
+            metrics.inc("ghostdeal_source_results_total", source=name, status="budget")
+            yield name, [], {"status": "budget", "rows": 0, "ms": 0}
+            continue
+        limit = [end]   # Kaynağın son tarihi; iş başlayınca _run_source kısaltır
+        futures[_source_pool(name).submit(_run_source, fn, query, key, source_timeout, end, limit)] = (name, limit)
+
+    while futures:
+        now = time.monotonic()
+        # 1. Süresi dolanları bırak (kuyruktaki iş iptal edilir, çalışan iş son tarihinde kendisi durur)
+        for f in [f for f, (_, limit) in futures.items() if limit[0] <= now and not f.done()]:
+            name, _ = futures.pop(f)
+            f.cancel()
+            metrics.inc("ghostdeal_source_results_total", source=name, status="timeout")
+            metrics.observe("ghostdeal_source_latency_seconds", now - start, source=name)
+            log.warning("%s kaynağı %.1f sn içinde yanıt vermedi", name, now - start)
+            yield name, [], {"status": "timeout", "rows": 0, "ms": int((now - start) * 1000)}
+        if not futures: break
+
+        # 2. İlk biten kaynağı (veya en yakın süre sınırını) bekle. Bu arada başlayan bir işin sınırı
+        # now + source_timeout'tan önce olamaz, bekleme onu kaçırmaz
+        next_limit = min(min(limit[0] for _, limit in futures.values()), now + source_timeout)
+        done, _ = wait(list(futures), timeout=max(0.0, next_limit - now), return_when=FIRST_COMPLETED)
+        for f in done:
+            name, _ = futures.pop(f)
+            elapsed = time.monotonic() - start
+            ms = int(elapsed * 1000)
+            metrics.observe("ghostdeal_source_latency_seconds", elapsed, source=name)
+            try: rows = f.result() or []
+            except Exception as e:
+                # Son tarihinde duran istek (requests.Timeout) zaman aşımıdır, hata değil
+                status = "timeout" if isinstance(e, requests.Timeout) else "error"
+                metrics.inc("ghostdeal_source_results_total", source=name, status=status)
+                log.warning("%s kaynağı yanıt vermedi (%s): %s", name, status, e)
+                yield name, [], {"status": status, "rows": 0, "ms": ms, "error": str(e)}
+                continue
+            status = "ok" if rows else "empty"
+            metrics.inc("ghostdeal_source_results_total", source=name, status=status)
+            yield name, rows, {"status": status, "rows": len(rows), "ms": ms}
+
+def stream_search(query, serp_key, rapid_key, source_timeout=SOURCE_TIMEOUT, deadline=SEARCH_DEADLINE):
+    """Kaynaklar geldikçe (kaynak, güncel_sonuç, durum) üretir; son üretilen sonuç nihai sonuçtur.
+
+    Satır filtreleri (fiyat > 0, yasaklı kelime, sayısal eşleşme) her partiye bir kez uygulanır;
+    sadece medyan tabanı ve ürün grupları birikmiş satırlar üzerinde yeniden hesaplanır.
+    """
+    keys = {"Google": serp_key, "Amazon": rapid_key}
+    parts, status = [], {}
+    visible = pd.DataFrame()
+    floor_ok = numbers_ok = None
+    for name, rows, state in fan_out(query, keys, source_timeout, deadline):
+        status[name] = state
+        with metrics.timer("ghostdeal_stage_seconds", stage="filter"):
+            batch = offer_frame(rows)
+            if not batch.empty:
+                priced = batch['Fiyat'] > 0
+                batch = batch[priced]
+            if not batch.empty:
+                words_ok, batch_numbers_ok = _row_masks(batch, query)
+                _record_drops(len(priced), no_price=(~priced).sum(), forbidden_word=(~words_ok).sum())
+                parts.append(batch[words_ok].assign(_sayı_uyumu=batch_numbers_ok[words_ok]))
+                merged = as_offer_frame(pd.concat(parts, ignore_index=True))
+                merged = merged.assign(Ürün_Grubu=match_products(merged['Ürün']))
+                floor_ok = _price_floor_mask(merged, pd.Series(True, index=merged.index))
+                numbers_ok = merged['_sayı_uyumu']
+                visible = merged[floor_ok & numbers_ok].drop(columns=['_sayı_uyumu']).sort_values(by="Fiyat", ascending=True)
+            elif rows: _record_drops(len(rows), no_price=len(rows))
+        # Kaynak durumları (ok / empty / timeout / error / no_key) df.attrs içinde taşınır
+        visible.attrs["source_status"] = dict(status)
+        yield name, visible, state
+    # Medyan tabanı, sayısal eşleşme ve alaka birikmiş satırlar üzerinde; sadece nihai sonuç, arama başına bir kez sayılır
+    if floor_ok is not None:
+        relevant = token_overlap_scores(visible['Ürün'], query) >= RELEVANCE_THRESHOLD
+        _record_drops(0, price_floor=(~floor_ok).sum(), number_mismatch=(floor_ok & ~numbers_ok).sum(),
+                      relevance=(~relevant).sum())
+
+def search_all_sources(query, serp_key, rapid_key, source_timeout=SOURCE_TIMEOUT, deadline=SEARCH_DEADLINE):
+    df = pd.DataFrame()
+    for _, df, _ in stream_search(query, serp_key, rapid_key, source_timeout, deadline): pass
+    return df
+
+def summarize_offers(df, ref_price=None):
+    """Panel özeti: en iyi fiyat, ortalama ve Ghost Score.
+
+    Ghost Score, en iyi fiyatın referansa (geçmiş medyan; yoksa güncel ortalama) göre ne kadar ucuz olduğudur.
+    """
+    if df.empty: return None
+    best_p, avg_p = float(df['Fiyat'].min()), float(df['Fiyat'].mean())
+    ref_p = ref_price or avg_p
+    saving = ((ref_p - best_p) / ref_p) * 100
+    return {"best": best_p, "avg": avg_p, "count": len(df), "score": max(0, min(100, int(50 + (saving * 2))))}
+
+# --- KALICI ÖNBELLEK (SQLite, replikalar arası paylaşımlı) ---
+CACHE_PATH = os.environ.get("GHOSTDEAL_CACHE", "ghostdeal_cache.sqlite3")
+CACHE_TTL = 3600          # Bu süre boyunca kayıt taze (taban; sorguya göre aşağıdaki kurallarla ayarlanır)
+CACHE_TTL_MIN = 900       # Uyarlanan TTL bu aralıkta kalır
+CACHE_TTL_MAX = 12 * 3600
+CACHE_STALE = 86400       # Taze süre bittikten sonra bu kadar daha "bayat" sunulabilir
+CACHE_PARTIAL_TTL = 300   # Bir kaynak düştüyse (kısmi sonuç) kısa tut
+CACHE_MAX_ENTRIES = 5000  # LRU sınırı
+CACHE_MEMO_ENTRIES = 256  # Süreç içinde çözülmüş tutulan kayıt (oturumlar aynı nesneyi paylaşır)
+DEMAND_WINDOW = 24        # Popülerlik: son bu kadar saatteki istek sayısı
+POPULAR_LOOKUPS = 20      # Pencerede bu kadar istenen sorgu popüler: daha sık tazelenir (TTL / 2)
+RARE_LOOKUPS = 2          # Bu kadar ya da daha az istenen sorgu nadir: daha uzun tutulur (TTL x 2)
+VOLATILITY_DAYS = 14      # Fiyat oynaklığı: son bu kadar günün günlük en düşük fiyatları
+VOLATILE_CV = 0.05        # Değişim katsayısı bundan büyükse fiyat oynak (TTL / 2)
+STABLE_CV = 0.01          # ... bundan küçükse durgun (TTL x 2)
+
+_TR_FOLD = str.maketrans("çğıöşüâîûÇĞİIÖŞÜÂÎÛ", "cgiosuaiucgiiosuaiu")
+
+def normalize_query(query):
+    """Önbellek anahtarı için sorgu: küçük harf, tek boşluk, Türkçe karakterler katlanmış."""
+    q = str(query).translate(_TR_FOLD).lower()
+    q = unicodedata.normalize("NFKD", q)
+    q = "".join(ch for ch in q if not unicodedata.combining(ch))
+    return " ".join(q.split())
+
+class ResultCache:
+    """SQLite tabanlı, stale-while-revalidate destekli, LRU sınırlı sonuç önbelleği.
+
+    Aynı dosyayı kullanan tüm süreçler (replikalar) kayıtları paylaşır. Süreç içinde son çözülen
+    kayıtlar sürümüyle (fresh_until) birlikte tutulur: kayıt değişmedikçe her get aynı nesneyi döner,
+    blob tekrar okunup unpickle edilmez. Dönen değerler paylaşımlıdır, yerinde değiştirilmemelidir.
+    """
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES, memo_entries=CACHE_MEMO_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.memo_entries = memo_entries
+        self._local = threading.local()
+        self._memo = OrderedDict()   # anahtar -> (fresh_until, değer)
+        self._memo_lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY, value BLOB NOT NULL,
+                fresh_until REAL NOT NULL, stale_until REAL NOT NULL, accessed REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache(accessed)")
+            # Anahtar başına saatlik kullanıcı araması sayısı; TTL popülerliğe göre ayarlanır
+            conn.execute("""CREATE TABLE IF NOT EXISTS demand (
+                key TEXT NOT NULL, hour INTEGER NOT NULL, n INTEGER NOT NULL, PRIMARY KEY (key, hour))""")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key, version, value):
+        with self._memo_lock:
+            self._memo[key] = (version, value)
+            self._memo.move_to_end(key)
+            while len(self._memo) > self.memo_entries: self._memo.popitem(last=False)
+
+    def get(self, key, expired_ok=False):
+        """(değer, taze_mi) döner; kayıt yoksa veya bayatlık süresi de geçtiyse None.
+
+        expired_ok: bayatlık süresi geçmiş ama henüz silinmemiş kayıt da döner (kota dolduğunda).
+        """
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT fresh_until, stale_until FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] < now and not expired_ok): return None
+        fresh_until = row[0]
+        conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        with self._memo_lock: memo = self._memo.get(key)
+        if memo is not None and memo[0] == fresh_until: return memo[1], fresh_until >= now
+        blob = conn.execute("SELECT value FROM cache WHERE key = ? AND fresh_until = ?", (key, fresh_until)).fetchone()
+        if blob is None: return None   # Bu arada başka süreç yeni sürüm yazdı
+        value = pickle.loads(blob[0])
+        self._remember(key, fresh_until, value)
+        return value, fresh_until >= now
+
+    def set(self, key, value, ttl=CACHE_TTL, stale=CACHE_STALE):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+                     (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now + ttl, now + ttl + stale, now))
+        self._remember(key, now + ttl, value)
+        # LRU: sınırı aşan en eski erişilenleri sil
+        conn.execute("""DELETE FROM cache WHERE key IN (
+            SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)""", (self.max_entries,))
+        conn.execute("DELETE FROM demand WHERE hour < ?", (int(now // 3600) - DEMAND_WINDOW,))
+
+    def record_demand(self, key):
+        """Açık bir kullanıcı aramasını sayar (rerun, alarm ve toplu okumalar sayılmaz)."""
+        self._conn().execute("INSERT INTO demand VALUES (?, ?, 1) ON CONFLICT(key, hour) DO UPDATE SET n = n + 1",
+                             (key, int(time.time() // 3600)))
+
+    def demand(self, key, hours=DEMAND_WINDOW):
+        """Anahtarın son `hours` saatteki kullanıcı araması sayısı."""
+        since = int(time.time() // 3600) - hours + 1
+        row = self._conn().execute("SELECT COALESCE(SUM(n), 0) FROM demand WHERE key = ? AND hour >= ?",
+                                   (key, since)).fetchone()
+        return row[0]
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+        with self._memo_lock: self._memo.pop(key, None)
+
+_cache = None
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "stale_hits": 0, "misses": 0}
+_REFRESH_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ghostdeal-refresh")
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    if _cache is None: _cache = ResultCache()
+    return _cache
+
+# --- API BÜTÇESİ (Sağlayıcı başına günlük / aylık kota, replikalar arası paylaşımlı) ---
+def _quota(name, default):
+    return int(os.environ.get(name, default))
+
+# Sağlayıcı -> (günlük, aylık) çağrı kotası; 0 = sınırsız (varsayılan: planınıza göre env ile açın)
+QUOTAS = {
+    "serpapi": (_quota("GHOSTDEAL_SERPAPI_DAILY", 0), _quota("GHOSTDEAL_SERPAPI_MONTHLY", 0)),
+    "rapidapi": (_quota("GHOSTDEAL_RAPIDAPI_DAILY", 0), _quota("GHOSTDEAL_RAPIDAPI_MONTHLY", 0)),
+}
+BUDGET_LEVELS = ("normal", "low", "critical", "exhausted")
+BUDGET_NORMAL, BUDGET_LOW, BUDGET_CRITICAL, BUDGET_EXHAUSTED = range(4)
+BUDGET_LOW_SHARE = 0.30       # Bugünkü payın bu oranından azı kaldıysa "low"
+BUDGET_CRITICAL_SHARE = 0.10  # ... bundan azı kaldıysa "critical"
+BUDGET_REFRESH = 5.0          # Kullanım sayıları SQLite'tan en fazla bu sıklıkla okunur (sn)
+BUDGET_TTL_FACTOR = (1, 2, 4, 4)   # Bütçe seviyesine göre TTL çarpanı
+CACHE_KEY_PROVIDERS = {"search": ("serpapi", "rapidapi"), "barcode": ("serpapi", "rapidapi")}
+
+class BudgetExhausted(RuntimeError):
+    """Sağlayıcının bugünkü payı doldu; upstream'e gidilmedi."""
+
+class QuotaBudget:
+    """Sağlayıcı başına upstream çağrı sayacı (SQLite, gün bazında) ve kota seviyesi.
+
+    Aylık kota ayın kalan günlerine yayılır: bugünkü pay = min(günlük kota, kalan aylık kota / kalan gün).
+    Pay azaldıkça seviye normal -> low -> critical -> exhausted olur. Tekrar denemeler (429 / 5xx)
+    faturalanmadığı için sayılmaz; sayılan, mantıksal upstream çağrısıdır.
+    """
+    def __init__(self, path=CACHE_PATH, quotas=QUOTAS, refresh=BUDGET_REFRESH):
+        self.path = path
+        self.quotas = quotas
+        self.refresh = refresh
+        self._local = threading.local()
+        self._usage = {}   # sağlayıcı -> (okunma zamanı, gün, bugün, bu ay)
+        self._lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS api_usage (
+                provider TEXT NOT NULL, day TEXT NOT NULL, calls INTEGER NOT NULL, PRIMARY KEY (provider, day))""")
+            self._local.conn = conn
+        return conn
+
+    def spend(self, provider, n=1):
+        day = time.strftime("%Y-%m-%d", time.gmtime())
+        metrics.inc("ghostdeal_upstream_calls_total", n, provider=provider)
+        try:
+            self._conn().execute("""INSERT INTO api_usage VALUES (?, ?, ?)
+                ON CONFLICT(provider, day) DO UPDATE SET calls = calls + excluded.calls""", (provider, day, n))
+        except sqlite3.Error as e: _report_error("budget", f"API kullanımı yazılamadı: {e}")
+        with self._lock:
+            cached = self._usage.get(provider)
+            if cached is not None and cached[1] == day:
+                self._usage[provider] = (cached[0], day, cached[2] + n, cached[3] + n)
+
+    def usage(self, provider):
+        """(bugünkü çağrı, bu ayki çağrı); en fazla `refresh` sn eski olabilir."""
+        now = time.time()
+        day = time.strftime("%Y-%m-%d", time.gmtime(now))
+        with self._lock: cached = self._usage.get(provider)
+        if cached is not None and cached[1] == day and now - cached[0] < self.refresh: return cached[2], cached[3]
+        try:
+            today, month = self._conn().execute("""SELECT COALESCE(SUM(CASE WHEN day = ? THEN calls END), 0),
+                COALESCE(SUM(calls), 0) FROM api_usage WHERE provider = ? AND day >= ?""",
+                (day, provider, day[:8] + "01")).fetchone()
+        except sqlite3.Error as e:
+            _report_error("budget", f"API kullanımı okunamadı: {e}")
+            return (cached[2], cached[3]) if cached is not None and cached[1] == day else (0, 0)
+        with self._lock: self._usage[provider] = (now, day, today, month)
+        return today, month
+
+    def allowance(self, provider):
+        """(bugünkü çağrı, bu ayki çağrı, bugünkü pay); kota tanımlı değilse pay None (sınırsız)."""
+        daily, monthly = self.quotas.get(provider, (0, 0))
+        today, month = self.usage(provider)
+        limits = [daily] if daily else []
+        if monthly:
+            now = time.gmtime()
+            days_left = calendar.monthrange(now.tm_year, now.tm_mon)[1] - now.tm_mday + 1
+            limits.append(max(0, monthly - (month - today)) / days_left)
+        return today, month, (min(limits) if limits else None)
+
+    def level(self, provider):
+        today, _, allowance = self.allowance(provider)
+        if allowance is None: return BUDGET_NORMAL
+        left = (allowance - today) / allowance if allowance else 0
+        if left <= 0: return BUDGET_EXHAUSTED
+        if left < BUDGET_CRITICAL_SHARE: return BUDGET_CRITICAL
+        if left < BUDGET_LOW_SHARE: return BUDGET_LOW
+        return BUDGET_NORMAL
+
+_budget = None
+
+def get_budget():
+    global _budget
+    if _budget is None: _budget = QuotaBudget()
+    return _budget
+
+def spend_budget(provider):
+    """Upstream çağrısından hemen önce: pay dolduysa BudgetExhausted, değilse çağrıyı sayar."""
+    budget = get_budget()
+    if budget.level(provider) >= BUDGET_EXHAUSTED: raise BudgetExhausted(f"{provider} kotası doldu")
+    budget.spend(provider)
+
+def budget_level(providers=CACHE_KEY_PROVIDERS["search"]):
+    """Sağlayıcılardan en iyi durumdakinin seviyesi: biri çağrılabildiği sürece arama sürer."""
+    budget = get_budget()
+    return min((budget.level(p) for p in providers), default=BUDGET_NORMAL)
+
+def budget_status():
+    """Sağlayıcı başına kullanım ve seviye (yönetim sayfası / Prometheus)."""
+    budget = get_budget()
+    rows = []
+    for provider, (daily, monthly) in budget.quotas.items():
+        today, month, allowance = budget.allowance(provider)
+        rows.append({"provider": provider, "today": today, "allowance": allowance, "month": month,
+                     "daily_quota": daily, "monthly_quota": monthly, "level": BUDGET_LEVELS[budget.level(provider)]})
+    return rows
+
+@metrics.collector
+def _budget_metrics():
+    out = []
+    for row in budget_status():
+        labels = {"provider": row["provider"]}
+        out.append(("ghostdeal_budget_calls_today", "gauge", "Bugünkü upstream çağrıları", labels, row["today"]))
+        out.append(("ghostdeal_budget_calls_month", "gauge", "Bu ayki upstream çağrıları", labels, row["month"]))
+        if row["allowance"] is not None:
+            out.append(("ghostdeal_budget_allowance_today", "gauge", "Bugünkü çağrı payı", labels, row["allowance"]))
+        out.append(("ghostdeal_budget_level", "gauge", "Bütçe seviyesi (0 normal, 1 low, 2 critical, 3 exhausted)",
+                    labels, BUDGET_LEVELS.index(row["level"])))
+    return out
+
+def _key_level(key):
+    return budget_level(CACHE_KEY_PROVIDERS.get(key.partition(":")[0], ()) or tuple(get_budget().quotas))
+
+def _price_volatility(product_key):
+    """Günlük en düşük fiyatların değişim katsayısı (std / ortalama); yeterli geçmiş yoksa None."""
+    try: d = get_history().daily(product_key, VOLATILITY_DAYS)
+    except Exception as e:
+        _report_error("history", f"Fiyat geçmişi okunamadı: {e}")
+        return None
+    if len(d) < 3 or not d["min"].mean(): return None
+    return float(d["min"].std() / d["min"].mean())
+
+def _cache_ttl(key, df):
+    """Kayıt başına TTL: kısmi sonuç kısa tutulur; aksi halde taban TTL sorgunun popülerliği,
+    fiyat oynaklığı ve API bütçesine göre ayarlanır (CACHE_TTL_MIN..CACHE_TTL_MAX)."""
+    # Kaynaklardan biri zaman aşımı / hata verdiyse sonucu kısa süre tut
+    status = getattr(df, "attrs", {}).get("source_status", {})
+    if any(v["status"] in ("timeout", "error") for v in status.values()): return CACHE_PARTIAL_TTL
+    ttl = CACHE_TTL
+    try: lookups = get_cache().demand(key)
+    except sqlite3.Error: lookups = None
+    if lookups is not None:
+        if lookups >= POPULAR_LOOKUPS: ttl /= 2
+        elif lookups <= RARE_LOOKUPS: ttl *= 2
+    kind, _, product_key = key.partition(":")
+    if kind == "search":
+        cv = _price_volatility(product_key)
+        if cv is not None and cv >= VOLATILE_CV: ttl /= 2
+        elif cv is not None and cv <= STABLE_CV: ttl *= 2
+    ttl *= BUDGET_TTL_FACTOR[_key_level(key)]
+    return int(min(CACHE_TTL_MAX, max(CACHE_TTL_MIN, ttl)))
+
+# --- TEKİL UÇUŞ (Aynı anda gelen aynı sorguları tek upstream çağrısında birleştir) ---
+class SingleFlight:
+    """Aynı anahtarla eşzamanlı gelen çağrılardan sadece ilki çalışır, diğerleri onun sonucunu bekler."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0   # Gerçekten çalıştırılan çağrı sayısı
+        self.shared = 0    # Bekleyip hazır sonucu alan çağrı sayısı
+
+    def begin(self, key):
+        """(lider_mi, Future). Lider hesaplayıp finish() çağırmalı; diğerleri Future'ı bekler."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = Future()
+                self.leaders += 1
+                return True, call
+            self.shared += 1
+            return False, call
+
+    def finish(self, key, value=None, error=None):
+        with self._lock: call = self._calls.pop(key, None)
+        if call is None: return
+        if error is not None: call.set_exception(error)
+        else: call.set_result(value)
+
+    def do(self, key, fn, *args):
+        leader, call = self.begin(key)
+        if not leader: return call.result()
+        try: value = fn(*args)
+        except BaseException as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, value)
+        return value
+
+_flight = SingleFlight()
+
+def _store(key, value):
+    # Boş sonuç önbelleğe yazılmaz (kota harcanmadan tekrar denensin)
+    if value.empty: return
+    try: get_cache().set(key, value, ttl=_cache_ttl(key, value))
+    except sqlite3.Error as e: _report_error("cache", f"Önbelleğe yazılamadı: {e}")
+
+def _load(key, fn, args):
+    value = fn(*args)
+    _store(key, value)
+    return value
+
+def _refresh(key, fn, args):
+    try: _flight.do(key, _load, key, fn, args)
+    except Exception as e: _report_error("cache_refresh", f"Önbellek yenileme hatası ({key}): {e}")
+    finally:
+        with _refresh_lock: _refreshing.discard(key)
+
+def _cache_lookup(key, fn, args, allow_stale=True):
+    """Önbellekte varsa değeri döner (bayatsa arkada yenilemeyi başlatır), yoksa None.
+
+    API bütçesi kritikse bayat kayıt yenilenmeden sunulur; kota dolduysa süresi geçmiş kayıt da sunulur.
+    allow_stale=False: sadece taze kayıt sunulur, bayat kayıt yokmuş gibi davranılır.
+    """
+    level = _key_level(key)
+    try: hit = get_cache().get(key, expired_ok=allow_stale and level >= BUDGET_EXHAUSTED)
+    except sqlite3.Error as e:
+        _report_error("cache", f"Önbellek okunamadı: {e}")
+        return None
+    if hit is None: return None
+    value, fresh = hit
+    if not fresh and not allow_stale: return None
+    with _cache_lock: _cache_stats["hits" if fresh else "stale_hits"] += 1
+    if not fresh and level < BUDGET_CRITICAL:
+        with _refresh_lock:
+            start = key not in _refreshing
+            _refreshing.add(key)
+        if start: _REFRESH_POOL.submit(_refresh, key, fn, args)
+    return value
+
+def cached_call(key, fn, *args, allow_stale=True):
+    """Önbellekten sun: taze ise direkt, bayat ise hemen döndür ve arkada yenile, yoksa hesapla.
+
+    Hesaplama tekil uçuştan geçer; aynı anahtarı isteyen eşzamanlı oturumlar tek çağrıyı paylaşır.
+    allow_stale=False (toplu tarama): bayat kayıt sunulmaz, beklenip upstream'den alınır.
+    """
+    value = _cache_lookup(key, fn, args, allow_stale)
+    if value is not None: return value
+    with _cache_lock: _cache_stats["misses"] += 1
+    return _flight.do(key, _load, key, fn, args)
+
+def cache_stats():
+    """Önbellek isabet / kaçırma sayıları ve tekil uçuşta paylaşılan (upstream'e gitmeyen) çağrılar."""
+    with _cache_lock: stats = dict(_cache_stats)
+    stats["coalesced"] = _flight.shared
+    stats["upstream_saved"] = stats["hits"] + stats["stale_hits"] + stats["coalesced"]
+    return stats
+
+@metrics.collector
+def _cache_metrics():
+    stats = cache_stats()
+    lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+    out = [("ghostdeal_cache_lookups_total", "counter", "Önbellek sorguları (sonuç: hit / stale / miss)",
+            {"result": result}, stats[name]) for result, name in (("hit", "hits"), ("stale", "stale_hits"), ("miss", "misses"))]
+    out.append(("ghostdeal_cache_coalesced_total", "counter", "Tekil uçuşta paylaşılan çağrılar", {}, stats["coalesced"]))
+    out.append(("ghostdeal_cache_hit_ratio", "gauge", "Taze + bayat isabet oranı", {},
+                (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0.0))
+    return out
+
+# --- FİYAT GEÇMİŞİ (upstream'den gelen her taze sonuç kaydedilir) ---
+_history = None
+
+def get_history():
+    global _history
+    if _history is None: _history = PriceHistory()
+    return _history
+
+def record_search(query, df):
+    try: get_history().record_search(normalize_query(query), df)
+    except Exception as e: _report_error("history", f"Fiyat geçmişi yazılamadı: {e}")
+
+def record_deals(df):
+    try: get_history().record_deals(df, normalize_query)
+    except Exception as e: _report_error("history", f"Fiyat geçmişi yazılamadı: {e}")
+
+def _search_and_record(query, serp_key, rapid_key):
+    df = search_all_sources(query, serp_key, rapid_key)
+    record_search(query, df)
     return df
+
+def price_stats(query, days=30):
+    """Sorgunun geçmiş fiyat özeti (min / medyan / trend), yoksa None."""
+    try: return get_history().stats(normalize_query(query), days)
+    except Exception as e:
+        _report_error("history", f"Fiyat geçmişi okunamadı: {e}")
+        return None
+
+def price_history(query, days=90):
+    """Sorgunun günlük fiyat özeti (day, n, min, max, mean, median); okunamazsa boş DataFrame."""
+    try: return get_history().daily(normalize_query(query), days)
+    except Exception as e:
+        _report_error("history", f"Fiyat geçmişi okunamadı: {e}")
+        return pd.DataFrame()
+
+def cached_search_all(query, serp_key, rapid_key, allow_stale=True):
+    # Anahtar sadece normalize sorgudan oluşur; API anahtarları önbelleğe girmez
+    return cached_call(f"search:{normalize_query(query)}", _search_and_record, query, serp_key, rapid_key,
+                       allow_stale=allow_stale)
+
+def seed_search(query, df):
+    """Başka yoldan gelmiş teklifleri (ör. barkod araması) sorgunun arama sonucu olarak önbelleğe yazar.
+
+    Arama hattının filtreleri uygulanır; sorgu zaten önbellekteyse dokunulmaz. Yazıldıysa True.
+    """
+    key = f"search:{normalize_query(query)}"
+    try:
+        if get_cache().get(key) is not None: return False
+    except sqlite3.Error as e:
+        _report_error("cache", f"Önbellek okunamadı: {e}")
+        return False
+    status = df.attrs.get("source_status", {})
+    df = smart_clean_results(df[df["Fiyat"] > 0], query) if not df.empty else df
+    if df.empty: return False
+    df = as_offer_frame(df.assign(Ürün_Grubu=match_products(df["Ürün"]))).sort_values(by="Fiyat", ascending=True)
+    df.attrs["source_status"] = dict(status)
+    record_search(query, df)
+    _store(key, df)
+    return True
+
+def _finish_stream(key, query, stream, df):
+    """Yarıda bırakılan akışı arkada sonuna kadar sürer: süren kaynak çağrıları beklenir, arama yeniden başlamaz."""
+    try:
+        for _, df, _ in stream: pass
+        record_search(query, df)
+        _store(key, df)
+        _flight.finish(key, df)
+    except BaseException as e: _flight.finish(key, error=e)
+
+def iter_search_all(query, serp_key, rapid_key, record_demand=False):
+    """cached_search_all'ın akış hali: (kaynak, güncel_sonuç, durum) üretir.
+
+    Önbellekte varsa tek seferde ("cache"), aynı sorgu başka oturumda sürüyorsa onun sonucu
+    ("shared") gelir; yoksa her kaynak bittikçe güncel sonuç üretilir ve sonunda önbelleğe yazılır.
+    record_demand: kullanıcının yeni bir araması; sorgunun popülerliğine (TTL) sayılır.
+    """
+    key = f"search:{normalize_query(query)}"
+    if record_demand:
+        try: get_cache().record_demand(key)
+        except sqlite3.Error as e: _report_error("cache", f"Arama sayısı yazılamadı: {e}")
+    args = (query, serp_key, rapid_key)
+    value = _cache_lookup(key, _search_and_record, args)
+    if value is not None:
+        yield "cache", value, {"status": "cache", "rows": len(value), "ms": 0}
+        return
+    with _cache_lock: _cache_stats["misses"] += 1
+    leader, call = _flight.begin(key)
+    if not leader:
+        value = call.result()
+        yield "shared", value, {"status": "shared", "rows": len(value), "ms": 0}
+        return
+    finished = False
+    stream = stream_search(query, serp_key, rapid_key)
+    df = pd.DataFrame()
+    try:
+        for name, df, state in stream:
+            yield name, df, state
+        record_search(query, df)
+        _store(key, df)
+        finished = True
+        _flight.finish(key, df)
+    except Exception as e:
+        finished = True
+        _flight.finish(key, error=e)
+        raise
+    finally:
+        # Akış yarıda bırakıldı (sayfa değişti): aynı akışı (uçuştaki kaynak çağrılarıyla) arkada tamamla
+        if not finished: _REFRESH_POOL.submit(_finish_stream, key, query, stream, df)
@@ -0,0 +1,146 @@
+import hashlib
+import io
+import threading
+import zipfile
+from collections import OrderedDict
+
+import pandas as pd
+
+# --- AYARLAR ---
+EXPORT_CACHE_BYTES = 64 * 1024 * 1024   # Hazırlanmış dosyalar için süreç başına bellek sınırı
+CSV_CHUNK_ROWS = 5000                   # CSV bu kadar satırlık parçalar halinde yazılır
+XLSX_MAX_URLS = 65530                   # Excel'in sayfa başına köprü sınırı; sonrası düz metin yazılır
+
+# Sayfa adı -> (sütunlar, {sütun: (genişlik, biçim)}); biçim: "tl", "pct", "link" ya da None
+SHEETS = {
+    "GhostDeal_Analiz": (["Ürün", "Fiyat", "Satıcı", "Kaynak", "Link"],
+                         {"Ürün": (50, None), "Fiyat": (15, "tl"), "Satıcı": (20, None), "Kaynak": (12, None), "Link": (40, "link")}),
+    "Fırsatlar": (["Ürün", "Fiyat", "Eski Fiyat", "İndirim_Oranı", "Ülke", "Link"],
+                  {"Ürün": (50, None), "Fiyat": (15, "tl"), "Eski Fiyat": (15, "tl"), "İndirim_Oranı": (10, "pct"),
+                   "Ülke": (8, None), "Link": (40, "link")}),
+    "Fiyat_Geçmişi": (["day", "n", "min", "median", "mean", "max"],
+                      {"day": (12, None), "n": (8, None), "min": (15, "tl"), "median": (15, "tl"), "mean": (15, "tl"), "max": (15, "tl")}),
+}
+FORMATS = {   # biçim -> (uzantı, mime)
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("csv", "text/csv"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "zip": ("zip", "application/zip"),
+}
+
+def _select(name, df):
+    columns = SHEETS[name][0] if name in SHEETS else list(df.columns)
+    return df[[c for c in columns if c in df]]
+
+def frame_hash(df):
+    """Sonuç kümesinin içerik özeti (satır değerleri + sütunlar); aynı veri aynı anahtarı verir."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    if not df.empty: h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def report_key(fmt, sheets):
+    return fmt + ":" + ":".join(f"{name}={frame_hash(_select(name, df))}" for name, df in sheets.items())
+
+# --- YAZICILAR ---
+def write_csv(df, fileobj, chunk_rows=CSV_CHUNK_ROWS):
+    """CSV'yi parça parça yazar (bellekte tek büyük metin oluşmaz). Excel Türkçe karakterleri için BOM'lu UTF-8."""
+    fileobj.write("\ufeff".encode("utf-8"))
+    for start in range(0, max(len(df), 1), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        fileobj.write(chunk.to_csv(index=False, header=start == 0).encode("utf-8"))
+
+def write_parquet(df, fileobj):
+    df.to_parquet(fileobj, index=False)
+
+def write_xlsx(sheets, fileobj):
+    """Çok sayfalı Excel raporu. constant_memory: satırlar sırayla yazılıp diske boşaltılır,
+    bellek kullanımı satır sayısından bağımsız kalır."""
+    import xlsxwriter
+    workbook = xlsxwriter.Workbook(fileobj, {"constant_memory": True, "strings_to_urls": False})
+    header_fmt = workbook.add_format({'bold': True, 'font_color': 'white', 'bg_color': '#8b5cf6', 'border': 1})
+    formats = {
+        "tl": workbook.add_format({'num_format': '#,##0.00 "TL"'}),
+        "pct": workbook.add_format({'num_format': '0"%"'}),
+        "link": workbook.add_format({'font_color': 'blue', 'underline': 1}),
+    }
+    for name, df in sheets.items():
+        worksheet = workbook.add_worksheet(name[:31])
+        widths = SHEETS.get(name, (None, {}))[1]
+        columns = list(df.columns)
+        for i, col in enumerate(columns):
+            width, kind = widths.get(col, (15, None))
+            worksheet.set_column(i, i, width, formats.get(kind))
+        worksheet.write_row(0, 0, columns, header_fmt)
+        links = {i for i, col in enumerate(columns) if widths.get(col, (None, None))[1] == "link"}
+        # Satırlar sütun dizilerinden sırayla yazılır (constant_memory sırayı şart koşar)
+        arrays = [df[col].astype(object).where(df[col].notna(), None).to_numpy() for col in columns]
+        urls = 0
+        for r in range(len(df)):
+            row = r + 1
+            for i, values in enumerate(arrays):
+                value = values[r]
+                if value is None: continue
+                # Link sütunu tıklanabilir köprü olarak yazılır (sayfa sınırına kadar)
+                if i in links and urls < XLSX_MAX_URLS and str(value).startswith(("http://", "https://")):
+                    worksheet.write_url(row, i, value, formats["link"], string=value)
+                    urls += 1
+                else: worksheet.write(row, i, value)
+    workbook.close()
+
+def build_report(sheets, fmt):
+    """(bytes, uzantı, mime) döner. Tek sayfalı CSV / Parquet düz dosya, çok sayfalı olanlar zip içinde."""
+    sheets = {name: _select(name, df) for name, df in sheets.items()}
+    buf = io.BytesIO()
+    if fmt == "xlsx":
+        write_xlsx(sheets, buf)
+        ext, mime = FORMATS["xlsx"]
+    elif len(sheets) == 1:
+        df = next(iter(sheets.values()))
+        (write_csv if fmt == "csv" else write_parquet)(df, buf)
+        ext, mime = FORMATS[fmt]
+    else:
+        # Parquet zaten sıkıştırılmış: zip içinde tekrar sıkıştırılmaz
+        compression = zipfile.ZIP_DEFLATED if fmt == "csv" else zipfile.ZIP_STORED
+        with zipfile.ZipFile(buf, "w", compression=compression) as zf:
+            for name, df in sheets.items():
+                with zf.open(f"{name}.{FORMATS[fmt][0]}", "w") as f:
+                    (write_csv if fmt == "csv" else write_parquet)(df, f)
+        ext, mime = FORMATS["zip"]
+    return buf.getvalue(), ext, mime
+
+# --- HAZIRLANMIŞ DOSYA ÖNBELLEĞİ ---
+class ExportCache:
+    """Hazırlanan dosyaların baytları, içerik özeti anahtarıyla (bayt sınırlı LRU, thread-safe).
+
+    Aynı sonuç kümesini indiren tüm oturumlar dosyayı bir kez ürettirir.
+    """
+    def __init__(self, max_bytes=EXPORT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()   # anahtar -> (bytes, uzantı, mime)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None: self._items.move_to_end(key)
+            return item
+
+    def put(self, key, item):
+        with self._lock:
+            if key in self._items: self._size -= len(self._items.pop(key)[0])
+            self._items[key] = item
+            self._size += len(item[0])
+            while self._size > self.max_bytes and len(self._items) > 1:
+                _, old = self._items.popitem(last=False)
+                self._size -= len(old[0])
+
+    def export(self, sheets, fmt):
+        """(anahtar, bytes, uzantı, mime): önbellekte varsa üretmeden döner."""
+        key = report_key(fmt, sheets)
+        item = self.get(key)
+        if item is None:
+            item = build_report(sheets, fmt)
+            self.put(key, item)
+        return (key,) + item
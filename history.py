@@ -0,0 +1,134 @@
+import glob
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+# --- AYARLAR ---
+HISTORY_DIR = os.environ.get("GHOSTDEAL_HISTORY", "ghostdeal_history")
+HISTORY_COLUMNS = ["product_key", "seller", "source", "price", "ts"]
+
+def _day(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d")
+
+# --- FİYAT GEÇMİŞİ (Günlük bölümlü, sadece ekleme yapılan Parquet + artımlı özet) ---
+class PriceHistory:
+    """Her arama / fırsat gözlemini (ürün, satıcı, kaynak, fiyat, zaman) saklar.
+
+    Ham gözlemler day=YYYY-MM-DD/ klasörlerine Parquet parçaları olarak eklenir (hiç güncellenmez).
+    Her eklemede ürün-gün özeti (adet, min, max, toplam, medyan) SQLite'ta artımlı güncellenir;
+    trend / medyan sorguları ham veriyi taramadan bu özetten okunur.
+    """
+    def __init__(self, directory=HISTORY_DIR):
+        self.directory = directory
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.directory, "summary.sqlite3"), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS daily (
+                product_key TEXT NOT NULL, day TEXT NOT NULL,
+                n INTEGER NOT NULL, min REAL NOT NULL, max REAL NOT NULL, sum REAL NOT NULL, p50 REAL NOT NULL,
+                PRIMARY KEY (product_key, day))""")
+            self._local.conn = conn
+        return conn
+
+    # --- Yazma ---
+    def append(self, obs, ts=None):
+        """obs: product_key, seller, source, price sütunlu DataFrame. Eklenen satır sayısını döner."""
+        obs = obs[obs["price"] > 0]
+        if obs.empty: return 0
+        ts = time.time() if ts is None else ts
+        obs = obs.assign(ts=ts)[HISTORY_COLUMNS]
+        day = _day(ts)
+
+        part_dir = os.path.join(self.directory, f"day={day}")
+        os.makedirs(part_dir, exist_ok=True)
+        obs.to_parquet(os.path.join(part_dir, f"part-{int(ts * 1000)}-{uuid.uuid4().hex[:8]}.parquet"), index=False)
+
+        # Artımlı özet: gün içi medyan, parça medyanlarının ağırlıklı ortalamasıyla yaklaşıklanır
+        agg = obs.groupby("product_key")["price"].agg(["count", "min", "max", "sum", "median"])
+        with self._conn() as conn:
+            conn.executemany("""INSERT INTO daily VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(product_key, day) DO UPDATE SET
+                    p50 = (p50 * n + excluded.p50 * excluded.n) / (n + excluded.n),
+                    n = n + excluded.n, min = MIN(min, excluded.min), max = MAX(max, excluded.max),
+                    sum = sum + excluded.sum""",
+                [(key, day, int(r["count"]), float(r["min"]), float(r["max"]), float(r["sum"]), float(r["median"]))
+                 for key, r in agg.iterrows()])
+        return len(obs)
+
+    def record_search(self, product_key, df):
+        """search_all_sources çıktısını sorgu anahtarı altında kaydeder."""
+        if df.empty: return 0
+        return self.append(pd.DataFrame({
+            "product_key": product_key, "seller": df["Satıcı"].astype(str).to_numpy(),
+            "source": df["Kaynak"].astype(str).to_numpy(), "price": df["Fiyat"].to_numpy(dtype=float)}))
+
+    def record_deals(self, df, key_fn):
+        """get_amazon_deals çıktısını, başlıktan türetilen ürün anahtarıyla kaydeder."""
+        if df.empty: return 0
+        return self.append(pd.DataFrame({
+            "product_key": df["Ürün"].astype(str).map(key_fn).to_numpy(), "seller": "Amazon",
+            "source": "Amazon Fırsat", "price": df["Fiyat"].to_numpy(dtype=float)}))
+
+    # --- Okuma (özet tablodan) ---
+    def daily(self, product_key, days=30):
+        """Son `days` gün için günlük özet: day, n, min, max, mean, median."""
+        since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+        df = pd.read_sql_query("SELECT day, n, min, max, sum, p50 FROM daily WHERE product_key = ? AND day >= ? ORDER BY day",
+                               self._conn(), params=(product_key, since))
+        df["mean"] = df["sum"] / df["n"]
+        return df.drop(columns=["sum"]).rename(columns={"p50": "median"})
+
+    def stats(self, product_key, days=30):
+        """Kayan pencere istatistikleri; veri yoksa None.
+
+        trend: günlük en düşük fiyatın doğrusal eğimi (TL / gün).
+        """
+        d = self.daily(product_key, days)
+        if d.empty: return None
+        trend = 0.0
+        if len(d) >= 2:
+            x = (pd.to_datetime(d["day"]) - pd.to_datetime(d["day"].iloc[0])).dt.days.to_numpy(dtype=float)
+            trend = float(np.polyfit(x, d["min"].to_numpy(dtype=float), 1)[0])
+        return {
+            "n": int(d["n"].sum()), "days": len(d),
+            "min": float(d["min"].min()),
+            "median": float(np.average(d["median"], weights=d["n"])),
+            "last_min": float(d["min"].iloc[-1]),
+            "trend": trend,
+        }
+
+    # --- Ham veri ---
+    def scan(self, since_day=None, product_key=None):
+        """Ham gözlemleri okur (sadece istenen gün bölümleri açılır)."""
+        frames = []
+        for part_dir in sorted(glob.glob(os.path.join(self.directory, "day=*"))):
+            if since_day and part_dir.rsplit("=", 1)[1] < since_day: continue
+            filters = [("product_key", "==", product_key)] if product_key else None
+            for path in sorted(glob.glob(os.path.join(part_dir, "*.parquet"))):
+                frames.append(pd.read_parquet(path, filters=filters))
+        if not frames: return pd.DataFrame(columns=HISTORY_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def compact(self, before_day=None):
+        """Bitmiş günlerin küçük parçalarını gün başına tek dosyada birleştirir."""
+        before_day = before_day or _day(time.time())
+        for part_dir in sorted(glob.glob(os.path.join(self.directory, "day=*"))):
+            if part_dir.rsplit("=", 1)[1] >= before_day: continue
+            parts = sorted(glob.glob(os.path.join(part_dir, "part-*.parquet")))
+            if len(parts) < 2: continue
+            merged = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True).sort_values(["product_key", "ts"])
+            tmp = os.path.join(part_dir, ".compacted.tmp")
+            merged.to_parquet(tmp, index=False)
+            os.replace(tmp, os.path.join(part_dir, f"part-{uuid.uuid4().hex[:8]}-compacted.parquet"))
+            for p in parts: os.remove(p)
@@ -0,0 +1,193 @@
+import heapq
+import json
+import logging
+import os
+import random
+import smtplib
+import threading
+import time
+from collections import deque
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+import metrics
+from engine import TokenBucket
+
+log = logging.getLogger("ghostdeal.mailer")
+
+# --- AYARLAR ---
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 587
+MAIL_RATE_PER_MIN = 30      # Sağlayıcı kısıtlamasına takılmamak için dakikada en fazla
+MAIL_BATCH_SIZE = 50        # Bir bağlantı turunda gönderilecek en fazla mesaj
+MAIL_MAX_ATTEMPTS = 4       # Bu kadar denemeden sonra ölü mektuplara düşer
+MAIL_RETRY_BACKOFF = 5.0    # Tekrar bekleme tabanı (sn), her denemede 2 katı
+SMTP_IDLE_TIMEOUT = 60.0    # Bu kadar boşta kalan bağlantı kapatılır
+DEAD_LETTER_PATH = os.environ.get("GHOSTDEAL_DEAD_LETTERS", "ghostdeal_dead_letters.jsonl")
+
+def build_alert_message(sender_email, to_email, product_name, price, link):
+    subject = f"🚨 FİYAT DÜŞTÜ: {product_name}"
+    body = f"<html><body><h2>🔥 GhostDeal Yakaladı!</h2><h3>📦 {product_name}</h3><h1 style='color:green;'>{price}</h1><a href='{link}'>ÜRÜNE GİT</a></body></html>"
+    msg = MIMEMultipart()
+    msg['From'] = f"GhostDeal AI <{sender_email}>"
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'html'))
+    return msg
+
+# --- GÖNDERİM KUYRUĞU ---
+class MailDispatcher:
+    """Bloklamayan e-posta kuyruğu: tek kalıcı SMTP oturumu, toplu gönderim, hız sınırı,
+    tekrar deneme ve ölü mektup dosyası.
+
+    Yerel test için: `python -m aiosmtpd -n -l localhost:8025` ve
+    MailDispatcher("localhost", 8025, starttls=False).
+    """
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, username=None, password=None, starttls=True,
+                 rate_per_min=MAIL_RATE_PER_MIN, batch_size=MAIL_BATCH_SIZE,
+                 max_attempts=MAIL_MAX_ATTEMPTS, dead_letter_path=DEAD_LETTER_PATH):
+        self.host, self.port = host, port
+        self.username, self.password = username, password
+        self.starttls = starttls
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.dead_letter_path = dead_letter_path
+        self.bucket = TokenBucket(rate_per_min / 60.0, capacity=max(1, rate_per_min // 6))
+        self.stats = {"queued": 0, "sent": 0, "retried": 0, "dead": 0, "connections": 0}
+
+        self._cond = threading.Condition()
+        self._ready = deque()     # (deneme, mesaj, geri çağrılar)
+        self._delayed = []        # heap: (zaman, sıra, deneme, mesaj, geri çağrılar)
+        self._seq = 0
+        self._pending = 0         # Kuyrukta veya gönderimde olan mesaj sayısı
+        self._smtp = None
+        self._last_used = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Dış arayüz ---
+    def send(self, msg, on_sent=None, on_dead=None):
+        """Mesajı kuyruğa koyar ve hemen döner.
+
+        on_sent: mesaj SMTP sunucusuna teslim edilince, on_dead: ölü mektuplara düşünce (işçi thread'inde) çağrılır.
+        """
+        with self._cond:
+            self._ready.append((1, msg, (on_sent, on_dead)))
+            self._pending += 1
+            self.stats["queued"] += 1
+            self._cond.notify()
+        self._ensure_worker()
+
+    def flush(self, timeout=None):
+        """Kuyruk boşalana kadar bekler (tekrar denemeler dahil). Boşaldıysa True."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout=None):
+        self.flush(timeout)
+        self._stop.set()
+        with self._cond: self._cond.notify_all()
+        if self._thread: self._thread.join(timeout)
+        self._disconnect()
+
+    # --- İşçi ---
+    def _ensure_worker(self):
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="ghostdeal-mailer", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    _, _, attempt, msg, callbacks = heapq.heappop(self._delayed)
+                    self._ready.append((attempt, msg, callbacks))
+                if self._ready:
+                    return [self._ready.popleft() for _ in range(min(self.batch_size, len(self._ready)))]
+                wait_s = self._delayed[0][0] - now if self._delayed else SMTP_IDLE_TIMEOUT
+                if not self._cond.wait(min(wait_s, SMTP_IDLE_TIMEOUT)) and not self._delayed:
+                    return []  # Boşta kaldık
+            return []
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                if self._smtp and time.monotonic() - self._last_used > SMTP_IDLE_TIMEOUT: self._disconnect()
+                continue
+            for attempt, msg, callbacks in batch:
+                self.bucket.acquire()
+                try:
+                    self._connect().send_message(msg)
+                    self._last_used = time.monotonic()
+                except (smtplib.SMTPException, OSError) as e:
+                    # Bağlantı bozulmuş olabilir; sonraki mesaj yeni oturum açsın
+                    self._disconnect()
+                    self._failed(attempt, msg, callbacks, e)
+                    continue
+                self._notify(callbacks[0], msg)
+                self._done("sent")
+
+    def _done(self, counter):
+        with self._cond:
+            self.stats[counter] += 1
+            self._pending -= 1
+            self._cond.notify_all()
+
+    def _notify(self, callback, msg):
+        if callback is None: return
+        try: callback(msg)
+        except Exception:
+            log.exception("Gönderim geri çağrısı hatası")
+            metrics.inc("ghostdeal_errors_total", component="mailer")
+
+    def _failed(self, attempt, msg, callbacks, error):
+        if attempt >= self.max_attempts:
+            self._dead_letter(msg, attempt, error)
+            self._notify(callbacks[1], msg)
+            self._done("dead")
+            return
+        delay = random.uniform(0.5, 1.0) * MAIL_RETRY_BACKOFF * (2 ** (attempt - 1))
+        with self._cond:
+            self._seq += 1
+            heapq.heappush(self._delayed, (time.monotonic() + delay, self._seq, attempt + 1, msg, callbacks))
+            self.stats["retried"] += 1
+            self._cond.notify()
+
+    def _dead_letter(self, msg, attempts, error):
+        record = {"ts": time.time(), "to": msg['To'], "subject": msg['Subject'], "attempts": attempts,
+                  "error": str(error), "message": msg.as_string()}
+        try:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            log.error("Ölü mektup yazılamadı: %s", e)
+            metrics.inc("ghostdeal_errors_total", component="mailer")
+
+    # --- SMTP oturumu (tekrar kullanılır) ---
+    def _connect(self):
+        if self._smtp is None:
+            server = smtplib.SMTP(self.host, self.port, timeout=30)
+            if self.starttls: server.starttls()
+            if self.username and self.password: server.login(self.username, self.password)
+            self._smtp = server
+            self.stats["connections"] += 1
+        return self._smtp
+
+    def _disconnect(self):
+        server, self._smtp = self._smtp, None
+        if server is None: return
+        try: server.quit()
+        except (smtplib.SMTPException, OSError): pass
+
+def dispatcher_from_secrets(secrets):
+    """engine.load_secrets() çıktısından kuyruk kurar (SMTP_HOST / SMTP_PORT / SMTP_STARTTLS opsiyonel)."""
+    return MailDispatcher(
+        host=secrets.get("SMTP_HOST", SMTP_HOST),
+        port=int(secrets.get("SMTP_PORT", SMTP_PORT)),
+        username=secrets.get("EMAIL_SENDER"),
+        password=secrets.get("EMAIL_PASSWORD"),
+        starttls=str(secrets.get("SMTP_STARTTLS", "1")).lower() not in ("0", "false", "no"),
+    )
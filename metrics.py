@@ -0,0 +1,191 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- AYARLAR ---
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # sn
+
+# Bilinen metrikler: ad -> (tür, açıklama). Bilinmeyen ad kullanılırsa sayaç kabul edilir.
+METRICS = {
+    "ghostdeal_source_latency_seconds": ("histogram", "Kaynak başına arama süresi (sn)"),
+    "ghostdeal_source_results_total": ("counter", "Kaynak sonuçları (durum: ok / empty / timeout / error / no_key / budget)"),
+    "ghostdeal_upstream_calls_total": ("counter", "Kotadan düşülen upstream çağrıları (sağlayıcı)"),
+    "ghostdeal_http_responses_total": ("counter", "Upstream HTTP yanıtları (host, durum kodu ya da hata türü)"),
+    "ghostdeal_filter_input_rows_total": ("counter", "Filtrelere giren satırlar"),
+    "ghostdeal_filter_dropped_rows_total": ("counter", "Filtre aşamasında elenen satırlar"),
+    "ghostdeal_stage_seconds": ("histogram", "Arama hattı aşama süreleri (filtre / eşleştirme) (sn)"),
+    "ghostdeal_rerun_seconds": ("histogram", "Streamlit sayfa çalıştırma (rerun) süresi (sn)"),
+    "ghostdeal_errors_total": ("counter", "Yakalanıp kaydedilen hatalar (bileşen)"),
+}
+
+def _labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _fmt_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs: return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+def _fmt_value(v):
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Kova sınırlarından yaklaşık yüzdelik (Prometheus histogram_quantile gibi, doğrusal)."""
+        if not self.count: return None
+        rank, seen, lower = q * self.count, 0, 0.0
+        for upper, n in zip(self.buckets, self.counts):
+            if seen + n >= rank and n:
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+            lower = upper
+        return self.buckets[-1]
+
+class Registry:
+    """Süreç içi sayaç / histogram kaydı (thread-safe) ve Prometheus metin çıktısı.
+
+    Dış modüllerin kendi sayaçları (önbellek, HTTP havuzu) `collector` ile bağlanır;
+    bunlar sadece çıktı alınırken okunur.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}     # ad -> {etiketler: değer}
+        self._histograms = {}   # ad -> {etiketler: _Histogram}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def inc(self, name, n=1, **labels):
+        key = _labels_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + n
+
+    def observe(self, name, value, **labels):
+        key = _labels_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None: hist = series[key] = _Histogram(self.buckets)
+            hist.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try: yield
+        finally: self.observe(name, time.perf_counter() - start, **labels)
+
+    def collector(self, fn):
+        """fn() -> [(ad, tür, açıklama, etiketler, değer)]; tür "counter" ya da "gauge"."""
+        self._collectors.append(fn)
+        return fn
+
+    def _collected(self):
+        out = []
+        for fn in self._collectors:
+            try: out.extend(fn())
+            except Exception: continue   # Bir toplayıcının hatası çıktının tamamını bozmasın
+        return out
+
+    def render(self):
+        """Prometheus metin formatı (0.0.4)."""
+        lines = []
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {k: (list(h.counts), h.count, h.sum) for k, h in series.items()}
+                          for name, series in self._histograms.items()}
+        for name in sorted(counters):
+            _, help_text = METRICS.get(name, ("counter", ""))
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            lines += [f"{name}{_fmt_labels(k)} {_fmt_value(v)}" for k, v in sorted(counters[name].items())]
+        for name in sorted(histograms):
+            _, help_text = METRICS.get(name, ("histogram", ""))
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for k, (counts, count, total) in sorted(histograms[name].items()):
+                cumulative = 0
+                for upper, n in zip(self.buckets, counts):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{_fmt_labels(k, [('le', upper)])} {cumulative}")
+                lines.append(f"{name}_bucket{_fmt_labels(k, [('le', '+Inf')])} {count}")
+                lines.append(f"{name}_sum{_fmt_labels(k)} {_fmt_value(total)}")
+                lines.append(f"{name}_count{_fmt_labels(k)} {count}")
+        seen = set()
+        for name, kind, help_text, labels, value in self._collected():
+            if name not in seen:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                seen.add(name)
+            lines.append(f"{name}{_fmt_labels(_labels_key(labels))} {_fmt_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Yönetim sayfası için düz tablo: (sayaçlar, histogramlar) satır listeleri."""
+        with self._lock:
+            counters = [{"metrik": name, "etiketler": dict(k), "değer": v}
+                        for name, series in self._counters.items() for k, v in series.items()]
+            histograms = [{"metrik": name, "etiketler": dict(k), "adet": h.count,
+                           "ort_ms": h.sum / h.count * 1000 if h.count else None,
+                           "p50_ms": (h.quantile(0.5) or 0) * 1000, "p95_ms": (h.quantile(0.95) or 0) * 1000}
+                          for name, series in self._histograms.items() for k, h in series.items()]
+        counters += [{"metrik": name, "etiketler": labels, "değer": value}
+                     for name, _, _, labels, value in self._collected()]
+        return counters, histograms
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+collector = REGISTRY.collector
+render = REGISTRY.render
+snapshot = REGISTRY.snapshot
+
+# --- /metrics UÇ NOKTASI (Prometheus kazıyıcısı için) ---
+_server = None
+_server_lock = threading.Lock()
+
+def serve(port, host="0.0.0.0", registry=REGISTRY):
+    """/metrics yolunu arka plan thread'inde sunar. Süreç başına bir kez başlar; sunucuyu döner."""
+    global _server
+    with _server_lock:
+        if _server is not None: return _server
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args): pass
+
+        _server = ThreadingHTTPServer((host, port), Handler)
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="ghostdeal-metrics", daemon=True).start()
+        return _server
+
+def serve_from_env():
+    """GHOSTDEAL_METRICS_PORT tanımlıysa /metrics uç noktasını başlatır (işçiler ve uygulama için)."""
+    port = os.environ.get("GHOSTDEAL_METRICS_PORT")
+    return serve(int(port)) if port else None
@@ -0,0 +1,148 @@
+import argparse
+import glob
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+import metrics
+from engine import get_amazon_deals, get_history, load_secrets, record_deals
+
+log = logging.getLogger("ghostdeal.snapshots")
+
+# --- AYARLAR ---
+SNAPSHOT_DIR = os.environ.get("GHOSTDEAL_SNAPSHOTS", "ghostdeal_snapshots")
+SNAPSHOT_INTERVAL = 3600   # Fırsat listesini bu aralıkla yenile (sn)
+SNAPSHOT_KEEP = 48         # Diskte tutulacak en fazla sürüm
+DEAL_KEY = ["Ülke", "Ürün"]
+
+# --- SÜRÜMLÜ FIRSAT ANLIK GÖRÜNTÜSÜ (Parquet) ---
+class DealsSnapshotStore:
+    """Fırsat listesinin sürümlü, paylaşımlı kopyaları.
+
+    Yazan: zamanlanmış iş (python snapshots.py). Okuyan: AMAZON VİTRİN sayfası; son sürüm
+    süreç içinde bir kez okunur, yeni sürüm gelene kadar aynı DataFrame paylaşılır.
+    """
+    def __init__(self, directory=SNAPSHOT_DIR, keep=SNAPSHOT_KEEP):
+        self.directory = directory
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._loaded = {}   # dosya adı -> (sürüm, DataFrame)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _write_atomic(self, name, df):
+        tmp = self._path(f".{name}.tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, self._path(name))
+
+    def latest_version(self):
+        try:
+            with open(self._path("LATEST"), encoding="utf-8") as f: return f.read().strip() or None
+        except FileNotFoundError: return None
+
+    def _read(self, name, version):
+        with self._lock:
+            cached = self._loaded.get(name)
+            if cached and cached[0] == version: return cached[1]
+        df = pd.read_parquet(self._path(f"{name}-{version}.parquet"))
+        with self._lock: self._loaded[name] = (version, df)
+        return df
+
+    def read(self, version):
+        """Belirli bir sürümün fırsatları (süreç içinde bir kez okunur)."""
+        return self._read("deals", version)
+
+    def latest(self):
+        """(sürüm, fırsatlar) döner; henüz sürüm yoksa (None, boş DataFrame)."""
+        version = self.latest_version()
+        if version is None: return None, pd.DataFrame()
+        return version, self._read("deals", version)
+
+    def latest_changes(self):
+        """Son sürümün bir öncekine göre farkı ('Değişim' sütunu: Yeni / Daha Derin / Bitti)."""
+        version = self.latest_version()
+        if version is None or not os.path.exists(self._path(f"changes-{version}.parquet")): return pd.DataFrame()
+        return self._read("changes", version)
+
+    def write(self, df):
+        """Yeni sürümü yazar, öncekiyle farkını kaydeder, eski sürümleri temizler. (sürüm, fark) döner."""
+        os.makedirs(self.directory, exist_ok=True)
+        previous_version, previous = self.latest()
+        version = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+        changes = diff_deals(previous, df) if previous_version else pd.DataFrame()
+
+        self._write_atomic(f"deals-{version}.parquet", df)
+        if not changes.empty: self._write_atomic(f"changes-{version}.parquet", changes)
+        # Sürüm işaretçisi en son değişir: okuyucular asla yarım sürüm görmez
+        tmp = self._path(".LATEST.tmp")
+        with open(tmp, "w", encoding="utf-8") as f: f.write(version)
+        os.replace(tmp, self._path("LATEST"))
+        self._prune()
+        return version, changes
+
+    def _prune(self):
+        for prefix in ("deals", "changes"):
+            files = sorted(glob.glob(self._path(f"{prefix}-*.parquet")))
+            for old in files[:-self.keep]:
+                try: os.remove(old)
+                except OSError: pass
+
+def diff_deals(old, new):
+    """İki fırsat listesi arasındaki fark: yeni fırsatlar, indirimi derinleşenler ve bitenler."""
+    if old.empty and new.empty: return pd.DataFrame()
+    if old.empty: return new.assign(Değişim="Yeni")
+    if new.empty: return old.assign(Değişim="Bitti")
+    merged = new.merge(old[DEAL_KEY + ["Fiyat", "İndirim_Oranı"]], on=DEAL_KEY, how="outer",
+                       suffixes=("", "_önceki"), indicator=True)
+    added = merged[merged["_merge"] == "left_only"]
+    deeper = merged[(merged["_merge"] == "both") & (merged["İndirim_Oranı"] > merged["İndirim_Oranı_önceki"])]
+    expired = old.merge(new[DEAL_KEY], on=DEAL_KEY, how="left", indicator=True)
+    expired = expired[expired["_merge"] == "left_only"]
+    changes = pd.concat([
+        added.assign(Değişim="Yeni"),
+        deeper.assign(Değişim="Daha Derin"),
+        expired.assign(Değişim="Bitti"),
+    ], ignore_index=True)
+    return changes.drop(columns=["_merge"])
+
+# --- ZAMANLANMIŞ İŞ ---
+def ingest(store, rapid_key, countries):
+    df = get_amazon_deals(rapid_key, countries)
+    if df.empty:
+        log.info("Fırsat alınamadı, mevcut sürüm korunuyor.")
+        return None
+    version, changes = store.write(df)
+    record_deals(df)
+    counts = changes["Değişim"].value_counts().to_dict() if not changes.empty else {}
+    log.info("[%s] %d fırsat | yeni: %d, daha derin: %d, biten: %d", version, len(df),
+             counts.get("Yeni", 0), counts.get("Daha Derin", 0), counts.get("Bitti", 0))
+    return version
+
+def main():
+    parser = argparse.ArgumentParser(description="GhostDeal fırsat anlık görüntü işi")
+    parser.add_argument("--countries", default="TR", help="Virgülle ayrılmış ülke kodları (örn: TR,DE)")
+    parser.add_argument("--interval", type=int, default=SNAPSHOT_INTERVAL, help="Yenileme aralığı (sn)")
+    parser.add_argument("--once", action="store_true", help="Tek sefer çalış ve çık")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    metrics.serve_from_env()
+
+    store = DealsSnapshotStore()
+    rapid_key = load_secrets().get("RAPID_API_KEY")
+    countries = [c.strip().upper() for c in args.countries.split(",") if c.strip()]
+    while True:
+        try:
+            ingest(store, rapid_key, countries)
+            get_history().compact()
+        except Exception:
+            log.exception("Fırsat işi hatası")
+            metrics.inc("ghostdeal_errors_total", component="snapshots")
+        if args.once: break
+        time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
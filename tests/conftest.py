@@ -0,0 +1,71 @@
+import os
+import socketserver
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+@pytest.fixture
+def mock_api(tmp_path, monkeypatch):
+    """Motoru yerel sahte API'ye bağlar; önbellek, geçmiş ve bütçe geçici klasörde tutulur."""
+    import engine
+    from history import PriceHistory
+    from mock_api import MockApiServer
+
+    monkeypatch.setattr(engine, "RAPID_BASE_URL", engine.RAPID_BASE_URL)
+    monkeypatch.setattr(engine, "SERPAPI_BASE_URL", engine.SERPAPI_BASE_URL)
+    monkeypatch.setattr(engine, "_cache", engine.ResultCache(path=str(tmp_path / "cache.sqlite3")))
+    monkeypatch.setattr(engine, "_history", PriceHistory(str(tmp_path / "history")))
+    monkeypatch.setattr(engine, "_budget", None)
+    with MockApiServer(latency=0.2) as server:
+        server.attach()
+        yield server
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    """En küçük SMTP diyaloğu: EHLO / MAIL / RCPT / DATA / QUIT. `failures` kadar MAIL komutu 451 ile reddedilir."""
+    def reply(self, text):
+        self.wfile.write(text.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        self.reply("220 ghostdeal-test ESMTP")
+        lines, in_data = [], False
+        for raw in self.rfile:
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            if in_data:
+                if line == ".":
+                    server.messages.append("\n".join(lines))
+                    lines, in_data = [], False
+                    self.reply("250 OK")
+                else: lines.append(line[1:] if line.startswith("..") else line)
+                continue
+            cmd = line[:4].upper()
+            if cmd in ("EHLO", "HELO"): self.reply("250 ghostdeal-test")
+            elif cmd == "MAIL":
+                with server.lock:
+                    refuse = server.failures > 0
+                    if refuse: server.failures -= 1
+                self.reply("451 try again later" if refuse else "250 OK")
+            elif cmd in ("RCPT", "RSET", "NOOP"): self.reply("250 OK")
+            elif cmd == "DATA":
+                in_data = True
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+            elif cmd == "QUIT":
+                self.reply("221 Bye")
+                return
+            else: self.reply("500 unknown command")
+
+@pytest.fixture
+def smtp_server():
+    """Yerel SMTP sunucusu: server.messages teslim alınanlar, server.failures reddedilecek MAIL sayısı."""
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SmtpHandler)
+    server.daemon_threads = True
+    server.messages, server.failures, server.lock = [], 0, threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
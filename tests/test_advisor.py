@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+import engine
+from advisor import DealAdvisor, StubModel
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, "_cache", engine.ResultCache(path=str(tmp_path / "cache.sqlite3")))
+
+def test_verdict_is_generated_once_and_cached(cache):
+    model = StubModel(answer="Alınır.")
+    advisor = DealAdvisor(lambda: model)
+    assert advisor.analyze("iPhone 13", 30000, timeout=5) == "Alınır."
+    assert advisor.analyze("iphone  13", 30500, timeout=5) == "Alınır."   # Aynı sorgu, aynı fiyat bandı
+    assert len(model.prompts) == 1
+    assert advisor.stats["calls"] == 1 and advisor.stats["cache_hits"] == 1
+
+def test_concurrent_requests_share_one_call(cache):
+    gate = threading.Event()
+
+    class SlowModel(StubModel):
+        def generate_content(self, prompt):
+            gate.wait(5)
+            return super().generate_content(prompt)
+
+    model = SlowModel()
+    advisor = DealAdvisor(lambda: model)
+    first = advisor.analyze_async("ps5", 20000)
+    second = advisor.analyze_async("ps5", 20000)
+    assert first is second and not first.done()
+    gate.set()
+    assert first.result(5) == model.answer
+    assert len(model.prompts) == 1 and advisor.stats["shared"] == 1
+
+def test_model_error_is_reported_and_not_cached(cache):
+    class BrokenModel(StubModel):
+        def generate_content(self, prompt):
+            raise RuntimeError("kota")
+
+    advisor = DealAdvisor(BrokenModel)
+    with pytest.raises(RuntimeError):
+        advisor.analyze("ps5", 20000, timeout=5)
+    assert advisor.stats["errors"] == 1
+    assert advisor.cached("ps5", 20000) is None
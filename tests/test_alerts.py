@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+import alerts
+import mailer
+from alerts import WatchlistStore, run_cycle
+from mailer import MailDispatcher
+
+SECRETS = {"EMAIL_SENDER": "ghost@example.com"}
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = WatchlistStore(str(tmp_path / "watchlist.sqlite3"))
+    store.add("iphone 13", 50000, "user@example.com")
+    monkeypatch.setattr(alerts, "fetch_best_offers", lambda queries, *keys: {k: (42000.0, "https://example.com/p") for k in queries})
+    monkeypatch.setattr(mailer, "MAIL_RETRY_BACKOFF", 0.01)
+    monkeypatch.setattr(alerts, "_in_flight", set())
+    return store
+
+def dispatcher(smtp_server, tmp_path, **kwargs):
+    host, port = smtp_server.server_address
+    return MailDispatcher(host, port, starttls=False, rate_per_min=6000,
+                          dead_letter_path=str(tmp_path / "dead.jsonl"), **kwargs)
+
+def test_alarm_closes_after_delivery(store, smtp_server, tmp_path):
+    queue = dispatcher(smtp_server, tmp_path)
+    assert run_cycle(store, SECRETS, queue) == 1
+    assert queue.flush(timeout=10)
+    assert len(smtp_server.messages) == 1
+    assert store.active().empty
+    assert store.list()["triggered_price"].tolist() == [42000.0]
+    queue.close()
+
+def test_alarm_closes_after_retries(store, smtp_server, tmp_path):
+    smtp_server.failures = 2
+    queue = dispatcher(smtp_server, tmp_path)
+    run_cycle(store, SECRETS, queue)
+    assert queue.flush(timeout=10)
+    assert queue.stats["retried"] == 2 and queue.stats["sent"] == 1
+    assert store.active().empty
+    queue.close()
+
+def test_dead_lettered_alarm_stays_armed(store, smtp_server, tmp_path):
+    smtp_server.failures = 10**6
+    queue = dispatcher(smtp_server, tmp_path, max_attempts=2)
+    run_cycle(store, SECRETS, queue)
+    assert queue.flush(timeout=10)
+    assert queue.stats["dead"] == 1
+    with open(tmp_path / "dead.jsonl", encoding="utf-8") as f:
+        assert json.loads(f.readline())["to"] == "user@example.com"
+    assert len(store.active()) == 1   # Kullanıcı haber almadı: alarm kapanmadı
+
+    smtp_server.failures = 0          # SMTP düzeldi: sonraki tur bildirimi yeniden dener
+    assert run_cycle(store, SECRETS, queue) == 1
+    assert queue.flush(timeout=10)
+    assert len(smtp_server.messages) == 1
+    assert store.active().empty
+    queue.close()
+
+def test_queued_alarm_is_not_sent_twice(store, smtp_server, tmp_path):
+    queue = dispatcher(smtp_server, tmp_path)
+    queue._ensure_worker = lambda: None   # İşçi başlamasın: bildirim kuyrukta beklesin
+    assert run_cycle(store, SECRETS, queue) == 1
+    assert run_cycle(store, SECRETS, queue) == 0
+    del queue._ensure_worker
+    queue._ensure_worker()
+    assert queue.flush(timeout=10)
+    assert len(smtp_server.messages) == 1
+    queue.close()
@@ -0,0 +1,13 @@
+import engine
+from barcode import BarcodeCache, resolve_barcode
+
+def test_new_barcode_costs_one_search(mock_api, tmp_path):
+    cache = BarcodeCache(str(tmp_path / "barcodes.sqlite3"))
+    title = resolve_barcode("8690000000001", "serp", "rapid", cache)
+    assert title
+    assert mock_api.counts["requests"] == 2      # Kaynak başına bir barkod araması
+    df = engine.cached_search_all(title, "serp", "rapid")
+    assert not df.empty
+    assert mock_api.counts["requests"] == 2      # Başlık araması barkodun sonuçlarından gelir
+    assert resolve_barcode("8690000000001", "serp", "rapid", cache) == title
+    assert mock_api.counts["requests"] == 2
@@ -0,0 +1,52 @@
+import engine
+from batch import MAX_WORKERS, BatchRunner, Checkpoint, JsonlWriter
+
+SECRETS = {"SERP_API_KEY": "serp", "RAPID_API_KEY": "rapid"}
+
+def run_batch(tmp_path, items, workers=2):
+    checkpoint = Checkpoint()
+    writer = JsonlWriter(str(tmp_path / "out.jsonl"), checkpoint)
+    runner = BatchRunner(SECRETS, writer, workers=workers)
+    runner.run(items, progress=0)
+    writer.close()
+    return runner, checkpoint
+
+def test_answered_items_are_checkpointed(mock_api, tmp_path):
+    runner, checkpoint = run_batch(tmp_path, ["iphone 13", "ps5"])
+    assert checkpoint.done == {"iphone 13", "ps5"}
+    assert runner.stats["failed"] == 0
+
+def test_budget_skipped_items_are_retried(mock_api, tmp_path, monkeypatch):
+    budget = engine.QuotaBudget(path=str(tmp_path / "budget.sqlite3"), quotas={"serpapi": (1, 0), "rapidapi": (1, 0)})
+    budget.spend("serpapi")
+    budget.spend("rapidapi")
+    monkeypatch.setattr(engine, "_budget", budget)
+    runner, checkpoint = run_batch(tmp_path, ["iphone 13"])
+    assert checkpoint.done == set()
+    assert runner.stats["failed"] == 1
+    assert mock_api.counts["requests"] == 0
+
+def test_workers_are_capped_to_engine_pool(tmp_path):
+    runner = BatchRunner(SECRETS, writer=None, workers=32)
+    assert runner.workers == MAX_WORKERS == engine.SEARCH_CONCURRENCY
+
+def test_unresolved_barcode_is_retried_when_no_source_answered(mock_api, tmp_path):
+    from barcode import BarcodeCache
+    mock_api.error_rate = 1.0
+    checkpoint = Checkpoint()
+    writer = JsonlWriter(str(tmp_path / "out.jsonl"), checkpoint)
+    runner = BatchRunner(SECRETS, writer, workers=1, barcode_cache=BarcodeCache(str(tmp_path / "barcodes.sqlite3")))
+    runner.run(["8690000000001"], progress=0)
+    writer.close()
+    assert checkpoint.done == set()
+    assert runner.stats["failed"] == 1
+    assert runner.stats["unresolved"] == 0
+
+def test_stale_cache_entries_are_refetched(mock_api, tmp_path):
+    import pandas as pd
+    stale = engine.offer_frame([{"Ürün": "iphone 13 eski", "Fiyat": 1.0, "Satıcı": "x", "Link": "#", "Kaynak": "Google"}])
+    engine.get_cache().set("search:iphone 13", stale, ttl=-60)   # Taze süresi geçmiş, bayat sunulabilir
+    run_batch(tmp_path, ["iphone 13"])
+    assert mock_api.counts["requests"] == 2
+    rows = pd.read_json(tmp_path / "out.jsonl", lines=True)
+    assert not rows.empty and "iphone 13 eski" not in set(rows["product"])
@@ -0,0 +1,165 @@
+import numpy as np
+
+from engine import parse_prices
+
+def test_parse_prices_numeric():
+    prices, invalid = parse_prices([19.99, 5.0, 7])
+    assert prices.tolist() == [19.99, 5.0, 7.0]
+    assert not invalid.any()
+
+def test_parse_prices_none():
+    prices, invalid = parse_prices([None, 5])
+    assert prices.tolist() == [0.0, 5.0]
+    assert invalid.tolist() == [True, False]
+
+def test_parse_prices_mixed():
+    prices, invalid = parse_prices(["1.234,50 TL", 12, None, "fiyat yok", "$1,299.99", "1000,5", 7.5])
+    np.testing.assert_allclose(prices, [1234.5, 12.0, 0.0, 0.0, 1299.99, 1000.5, 7.5])
+    assert invalid.tolist() == [False, False, True, True, False, False, False]
+
+def test_abandoned_stream_is_finished_without_restarting(mock_api):
+    import engine
+    stream = engine.iter_search_all("iphone 13", "serp", "rapid")
+    next(stream)
+    stream.close()   # Sayfa değişti: akış ilk kaynaktan sonra bırakıldı
+    df = engine.cached_search_all("iphone 13", "serp", "rapid")   # Arkada biten aramayı bekler
+    assert not df.empty
+    assert mock_api.counts["requests"] == 2   # Kaynak başına tek upstream çağrısı
+
+def _http_responses():
+    import metrics
+    counters, _ = metrics.snapshot()
+    return {row["etiketler"]["status"]: row["değer"] for row in counters
+            if row["metrik"] == "ghostdeal_http_responses_total" and row["etiketler"]["host"] == "127.0.0.1"}
+
+def test_serpapi_errors_are_counted_with_real_status(mock_api):
+    import pytest
+    import engine
+    mock_api.error_rate = 1.0   # Her istek 429 / 503
+    before = _http_responses()
+    with pytest.raises(RuntimeError):
+        engine.search_serpapi("iphone 13", "serp")
+    after = _http_responses()
+    assert after.get("200", 0) == before.get("200", 0)
+    assert sum(after.get(c, 0) - before.get(c, 0) for c in ("429", "503")) == engine.HTTP_RETRIES + 1
+
+def test_match_products_keeps_variants_apart():
+    from engine import match_products
+    pairs = [("Apple AirPods Pro", "Apple AirPods Max"), ("Philips Airfryer XL", "Philips Airfryer XXL"),
+             ("Samsung Galaxy Buds Pro", "Samsung Galaxy Buds Live"), ("Kindle Paperwhite", "Kindle Paperwhite Kids")]
+    for a, b in pairs:
+        groups = match_products([a, b])
+        assert groups[0] != groups[1], (a, b)
+
+def test_match_products_groups_same_product():
+    from engine import match_products
+    groups = match_products(["Apple iPhone 13 128GB Siyah", "iPhone 13 128 GB Siyah Apple", "iPhone 13 256GB Siyah"])
+    assert groups[0] == groups[1] != groups[2]
+
+def test_amazon_deals_are_not_dropped_by_fuzzy_groups(mock_api):
+    import engine
+    from mock_api import DEAL_PAGES, synthetic_deals
+    titles = {d["deal_title"] for page in range(1, DEAL_PAGES + 1) for d in synthetic_deals("TR", page)["data"]["deals"]}
+    df = engine.get_amazon_deals("rapid", "TR")
+    assert len(df) == len(titles)
+
+def test_demand_counts_only_explicit_searches(mock_api):
+    import engine
+    key = "search:iphone 13"
+    list(engine.iter_search_all("iphone 13", "serp", "rapid", record_demand=True))
+    for _ in range(3):   # Rerun'lar, alarm turları, toplu okumalar
+        list(engine.iter_search_all("iphone 13", "serp", "rapid"))
+        engine.cached_search_all("iphone 13", "serp", "rapid")
+    assert engine.get_cache().demand(key) == 1
+
+def test_quotas_are_unlimited_by_default(tmp_path):
+    import os
+    import pytest
+    import engine
+    if any(name.startswith(("GHOSTDEAL_SERPAPI_", "GHOSTDEAL_RAPIDAPI_")) for name in os.environ):
+        pytest.skip("kota ortam değişkenleri tanımlı")
+    budget = engine.QuotaBudget(path=str(tmp_path / "budget.sqlite3"))
+    budget.spend("serpapi", 100_000)
+    assert budget.level("serpapi") == engine.BUDGET_NORMAL
+
+def test_relevance_folds_turkish_dotted_i_on_both_sides():
+    import pandas as pd
+    from engine import filter_irrelevant_products, token_overlap_scores
+    titles = ["APPLE İPHONE 13 128GB", "İzmir Çay Bardağı", "Apple iPhone 13"]
+    assert token_overlap_scores(titles, "iphone 13").tolist() == [1.0, 0.0, 1.0]
+    assert token_overlap_scores(titles, "İPHONE 13").tolist() == [1.0, 0.0, 1.0]
+    assert token_overlap_scores(titles, "izmir çay").tolist() == [0.0, 1.0, 0.0]
+    df = pd.DataFrame({"Ürün": titles, "Fiyat": [30000.0, 100.0, 31000.0]})
+    assert filter_irrelevant_products(df, "İphone 13")["Ürün"].tolist() == [titles[0], titles[2]]
+
+def test_http_get_stops_retrying_at_deadline(mock_api):
+    import time
+    import engine
+    mock_api.error_rate = 1.0
+    mock_api.retry_after = 20   # Retry-After beklemesi son tarihi aşar: tekrar denenmez
+    started = time.monotonic()
+    response = engine.http_get(f"{mock_api.url}/search", deadline=started + 1.0)
+    assert response.status_code in (429, 503)
+    assert time.monotonic() - started < 1.0
+
+def test_hung_source_does_not_starve_the_others(mock_api):
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    import engine
+    mock_api.path_latency = {"/search": 5.0}   # Google takıldı
+    keys = {"Google": "serp", "Amazon": "rapid"}
+    search = lambda q: {name: state["status"] for name, _, state in engine.fan_out(q, keys, source_timeout=1.0, deadline=2.0)}
+    with ThreadPoolExecutor(8) as pool:
+        busy = [pool.submit(search, f"yoğun {i}") for i in range(8)]
+        time.sleep(0.1)
+        started = time.monotonic()
+        status = search("iphone 13")
+        assert time.monotonic() - started < 2.5
+        assert status == {"Google": "timeout", "Amazon": "ok"}
+        assert all(f.result()["Amazon"] == "ok" for f in busy)
+
+def _dropped_rows():
+    import metrics
+    counters, _ = metrics.snapshot()
+    return {row["etiketler"]["stage"]: row["değer"] for row in counters if row["metrik"] == "ghostdeal_filter_dropped_rows_total"}
+
+def test_relevance_drops_are_counted_once_per_search(mock_api, monkeypatch):
+    import engine
+    titles = ["Apple iPhone 13 128GB", "Apple iPhone 13 Siyah", "Samsung Galaxy A13 13 MP", "Xiaomi 13 Lite"]
+    fake = lambda query, key, deadline=None: [{"Ürün": t, "Fiyat": 30000.0, "Satıcı": "x", "Link": f"https://example.com/{i}",
+                                               "Kaynak": "Google"} for i, t in enumerate(titles)]
+    monkeypatch.setattr(engine, "SOURCES", {"Google": fake})
+    before = _dropped_rows().get("relevance", 0)
+    df = engine.cached_search_all("apple iphone 13", "serp", "rapid")
+    assert len(df) == 4 and _dropped_rows().get("relevance", 0) - before == 2
+    for _ in range(3):   # Rerun'lar önbellekteki sonucu tekrar filtreler
+        for _, cached, _ in engine.iter_search_all("apple iphone 13", "serp", "rapid"):
+            assert len(engine.filter_irrelevant_products(cached, "apple iphone 13")) == 2
+    assert _dropped_rows().get("relevance", 0) - before == 2
+
+def test_query_numbers_match_whole_numbers_only():
+    import pandas as pd
+    from engine import smart_clean_results
+    titles = ["iPhone 17 Pro 256GB", "iPhone 170 Kulaklık Seti", "Takvim 2017 Baskı", "iPhone 17", "iPhone 13 Pro"]
+    df = pd.DataFrame({"Ürün": titles, "Fiyat": 50000.0})
+    assert smart_clean_results(df, "iphone 17")["Ürün"].tolist() == ["iPhone 17 Pro 256GB", "iPhone 17"]
+    # Sorgudaki her sayı başlıkta geçmeli (sıra önemsiz)
+    df = pd.DataFrame({"Ürün": ["Galaxy S24 256 GB", "Galaxy S24 128 GB", "256 GB Galaxy S24"], "Fiyat": 40000.0})
+    assert smart_clean_results(df, "s24 256")["Ürün"].tolist() == ["Galaxy S24 256 GB", "256 GB Galaxy S24"]
+
+def test_forbidden_words_are_dropped_unless_searched():
+    import pandas as pd
+    from engine import smart_clean_results
+    df = pd.DataFrame({"Ürün": ["AirPods Pro 2", "AirPods Pro 2 Silikon Kılıf", "AirPods Pro 2 Şarj Kablosu"],
+                       "Fiyat": [9000.0, 8500.0, 9500.0]})
+    assert smart_clean_results(df, "airpods pro 2")["Ürün"].tolist() == ["AirPods Pro 2"]
+    # Kullanıcı aksesuar aradıysa yasaklı kelime filtresi uygulanmaz
+    assert len(smart_clean_results(df, "airpods pro 2 kılıf")) == 3
+
+def test_price_floor_drops_listings_far_below_the_median():
+    import pandas as pd
+    from engine import PRICE_FLOOR_RATIO, smart_clean_results
+    prices = [40000.0] * 5 + [40000.0 * PRICE_FLOOR_RATIO, 40000.0 * PRICE_FLOOR_RATIO - 1, 900.0]
+    df = pd.DataFrame({"Ürün": [f"PS5 Konsol {i}" for i in range(len(prices))], "Fiyat": prices})
+    # Medyan 40000: tabanın (medyan x oran) altındakiler elenir, tabana eşit olan kalır
+    assert smart_clean_results(df, "ps5")["Fiyat"].tolist() == prices[:6]
@@ -0,0 +1,17 @@
+import io
+import zipfile
+
+import pandas as pd
+
+from exports import build_report
+
+def test_xlsx_links_are_hyperlinks():
+    df = pd.DataFrame({"Ürün": ["a", "b"], "Fiyat": [1.0, 2.0], "Satıcı": ["x", "y"], "Kaynak": ["Google", "Amazon"],
+                       "Link": ["https://example.com/p/1", "#"]})
+    data, ext, _ = build_report({"GhostDeal_Analiz": df}, "xlsx")
+    assert ext == "xlsx"
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        sheet = zf.read("xl/worksheets/sheet1.xml").decode("utf-8")
+        rels = zf.read("xl/worksheets/_rels/sheet1.xml.rels").decode("utf-8")
+    assert '<hyperlink ref="E2"' in sheet and 'ref="E3"' not in sheet
+    assert "https://example.com/p/1" in rels
@@ -0,0 +1,23 @@
+import pandas as pd
+
+from snapshots import diff_deals
+
+def deals(rows):
+    return pd.DataFrame(rows, columns=["Ülke", "Ürün", "Fiyat", "İndirim_Oranı"])
+
+def test_diff_deals_classifies_changes():
+    old = deals([("TR", "Kulaklık", 900.0, 10), ("TR", "Süpürge", 4000.0, 20), ("TR", "Saat", 1500.0, 30),
+                 ("DE", "Kulaklık", 50.0, 15)])
+    new = deals([("TR", "Kulaklık", 750.0, 25), ("TR", "Süpürge", 4000.0, 20), ("TR", "Monitör", 3000.0, 12),
+                 ("DE", "Kulaklık", 55.0, 5)])
+    changes = diff_deals(old, new)
+    got = {(row["Ülke"], row["Ürün"]): row["Değişim"] for _, row in changes.iterrows()}
+    assert got == {("TR", "Kulaklık"): "Daha Derin", ("TR", "Monitör"): "Yeni", ("TR", "Saat"): "Bitti"}
+    deeper = changes[changes["Değişim"] == "Daha Derin"].iloc[0]
+    assert (deeper["Fiyat"], deeper["Fiyat_önceki"]) == (750.0, 900.0)
+
+def test_diff_deals_first_and_empty_snapshots():
+    new = deals([("TR", "Kulaklık", 900.0, 10)])
+    assert diff_deals(deals([]), new)["Değişim"].tolist() == ["Yeni"]
+    assert diff_deals(new, deals([]))["Değişim"].tolist() == ["Bitti"]
+    assert diff_deals(deals([]), deals([])).empty